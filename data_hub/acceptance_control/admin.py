@@ -8,6 +8,8 @@ from .models import (
     FlagTypeLocalization,
     Severity, 
     DeliveryFlag, 
+    DeliveryFlagSummary,
+    DailyFlagStats,
     TenantFlagDeployment,
     Alarm,
     AlarmMedia,
@@ -17,6 +19,7 @@ from .models import (
     VideoArchive,
     VideoArchiveMedia,
     AlarmTag,
+    PendingChild,
 )
 
 from django.contrib.admin import SimpleListFilter
@@ -103,6 +106,21 @@ class DeliveryFlagAdmin(ModelAdmin):
     search_fields = ('delivery__delivery_id', 'flag_type__name', 'severity__level')
     list_filter = ('flag_type', 'severity')
 
+# Admin for DeliveryFlagSummary Model, derived from the flags
+@admin.register(DeliveryFlagSummary)
+class DeliveryFlagSummaryAdmin(ModelAdmin):
+    list_display = ('delivery', 'flag_type', 'severity', 'updated_at')
+    search_fields = ('delivery__delivery_id', 'flag_type__name')
+    list_filter = ('flag_type', 'severity')
+
+# Admin for DailyFlagStats Model, derived from the alarms and delivery flags
+@admin.register(DailyFlagStats)
+class DailyFlagStatsAdmin(ModelAdmin):
+    list_display = ('tenant', 'day', 'entity', 'flag_type', 'severity', 'alarms', 'reviewed_alarms', 'actual_alarms', 'delivery_flags')
+    search_fields = ('tenant__tenant_name', 'entity__entity_uid', 'flag_type__name')
+    list_filter = ('tenant', 'flag_type', 'severity')
+    date_hierarchy = 'day'
+
 # Admin for TenantFlagDeployment Model
 @admin.register(TenantFlagDeployment)
 class TenantFlagDeploymentAdmin(ModelAdmin):
@@ -185,3 +203,9 @@ class VideoArchiveMediaAdmin(ModelAdmin):
     list_display = ("video_archive", "media")
     list_filter = ("video_archive__tenant", "video_archive__entity",)
     search_fields = ("video_archive__video_id", )
+
+@admin.register(PendingChild)
+class PendingChildAdmin(ModelAdmin):
+    list_display = ("kind", "parent_key", "created_at")
+    list_filter = ("kind", "created_at")
+    search_fields = ("parent_key", )
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AcceptanceControlConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'acceptance_control'
+
+    def ready(self):
+        # keep the delivery flag summaries in line with the flags saved one by one
+        import common_utils.delivery_flags.signals
+
+        # warn when the deployment may open more connections than the database accepts
+        import common_utils.db.budget
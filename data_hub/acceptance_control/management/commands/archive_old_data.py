@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from tenants.models import Tenant
+from common_utils.archive.store import ARCHIVE_ROOT
+from common_utils.archive.pipeline import ARCHIVE_CHUNK_SIZE, archive_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        f"Move the alarms and deliveries of the months older than archive_after_days of each tenant, with their "
+        f"media, tags, feedbacks and flags, to Parquet files under {ARCHIVE_ROOT} and delete them from the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='domain of the tenant to archive, all tenants with archive_after_days by default')
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE, help='rows deleted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(archive_after_days__isnull=False)
+        if options['tenant']:
+            tenants = Tenant.objects.filter(domain=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant']} not found")
+
+        total = 0
+        for tenant in tenants:
+            if tenant.archive_after_days is None:
+                self.stdout.write(f"{tenant.domain}: archive_after_days not set, nothing archived")
+                continue
+
+            for table, month, rows in archive_tenant(tenant, chunk_size=options['chunk_size'], dry_run=options['dry_run']):
+                self.stdout.write(f"{tenant.domain}: {table} {month:%Y-%m} {rows} rows {'to archive' if options['dry_run'] else 'archived'}")
+                total += rows
+
+        self.stdout.write(self.style.SUCCESS(f"{total} rows {'to archive' if options['dry_run'] else 'archived'}"))
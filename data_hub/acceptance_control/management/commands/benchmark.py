@@ -0,0 +1,142 @@
+import io
+import os
+import json
+import uuid
+import asyncio
+import contextlib
+from django.core.management.base import BaseCommand, CommandError
+from common_utils.db import executor
+from common_utils.benchmark.synthetic import generate_dataset
+from common_utils.benchmark.harness import Targets, build_scenarios, run_scenario, build_report, compare_reports
+from common_utils.benchmark.wire_format import WIRE_FORMAT_MESSAGES, compare_wire_formats
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic tenants and benchmark the data_api read routes and the events_api ingest '
+        'routes in process, with eager celery tasks, into a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='prefix of the synthetic tenants, flag types and assets')
+        parser.add_argument('--tenants', type=int, default=2)
+        parser.add_argument('--entities', type=int, default=4, help='entities per tenant')
+        parser.add_argument('--alarms', type=int, default=10000, help='alarms per tenant')
+        parser.add_argument('--deliveries', type=int, default=2000, help='deliveries per tenant')
+        parser.add_argument('--flags', type=int, default=2, help='most flags per delivery')
+        parser.add_argument('--days', type=int, default=30, help='days the alarms and deliveries are spread over')
+        parser.add_argument('--languages', default='de,en', help='languages of the localizations, the first is the default of the tenants')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skip-generate', action='store_true', help='benchmark the tenants already generated')
+        parser.add_argument('--generate-only', action='store_true', help='generate the tenants without benchmarking them')
+        parser.add_argument(
+            '--wire-format', action='store_true',
+            help='only compare the size and throughput of the orjson task messages with the pickled ones',
+        )
+        parser.add_argument('--messages', type=int, default=WIRE_FORMAT_MESSAGES, help='task messages per wire format measure')
+        parser.add_argument('--scenarios', help='comma separated scenarios to run, all by default')
+        parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='requests of a scenario in flight at once')
+        parser.add_argument('--warmup', type=int, default=5, help='unrecorded requests sent before each scenario')
+        parser.add_argument(
+            '--db-threadpool-size', type=int,
+            help='worker threads of the data_api database threadpool, DB_THREADPOOL_SIZE by default',
+        )
+        parser.add_argument('--output', default='benchmark.json', help='path of the JSON report')
+        parser.add_argument('--baseline', help='JSON report to compare the results with')
+
+    def load_apps(self, db_threadpool_size=None):
+        if db_threadpool_size:
+            # the threadpool is created on the first request
+            executor.DB_THREADPOOL_SIZE = db_threadpool_size
+
+        # eager tasks run the ingest inside the request, on the event loop
+        # of the client, which the ORM refuses by default
+        os.environ.setdefault("DJANGO_ALLOW_ASYNC_UNSAFE", "true")
+        with contextlib.redirect_stdout(io.StringIO()):
+            from data_api.main import app as data_api
+            from events_api.main import app as events_api
+
+        events_api.celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+        return {'data_api': data_api, 'events_api': events_api}
+
+    async def run_scenarios(self, apps, scenarios, targets, options):
+        import httpx
+
+        results = {}
+        for scenario in scenarios:
+            transport = httpx.ASGITransport(app=apps[scenario.app])
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[scenario.name] = await run_scenario(
+                        client, scenario, targets,
+                        options['requests'], options['concurrency'], options['warmup'], options['seed'],
+                    )
+
+            result = results[scenario.name]
+            self.stdout.write(
+                f"{scenario.name:<22} {result['throughput_rps']:>8} req/s  "
+                f"p50 {result['latency_ms']['p50']:>8} ms  p95 {result['latency_ms']['p95']:>8} ms  "
+                f"p99 {result['latency_ms']['p99']:>8} ms  errors {result['errors']}"
+            )
+
+        return results
+
+    def compare_wire_formats(self, messages):
+        for name, pickled, encoded in compare_wire_formats(messages):
+            self.stdout.write(
+                f"{name:<10} {pickled[0]:>6} -> {encoded[0]:>6} bytes  "
+                f"enqueue {pickled[1]:>8.0f} -> {encoded[1]:>8.0f} msg/s  "
+                f"dequeue {pickled[2]:>8.0f} -> {encoded[2]:>8.0f} msg/s"
+            )
+
+    def handle(self, *args, **options):
+        if options['wire_format']:
+            return self.compare_wire_formats(options['messages'])
+
+        if not options['skip_generate']:
+            generate_dataset(
+                prefix=options['prefix'],
+                tenants=options['tenants'],
+                entities=options['entities'],
+                alarms=options['alarms'],
+                deliveries=options['deliveries'],
+                max_flags=options['flags'],
+                days=options['days'],
+                languages=options['languages'].split(','),
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+
+        if options['generate_only']:
+            return
+
+        targets = Targets(options['prefix'], options['days'])
+        if not targets.tenants:
+            raise CommandError(f"No {options['prefix']}-* tenant, generate them first")
+
+        scenarios = build_scenarios(f"{options['prefix']}-{uuid.uuid4().hex[:8]}")
+        if options['scenarios']:
+            names = options['scenarios'].split(',')
+            unknown = set(names) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenarios {sorted(unknown)}, options: {[scenario.name for scenario in scenarios]}")
+            scenarios = [scenario for scenario in scenarios if scenario.name in names]
+
+        results = asyncio.run(self.run_scenarios(self.load_apps(options['db_threadpool_size']), scenarios, targets, options))
+        report = build_report(
+            targets,
+            {key: options[key] for key in ('requests', 'concurrency', 'warmup', 'seed', 'days')},
+            results,
+        )
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+            self.stdout.write(f"Change against {options['baseline']}, in percent:")
+            for name, changes in compare_reports(baseline, report):
+                self.stdout.write(f"{name:<22} " + "  ".join(f"{metric} {change:+}" if change is not None else f"{metric} -" for metric, change in changes.items()))
@@ -0,0 +1,97 @@
+import contextlib
+import io
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from tenants.models import Tenant
+from acceptance_control.models import Alarm, Delivery, VideoArchive
+from metadata.models import TenantTable
+from common_utils.localization.resolver import localization_cache
+from common_utils.table_config.config import table_config_cache
+from common_utils.metrics.query_budget import QueryBudgetMiddleware
+
+
+class Command(BaseCommand):
+    help = 'Run the read routes of data_api on the rows of a tenant and check the SQL queries of each against its budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='domain of the tenant to query, the first tenant by default')
+        parser.add_argument('--language', help='language of the responses, the default language of the tenant by default')
+        parser.add_argument('--days', type=int, default=30, help='days covered by the list routes')
+
+    def routes(self, tenant, language, days):
+        to_date = date.today()
+        from_date = to_date - timedelta(days=days)
+        listing = {
+            'tenant_domain': tenant.domain,
+            'from_date': from_date.isoformat(),
+            'to_date': to_date.isoformat(),
+            'language': language,
+        }
+
+        routes = [
+            ('/api/v1/alarm', listing),
+            ('/api/v1/delivery', listing),
+            ('/api/v1/video_archive', listing),
+            ('/api/v1/alarm/live', {'tenant_domain': tenant.domain, 'severity_level': 1, 'language': language}),
+            ('/api/v1/feedback/alarm/metadata', {'tenant_domain': tenant.domain, 'language': language}),
+            ('/api/v1/tags', {'language': language}),
+            ('/api/v1/tags/flat', {'language': language}),
+            ('/api/v1/stats', listing),
+            ('/api/v1/alarm/export', listing),
+            ('/api/v1/delivery/export', listing),
+        ]
+
+        for table_type in TenantTable.objects.filter(tenant=tenant).values_list('table_type__name', flat=True):
+            routes.append((f'/api/v1/{table_type}/metadata', {'tenant_domain': tenant.domain, 'language': language}))
+
+        alarm = Alarm.objects.filter(tenant=tenant).order_by('-created_at').first()
+        if alarm:
+            routes.append((f'/api/v1/alarm/assets/{alarm.event_uid}', {'language': language}))
+            routes.append((f'/api/v1/feedback/alarm/out/{alarm.event_uid}', {}))
+
+        delivery = Delivery.objects.filter(tenant=tenant).order_by('-created_at').first()
+        if delivery:
+            routes.append((f'/api/v1/delivery/assets/{delivery.delivery_id}', {'language': language}))
+            for report in ('', 'assets/', 'flags/', 'erp/'):
+                routes.append((f'/api/v1/report/delivery/{report}{delivery.delivery_id}', {'language': language}))
+
+        video_archive = VideoArchive.objects.filter(tenant=tenant).order_by('-created_at').first()
+        if video_archive:
+            routes.append((f'/api/v1/video_archive/assets/{video_archive.video_id}', {'language': language}))
+
+        return routes
+
+    def handle(self, *args, **options):
+        from fastapi.testclient import TestClient
+        with contextlib.redirect_stdout(io.StringIO()):
+            from data_api.main import app
+
+        tenant = Tenant.objects.filter(domain=options['tenant']).first() if options['tenant'] else Tenant.objects.order_by('id').first()
+        if tenant is None:
+            raise CommandError(f"Tenant {options['tenant'] or ''} not found")
+
+        language = options['language'] or tenant.default_language or 'de'
+        checks = []
+        client = TestClient(QueryBudgetMiddleware(app, mode="log", on_check=checks.append))
+
+        for path, params in self.routes(tenant, language, options['days']):
+            # budgets hold with empty caches, the first request of a worker
+            table_config_cache.invalidate()
+            localization_cache.invalidate()
+            client.get(path, params=params)
+
+        # an error response stops early and proves nothing about the budget
+        failed = [check for check in checks if not 200 <= check.status < 300]
+        exceeded = [check for check in checks if check.exceeded]
+        for check in checks:
+            line = f"{check.status} {check.queries:>4}/{check.budget:<4} {check.method} {check.route}"
+            self.stdout.write(self.style.ERROR(line) if check.exceeded or check in failed else line)
+            for sql, count in check.repeated.items():
+                self.stdout.write(f"        {count}x {sql}")
+
+        if failed:
+            raise CommandError(f"{len(failed)} of {len(checks)} routes answered with an error, seed the rows they need")
+        if exceeded:
+            raise CommandError(f"{len(exceeded)} of {len(checks)} routes over their query budget")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(checks)} routes within their query budget"))
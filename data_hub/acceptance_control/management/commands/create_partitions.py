@@ -0,0 +1,24 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from common_utils.partitions.monthly import PARTITION_MONTHS_AHEAD, PARTITIONED_TABLES, create_partitions, is_supported
+
+
+class Command(BaseCommand):
+    help = (
+        f"Create the monthly partitions of {', '.join(PARTITIONED_TABLES)} ahead of time, "
+        "also run on the first of each month by the partitions:create beat task. Nothing to do on databases without native partitioning"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=PARTITION_MONTHS_AHEAD, help='months created after the first one')
+        parser.add_argument('--from-month', type=date.fromisoformat, help='a day of the first month to create, the current month by default')
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            self.stdout.write("Tables are not partitioned on this database, nothing to create")
+            return
+
+        created = create_partitions(options['months'], options['from_month'])
+        for name in created:
+            self.stdout.write(f"{name} created")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partitions created"))
@@ -0,0 +1,27 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from common_utils.partitions.monthly import PARTITIONED_TABLES, drop_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        f"Drop the rows of {', '.join(PARTITIONED_TABLES)} stored before a month, with the tags, attributes "
+        "and feedbacks of the alarms. Whole monthly partitions are dropped on PostgreSQL, rows are deleted elsewhere. "
+        "The media links of the deliveries and video archives still stored are kept with their media, archive "
+        "them first with archive_old_data. The event_uid and media_id keys are kept"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat, required=True, help='a day of the first month kept')
+        parser.add_argument('--dry-run', action='store_true', help='count the rows that would be dropped')
+
+    def handle(self, *args, **options):
+        dropped = drop_partitions(options['before'], dry_run=options['dry_run'])
+        for table, partition, rows in dropped:
+            if partition:
+                self.stdout.write(f"{table}: {partition} ({rows} rows) {'to drop' if options['dry_run'] else 'dropped'}")
+            elif rows:
+                self.stdout.write(f"{table}: {rows} rows {'to delete' if options['dry_run'] else 'deleted'}")
+
+        rows = sum(rows for _, _, rows in dropped)
+        self.stdout.write(self.style.SUCCESS(f"{rows} rows {'to drop' if options['dry_run'] else 'dropped'}"))
@@ -0,0 +1,52 @@
+from datetime import date, datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from tenants.models import Tenant
+from acceptance_control.models import Alarm, Delivery
+from common_utils.stats.rollup import rebuild_stats
+from common_utils.timezone_utils.timeloc import convert_to_local_time
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily stats of the tenants from their alarms and delivery flags, e.g. to backfill DailyFlagStats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='domain of the tenant to rebuild, every tenant by default')
+        parser.add_argument('--from-date', type=date.fromisoformat, help='first day to rebuild, the day of the first alarm or delivery by default')
+        parser.add_argument('--to-date', type=date.fromisoformat, help='last day to rebuild, today of the tenant by default')
+        parser.add_argument('--batch-days', type=int, default=31, help='days rebuilt per transaction')
+
+    def first_day(self, tenant):
+        first = [
+            created_at for created_at in (
+                Alarm.objects.filter(tenant=tenant).order_by('created_at').values_list('created_at', flat=True).first(),
+                Delivery.objects.filter(tenant=tenant).order_by('created_at').values_list('created_at', flat=True).first(),
+            ) if created_at is not None
+        ]
+        if not first:
+            return None
+        return convert_to_local_time(min(first), tenant.timezone).date()
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all().order_by('domain')
+        if options['tenant']:
+            tenants = tenants.filter(domain=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant']} not found")
+
+        total = 0
+        for tenant in tenants:
+            from_day = options['from_date'] or self.first_day(tenant)
+            to_day = options['to_date'] or convert_to_local_time(datetime.utcnow(), tenant.timezone).date()
+            if from_day is None or from_day > to_day:
+                continue
+
+            rows = 0
+            while from_day <= to_day:
+                last_day = min(from_day + timedelta(days=options['batch_days'] - 1), to_day)
+                rows += rebuild_stats(tenant, from_day, last_day)
+                from_day = last_day + timedelta(days=1)
+
+            total += rows
+            self.stdout.write(f"{tenant.domain}: {rows} daily stats")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} daily stats rebuilt"))
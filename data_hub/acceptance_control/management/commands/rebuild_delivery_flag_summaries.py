@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from tenants.models import Tenant
+from acceptance_control.models import Delivery
+from common_utils.delivery_flags.summary import refresh_flag_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute the worst severity per flag type of the deliveries from their flags, e.g. to backfill DeliveryFlagSummary'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='domain of the tenant to rebuild, every tenant by default')
+        parser.add_argument('--batch-size', type=int, default=1000, help='deliveries refreshed per transaction')
+
+    def handle(self, *args, **options):
+        deliveries = Delivery.objects.all()
+        if options['tenant']:
+            tenant = Tenant.objects.filter(domain=options['tenant']).first()
+            if tenant is None:
+                raise CommandError(f"Tenant {options['tenant']} not found")
+            deliveries = deliveries.filter(tenant=tenant)
+
+        last_id, refreshed, summaries = 0, 0, 0
+        while True:
+            delivery_ids = list(
+                deliveries.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not delivery_ids:
+                break
+
+            summaries += refresh_flag_summaries(delivery_ids)
+            refreshed += len(delivery_ids)
+            last_id = delivery_ids[-1]
+            self.stdout.write(f"{refreshed} deliveries refreshed")
+
+        self.stdout.write(self.style.SUCCESS(f"{summaries} flag summaries for {refreshed} deliveries"))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acceptance_control', '0017_alter_alarmtag_tagged_by'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alarm',
+            index=models.Index(fields=['tenant', 'exclude_from_dashboard', '-created_at'], name='alarm_dashboard_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alarm',
+            index=models.Index(fields=['tenant', 'entity', '-created_at'], name='alarm_entity_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alarm',
+            index=models.Index(condition=models.Q(('ack_status', False), ('exclude_from_dashboard', False)), fields=['tenant', '-created_at'], name='alarm_live_unack_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alarm',
+            index=models.Index(fields=['delivery_id'], name='alarm_delivery_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alarmmedia',
+            index=models.Index(fields=['alarm', 'media'], name='alarm_media_parent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['tenant', '-created_at'], name='delivery_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryflag',
+            index=models.Index(fields=['delivery', 'flag_type', 'exclude_from_dashboard'], name='delivery_flag_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverymedia',
+            index=models.Index(fields=['delivery', 'media'], name='delivery_media_parent_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 19:19
+
+import math
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def backfill_numeric_value(apps, schema_editor):
+    Alarm = apps.get_model('acceptance_control', 'Alarm')
+    batch = []
+    for alarm in Alarm.objects.filter(value__isnull=False).only('id', 'value').iterator(chunk_size=BATCH_SIZE):
+        try:
+            numeric_value = float(alarm.value)
+        except (TypeError, ValueError):
+            continue
+
+        if not math.isfinite(numeric_value):
+            continue
+
+        alarm.numeric_value = numeric_value
+        batch.append(alarm)
+        if len(batch) >= BATCH_SIZE:
+            Alarm.objects.bulk_update(batch, ['numeric_value'])
+            batch = []
+
+    if batch:
+        Alarm.objects.bulk_update(batch, ['numeric_value'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acceptance_control', '0018_alarm_alarm_dashboard_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alarm',
+            name='numeric_value',
+            field=models.FloatField(blank=True, help_text='value as a number, used for range filters', null=True),
+        ),
+        migrations.RunPython(backfill_numeric_value, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='alarm',
+            index=models.Index(fields=['tenant', 'numeric_value'], name='alarm_numeric_value_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acceptance_control', '0019_alarm_numeric_value_alarm_alarm_numeric_value_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingChild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('alarm_media', 'Alarm Media'), ('delivery_media', 'Delivery Media'), ('delivery_flag', 'Delivery Flag')], max_length=50)),
+                ('parent_key', models.CharField(help_text='event_uid of the alarm or delivery_id of the delivery', max_length=255)),
+                ('payload', models.JSONField(help_text='task payload of the child event')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Pending Children',
+                'db_table': 'pending_child',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pendingchild',
+            index=models.Index(fields=['kind', 'parent_key'], name='pending_child_parent_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-18 20:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acceptance_control', '0020_pendingchild'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryFlagSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('delivery', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flag_summaries', to='acceptance_control.delivery')),
+                ('flag_type', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='acceptance_control.flagtype')),
+                ('severity', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='acceptance_control.severity')),
+            ],
+            options={
+                'verbose_name_plural': 'Delivery Flag Summaries',
+                'db_table': 'delivery_flag_summary',
+                'unique_together': {('delivery', 'flag_type')},
+            },
+        ),
+    ]
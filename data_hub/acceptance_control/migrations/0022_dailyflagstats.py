@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 20:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0009_tenant_timezone'),
+        ('acceptance_control', '0021_deliveryflagsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFlagStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='day in the timezone of the tenant')),
+                ('alarms', models.IntegerField(default=0)),
+                ('reviewed_alarms', models.IntegerField(default=0, help_text='alarms with a feedback, is_actual_alarm set')),
+                ('actual_alarms', models.IntegerField(default=0, help_text='alarms confirmed by a feedback, is_actual_alarm true')),
+                ('delivery_flags', models.IntegerField(default=0)),
+                ('entity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.plantentity')),
+                ('flag_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='acceptance_control.flagtype')),
+                ('severity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='acceptance_control.severity')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Flag Stats',
+                'db_table': 'daily_flag_stats',
+                'unique_together': {('tenant', 'day', 'entity', 'flag_type', 'severity')},
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2 on 2026-10-18 20:28
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django.utils.timezone
+
+# (link model, foreign key to its parent, parent model)
+LINKS = (
+    ('AlarmMedia', 'alarm', 'Alarm'),
+    ('DeliveryMedia', 'delivery', 'Delivery'),
+    ('VideoArchiveMedia', 'video_archive', 'VideoArchive'),
+)
+
+
+def backfill_created_at(apps, schema_editor):
+    for link_name, foreign_key, parent_name in LINKS:
+        Link = apps.get_model('acceptance_control', link_name)
+        Parent = apps.get_model('acceptance_control', parent_name)
+        Link.objects.update(
+            created_at=Subquery(Parent.objects.filter(id=OuterRef(f"{foreign_key}_id")).values('created_at')[:1])
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acceptance_control', '0022_dailyflagstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alarmattr',
+            name='alarm',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.RESTRICT, related_name='alarm_attr', to='acceptance_control.alarm'),
+        ),
+        migrations.AlterField(
+            model_name='alarmfeedback',
+            name='alarm',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.RESTRICT, to='acceptance_control.alarm'),
+        ),
+        migrations.AlterField(
+            model_name='alarmmedia',
+            name='alarm',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.RESTRICT, to='acceptance_control.alarm'),
+        ),
+        migrations.AlterField(
+            model_name='alarmmedia',
+            name='media',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.RESTRICT, to='acceptance_control.media'),
+        ),
+        migrations.AlterField(
+            model_name='alarmtag',
+            name='alarm',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='alarm_tags', to='acceptance_control.alarm'),
+        ),
+        migrations.AlterField(
+            model_name='deliverymedia',
+            name='media',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.RESTRICT, to='acceptance_control.media'),
+        ),
+        migrations.AlterField(
+            model_name='videoarchivemedia',
+            name='media',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.RESTRICT, to='acceptance_control.media'),
+        ),
+        migrations.AddField(
+            model_name='alarmmedia',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='created_at of the alarm, the link is stored in its partition'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='deliverymedia',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='created_at of the delivery, the link is stored in its partition'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='videoarchivemedia',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='created_at of the video archive, the link is stored in its partition'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.migrations.exceptions import IrreversibleError
+from common_utils.partitions.monthly import PARTITIONED_TABLES, is_supported, partition_table
+
+
+def partition_tables(apps, schema_editor):
+    if not is_supported(schema_editor.connection):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for table, unique_columns in PARTITIONED_TABLES.items():
+            partition_table(cursor, table, unique_columns)
+
+def unpartition_tables(apps, schema_editor):
+    if is_supported(schema_editor.connection):
+        raise IrreversibleError(
+            f"{', '.join(PARTITIONED_TABLES)} are partitioned, they are not converted back to plain tables"
+        )
+
+class Migration(migrations.Migration):
+    """
+    Partition the alarms, the media and the media links by month of
+    created_at on PostgreSQL, see common_utils.partitions. The tables stay
+    plain tables on other databases.
+    """
+
+    dependencies = [
+        ('acceptance_control', '0023_alarmmedia_created_at_deliverymedia_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,98 @@
+from django.db import migrations, models
+from common_utils.partitions.monthly import is_supported
+
+# (model, field) unique on their own before, unique through the key tables after
+KEY_FIELDS = (('alarm', 'event_uid'), ('media', 'media_id'))
+
+
+def fill_keys(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO "alarm_event_uid" ("event_uid", "created_at") '
+            'SELECT "event_uid", MIN("created_at") FROM "alarm" GROUP BY "event_uid"'
+        )
+        cursor.execute(
+            'INSERT INTO "media_media_id" ("media_id", "created_at") '
+            'SELECT "media_id", MIN("created_at") FROM "media" GROUP BY "media_id"'
+        )
+
+def key_field(model, name, unique):
+    field = models.CharField(max_length=255, unique=unique, db_index=not unique)
+    field.set_attributes_from_name(name)
+    field.model = model
+    return field
+
+def alter_key_fields(apps, schema_editor, unique):
+    """
+    Drop (unique=False) or restore the unique constraints of event_uid and
+    media_id outside PostgreSQL. On PostgreSQL 0024 already made them unique
+    together with created_at, which the model state does not describe.
+    """
+    if is_supported(schema_editor.connection):
+        return
+
+    for model_name, name in KEY_FIELDS:
+        model = apps.get_model('acceptance_control', model_name)
+        schema_editor.alter_field(model, key_field(model, name, not unique), key_field(model, name, unique))
+
+def drop_unique(apps, schema_editor):
+    alter_key_fields(apps, schema_editor, unique=False)
+
+def restore_unique(apps, schema_editor):
+    alter_key_fields(apps, schema_editor, unique=True)
+
+class Migration(migrations.Migration):
+    """
+    Keep event_uid and media_id unique across months in the key tables
+    alarm_event_uid and media_media_id, filled from the stored rows. The
+    models no longer declare them unique: on PostgreSQL 0024 made them unique
+    together with created_at only, elsewhere their unique constraints are
+    dropped for an index.
+    """
+
+    dependencies = [
+        ('acceptance_control', '0024_partition_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlarmKey',
+            fields=[
+                ('event_uid', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(help_text='created_at of the alarm')),
+            ],
+            options={
+                'verbose_name_plural': 'Alarm Keys',
+                'db_table': 'alarm_event_uid',
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaKey',
+            fields=[
+                ('media_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(help_text='created_at of the media')),
+            ],
+            options={
+                'verbose_name_plural': 'Media Keys',
+                'db_table': 'media_media_id',
+            },
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(drop_unique, restore_unique),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='alarm',
+                    name='event_uid',
+                    field=models.CharField(db_index=True, help_text='unique, see AlarmKey', max_length=255),
+                ),
+                migrations.AlterField(
+                    model_name='media',
+                    name='media_id',
+                    field=models.CharField(db_index=True, help_text='unique, see MediaKey', max_length=255),
+                ),
+            ],
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from tenants.models import (
     Tenant,
     PlantEntity,
@@ -14,9 +14,16 @@ from metadata.models import (
     Tag,
 )
 
+from common_utils.partitions.keys import claim_unique
+
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
+# Media, Alarm and the media links are partitioned by month of created_at on
+# PostgreSQL, see common_utils.partitions: their primary key is unique together
+# with created_at in the database and the foreign keys referencing them have no
+# database constraint. media_id and event_uid are kept unique by MediaKey and
+# AlarmKey, claimed when the rows are stored
 class Media(models.Model):
     IMAGE = 'image'
     VIDEO = 'video'
@@ -25,7 +32,7 @@ class Media(models.Model):
         (VIDEO, 'Video')
     ]
     
-    media_id = models.CharField(max_length=255, unique=True, db_index=True)
+    media_id = models.CharField(max_length=255, db_index=True, help_text="unique, see MediaKey")
     sensor_box = models.ForeignKey(SensorBox, on_delete=models.RESTRICT, null=True, blank=True)
     media_name = models.CharField(max_length=255)
     media_type = models.CharField(max_length=100, choices=MEDIA_TYPE_CHOICES)
@@ -42,6 +49,14 @@ class Media(models.Model):
     def __str__(self):
         return f"{self.media_id} ({self.media_type})"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            claim_unique(MediaKey, [self.media_id], {self.media_id: self.created_at})
+
 class Delivery(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -64,6 +79,13 @@ class Delivery(models.Model):
     class Meta:
         db_table = 'delivery'
         verbose_name_plural = 'Deliveries'
+        indexes = [
+            models.Index(
+                fields=['tenant', '-created_at'],
+                condition=models.Q(is_deleted=False),
+                name='delivery_tenant_created_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Delivery {self.delivery_id} for {self.tenant}"
@@ -72,14 +94,23 @@ class Delivery(models.Model):
 
 class DeliveryMedia(models.Model):
     delivery = models.ForeignKey(Delivery, on_delete=models.RESTRICT)
-    media = models.ForeignKey(Media, on_delete=models.RESTRICT)
+    media = models.ForeignKey(Media, on_delete=models.RESTRICT, db_constraint=False)
+    created_at = models.DateTimeField(editable=False, help_text="created_at of the delivery, the link is stored in its partition")
     
     class Meta:
         db_table = 'delivery_media'
         verbose_name_plural = 'Delivery Media'
+        indexes = [
+            models.Index(fields=['delivery', 'media'], name='delivery_media_parent_idx'),
+        ]
         
     def __str__(self):
         return f"{self.delivery}: {self.media}"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.created_at = self.delivery.created_at
+        super().save(*args, **kwargs)
     
 # Define the flags that will be associated with deliveries
 class FlagType(models.Model):
@@ -147,10 +178,32 @@ class DeliveryFlag(models.Model):
     class Meta:
         db_table = "delivery_flag"
         verbose_name_plural = "Delivery Flags"
+        indexes = [
+            models.Index(
+                fields=['delivery', 'flag_type', 'exclude_from_dashboard'],
+                name='delivery_flag_lookup_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.flag_type.name} for {self.delivery.delivery_id} - Severity: {self.severity.level}"
 
+# Worst severity of the flags of each type of a delivery, flags excluded from
+# the dashboard left out. Derived from the flags, see common_utils.delivery_flags
+class DeliveryFlagSummary(models.Model):
+    delivery = models.ForeignKey(Delivery, on_delete=models.CASCADE, related_name='flag_summaries')
+    flag_type = models.ForeignKey(FlagType, on_delete=models.RESTRICT)
+    severity = models.ForeignKey(Severity, on_delete=models.RESTRICT)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "delivery_flag_summary"
+        verbose_name_plural = "Delivery Flag Summaries"
+        unique_together = ('delivery', 'flag_type')
+
+    def __str__(self):
+        return f"{self.flag_type.name} for delivery {self.delivery_id} - Severity: {self.severity_id}"
+
 # Multi-tenant deployment model, specifying which flags are available for each tenant
 class TenantFlagDeployment(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.RESTRICT, related_name='flag_deployments')
@@ -173,7 +226,7 @@ class Alarm(models.Model):
     severity = models.ForeignKey(Severity, on_delete=models.RESTRICT)
     timestamp = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
-    event_uid = models.CharField(max_length=255, unique=True)
+    event_uid = models.CharField(max_length=255, db_index=True, help_text="unique, see AlarmKey")
     delivery_id = models.CharField(max_length=255, null=True, blank=True)
     ack_status = models.BooleanField(default=False)
     
@@ -184,17 +237,91 @@ class Alarm(models.Model):
     
     # Extra Info
     value = models.CharField(max_length=255, null=True, blank=True)
+    numeric_value = models.FloatField(null=True, blank=True, help_text="value as a number, used for range filters")
     meta_info = models.JSONField(null=True, blank=True)
     
     class Meta:
         db_table = 'alarm'
         verbose_name_plural = 'Alarms'
+        indexes = [
+            models.Index(
+                fields=['tenant', 'exclude_from_dashboard', '-created_at'],
+                name='alarm_dashboard_idx',
+            ),
+            models.Index(
+                fields=['tenant', 'entity', '-created_at'],
+                name='alarm_entity_created_idx',
+            ),
+            models.Index(
+                fields=['tenant', '-created_at'],
+                condition=models.Q(ack_status=False, exclude_from_dashboard=False),
+                name='alarm_live_unack_idx',
+            ),
+            models.Index(fields=['delivery_id'], name='alarm_delivery_id_idx'),
+            models.Index(fields=['tenant', 'numeric_value'], name='alarm_numeric_value_idx'),
+        ]
         
     def __str__(self):
         return f"Alarm {self.event_uid} for {self.tenant}"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            claim_unique(AlarmKey, [self.event_uid], {self.event_uid: self.created_at})
+
+# event_uid of every alarm and media_id of every media, the partitioned tables
+# can only be unique together with created_at. Keys are claimed in the
+# transaction storing the row, see common_utils.partitions.keys; save() does
+# it, bulk inserts call claim_keys. Archived and dropped rows keep their key
+class AlarmKey(models.Model):
+    event_uid = models.CharField(max_length=255, primary_key=True)
+    created_at = models.DateTimeField(help_text="created_at of the alarm")
+
+    class Meta:
+        db_table = 'alarm_event_uid'
+        verbose_name_plural = 'Alarm Keys'
+
+    def __str__(self):
+        return self.event_uid
+
+class MediaKey(models.Model):
+    media_id = models.CharField(max_length=255, primary_key=True)
+    created_at = models.DateTimeField(help_text="created_at of the media")
+
+    class Meta:
+        db_table = 'media_media_id'
+        verbose_name_plural = 'Media Keys'
+
+    def __str__(self):
+        return self.media_id
+
+# Alarms and delivery flags counted per tenant, entity, flag type, severity and
+# day in the timezone of the tenant. Maintained by the ingest tasks, see
+# common_utils.stats.rollup, and recomputed by the rebuild_daily_stats command
+class DailyFlagStats(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
+    day = models.DateField(help_text="day in the timezone of the tenant")
+    entity = models.ForeignKey(PlantEntity, on_delete=models.CASCADE)
+    flag_type = models.ForeignKey(FlagType, on_delete=models.CASCADE)
+    severity = models.ForeignKey(Severity, on_delete=models.CASCADE)
+    alarms = models.IntegerField(default=0)
+    reviewed_alarms = models.IntegerField(default=0, help_text="alarms with a feedback, is_actual_alarm set")
+    actual_alarms = models.IntegerField(default=0, help_text="alarms confirmed by a feedback, is_actual_alarm true")
+    delivery_flags = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_flag_stats'
+        verbose_name_plural = 'Daily Flag Stats'
+        unique_together = ('tenant', 'day', 'entity', 'flag_type', 'severity')
+
+    def __str__(self):
+        return f"{self.tenant} {self.day} {self.flag_type} - alarms: {self.alarms}, delivery flags: {self.delivery_flags}"
+
 class AlarmTag(models.Model):
-    alarm = models.ForeignKey(Alarm, on_delete=models.CASCADE, related_name='alarm_tags')
+    alarm = models.ForeignKey(Alarm, on_delete=models.CASCADE, related_name='alarm_tags', db_constraint=False)
     tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='tagged_alarm')
     tagged_by = models.CharField(max_length=255, null=True, blank=True)
     tagged_at = models.DateTimeField(auto_now_add=True)
@@ -218,7 +345,7 @@ class AlarmTag(models.Model):
         return f"{self.alarm.event_uid} - {self.tag.name}"
 
 class AlarmAttr(models.Model):
-    alarm = models.ForeignKey(Alarm, related_name="alarm_attr", on_delete=models.RESTRICT)
+    alarm = models.ForeignKey(Alarm, related_name="alarm_attr", on_delete=models.RESTRICT, db_constraint=False)
     key = models.CharField(max_length=255)
     value = models.CharField(max_length=255)
     data_type = models.ForeignKey(DataType, on_delete=models.RESTRICT)
@@ -231,15 +358,24 @@ class AlarmAttr(models.Model):
         return f"{self.key}: {self.value} ({self.data_type})"
 
 class AlarmMedia(models.Model):
-    alarm = models.ForeignKey(Alarm, on_delete=models.RESTRICT)
-    media = models.ForeignKey(Media, on_delete=models.RESTRICT)
+    alarm = models.ForeignKey(Alarm, on_delete=models.RESTRICT, db_constraint=False)
+    media = models.ForeignKey(Media, on_delete=models.RESTRICT, db_constraint=False)
+    created_at = models.DateTimeField(editable=False, help_text="created_at of the alarm, the link is stored in its partition")
     
     class Meta:
         db_table = 'alarm_media'
         verbose_name_plural = 'Alarm Media'
+        indexes = [
+            models.Index(fields=['alarm', 'media'], name='alarm_media_parent_idx'),
+        ]
         
     def __str__(self):
         return f"{self.alarm}: {self.media}"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.created_at = self.alarm.created_at
+        super().save(*args, **kwargs)
     
 
 class DeliveryERPAttachment(models.Model):
@@ -262,7 +398,7 @@ class DeliveryERPAttachment(models.Model):
 
 class AlarmFeedback(models.Model):
     alarm = models.ForeignKey(
-        Alarm, on_delete=models.RESTRICT
+        Alarm, on_delete=models.RESTRICT, db_constraint=False
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -312,7 +448,8 @@ class VideoArchive(models.Model):
 
 class VideoArchiveMedia(models.Model):
     video_archive = models.ForeignKey(VideoArchive, on_delete=models.RESTRICT)
-    media = models.ForeignKey(Media, on_delete=models.RESTRICT)
+    media = models.ForeignKey(Media, on_delete=models.RESTRICT, db_constraint=False)
+    created_at = models.DateTimeField(editable=False, help_text="created_at of the video archive, the link is stored in its partition")
     
     class Meta:
         db_table = 'video_archive_media'
@@ -320,3 +457,41 @@ class VideoArchiveMedia(models.Model):
         
     def __str__(self):
         return f"{self.video_archive}: {self.media}"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.created_at = self.video_archive.created_at
+        super().save(*args, **kwargs)
+
+#################################################################################################################
+########################################### Pending Children ####################################################
+#################################################################################################################
+class PendingChild(models.Model):
+    """
+    Media or flag event received before its parent alarm or delivery. It is
+    parked here with its task payload and attached as soon as the parent is
+    stored, instead of retrying the task until the parent shows up.
+    """
+    ALARM_MEDIA = 'alarm_media'
+    DELIVERY_MEDIA = 'delivery_media'
+    DELIVERY_FLAG = 'delivery_flag'
+    KIND_CHOICES = [
+        (ALARM_MEDIA, 'Alarm Media'),
+        (DELIVERY_MEDIA, 'Delivery Media'),
+        (DELIVERY_FLAG, 'Delivery Flag'),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    parent_key = models.CharField(max_length=255, help_text="event_uid of the alarm or delivery_id of the delivery")
+    payload = models.JSONField(help_text="task payload of the child event")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pending_child'
+        verbose_name_plural = 'Pending Children'
+        indexes = [
+            models.Index(fields=['kind', 'parent_key'], name='pending_child_parent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.parent_key}"
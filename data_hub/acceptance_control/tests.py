@@ -1,3 +1,208 @@
-from django.test import TestCase
+import io
+import sys
+import json
+import unittest
+import subprocess
+import contextlib
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from tenants.models import Tenant
+from acceptance_control.models import Alarm, AlarmKey, AlarmMedia, Media, DeliveryMedia
+from common_utils.benchmark.synthetic import generate_dataset
+from common_utils.localization.resolver import localization_cache
+from common_utils.table_config.config import table_config_cache
+from common_utils.metrics.query_budget import QueryBudgetMiddleware
+from common_utils.partitions.monthly import drop_partitions, month_start
 
-# Create your tests here.
+# wall-clock seconds data_api.main may take to import, its routers included
+STARTUP_BUDGET = 5
+
+# import of data_api.main in a fresh interpreter, name lookups and TCP
+# connections refused and counted, printing the import time and the
+# connections attempted
+STARTUP_SCRIPT = """
+import json, socket, time
+attempts = []
+connect = socket.socket.connect
+def refuse(sock, address):
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        attempts.append(str(address))
+        raise OSError("outbound network disabled")
+    return connect(sock, address)
+def refuse_lookup(host, *args, **kwargs):
+    attempts.append(str(host))
+    raise socket.gaierror("outbound network disabled")
+socket.socket.connect = refuse
+socket.getaddrinfo = refuse_lookup
+start = time.monotonic()
+import data_api.main
+print(json.dumps({"seconds": time.monotonic() - start, "attempts": attempts}))
+"""
+
+# alarms of the seeded tenant made live, unacknowledged and stored within
+# the expiry of GET /alarm/live
+LIVE_ALARMS = 40
+
+class QueryBudgetTest(TransactionTestCase):
+    """
+    The read routes of data_api run on a seeded tenant within their query
+    budget, see QUERY_BUDGETS. The routes run their queries in the db
+    threads, the rows must be committed: TransactionTestCase.
+    """
+
+    def setUp(self):
+        generate_dataset(prefix='budget', tenants=1, entities=2, alarms=200, deliveries=50, days=3, log=lambda line: None)
+
+        live = list(Alarm.objects.filter(tenant__domain='budget-000').order_by('-created_at').values_list('id', flat=True)[:LIVE_ALARMS])
+        created_at = timezone.now() - timedelta(minutes=30)
+        Alarm.objects.filter(id__in=live).update(created_at=created_at, ack_status=False)
+        AlarmMedia.objects.filter(alarm_id__in=live).update(created_at=created_at)
+
+        table_config_cache.invalidate()
+        localization_cache.invalidate()
+
+    def test_live_alarms_within_budget(self):
+        from fastapi.testclient import TestClient
+        with contextlib.redirect_stdout(io.StringIO()):
+            from data_api.main import app
+
+        checks = []
+        client = TestClient(QueryBudgetMiddleware(app, mode="log", on_check=checks.append))
+        response = client.get('/api/v1/alarm/live', params={'tenant_domain': 'budget-000', 'severity_level': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(len(response.json()['data']['items']), LIVE_ALARMS // 2)
+        self.assertFalse(checks[0].exceeded, f"{checks[0]}, repeated: {checks[0].repeated}")
+
+    def test_read_routes_within_budget(self):
+        # raises CommandError if a route runs over its budget
+        call_command('check_query_budgets', tenant='budget-000', days=4, stdout=io.StringIO())
+
+
+def plan_indexes(queryset):
+    """
+    Names of the indexes read by the plan of the queryset, with the indexes
+    of the partitioned tables they are the partitions of.
+    """
+    def walk(node):
+        if 'Index Name' in node:
+            yield node['Index Name']
+        for child in node.get('Plans', []):
+            yield from walk(child)
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        cursor.execute(
+            "WITH RECURSIVE ancestors(oid, relname) AS ("
+            "SELECT c.oid, c.relname FROM pg_class c WHERE c.relname = ANY(%s) "
+            "UNION SELECT p.oid, p.relname FROM ancestors a "
+            "JOIN pg_inherits i ON i.inhrelid = a.oid JOIN pg_class p ON p.oid = i.inhparent"
+            ") SELECT relname FROM ancestors",
+            [list(walk(plan[0]['Plan']))],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "the index plans are checked on PostgreSQL, see postgres-test in docker-compose.yml")
+class IndexUsageTest(TestCase):
+    """
+    The dashboard, live and delivery list queries can be answered from the
+    indexes of migration 0018. Sequential scans are disabled: the test
+    tables are too small for the planner to prefer an index on its own.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(prefix='plan', tenants=1, entities=2, alarms=500, deliveries=100, days=3, log=lambda line: None)
+        cls.tenant = Tenant.objects.get(domain='plan-000')
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        self.to_date = timezone.now()
+        self.from_date = self.to_date - timedelta(days=1)
+
+    def test_dashboard_alarms(self):
+        from data_api.routers.alarm.queries.data import alarms_with_images
+
+        indexes = plan_indexes(alarms_with_images(
+            Q(tenant=self.tenant, exclude_from_dashboard=False, created_at__range=(self.from_date, self.to_date))
+        ))
+        self.assertIn('alarm_dashboard_idx', indexes)
+
+    def test_live_alarms(self):
+        indexes = plan_indexes(Alarm.objects.filter(
+            ack_status=False,
+            tenant=self.tenant,
+            severity__level__gte=1,
+            exclude_from_dashboard=False,
+            created_at__range=(self.from_date, self.to_date),
+        ).order_by('-created_at'))
+        self.assertIn('alarm_live_unack_idx', indexes)
+
+    def test_deliveries(self):
+        from data_api.routers.delivery.queries.data import listed_deliveries
+
+        indexes = plan_indexes(listed_deliveries(
+            Q(tenant=self.tenant, created_at__range=(self.from_date, self.to_date), is_deleted=False)
+        ))
+        self.assertIn('delivery_tenant_created_idx', indexes)
+
+class StartupTimeTest(unittest.TestCase):
+    """
+    data_api workers boot offline and quickly: importing data_api.main opens
+    no outbound connection, e.g. to resolve the host timezone, see
+    common_utils.timezone_utils.timeloc, and takes at most STARTUP_BUDGET.
+    """
+
+    def test_import_within_budget(self):
+        process = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
+
+        startup = json.loads(process.stdout.strip().splitlines()[-1])
+        self.assertEqual(startup["attempts"], [])
+        self.assertLess(startup["seconds"], STARTUP_BUDGET)
+
+class DropPartitionsTest(TestCase):
+    """
+    drop_partitions drops the alarms of the months before the cutoff with
+    their links and media, keeps the media links of the deliveries, which are
+    not partitioned, with their media, and keeps the keys of the alarms.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(prefix='retention', tenants=1, entities=2, alarms=200, deliveries=40, days=90, log=lambda line: None)
+        # media stored with the alarm or delivery they were sent for
+        for link in [*AlarmMedia.objects.all(), *DeliveryMedia.objects.all()]:
+            Media.objects.filter(id=link.media_id).update(created_at=link.created_at)
+
+    def test_drop_before_current_month(self):
+        before = month_start(timezone.now().date())
+        cutoff = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        keys = AlarmKey.objects.count()
+        delivery_media = DeliveryMedia.objects.count()
+        old_alarm_media = AlarmMedia.objects.filter(created_at__lt=cutoff).values_list('media_id', flat=True)
+        old_alarm_media = set(old_alarm_media) - set(DeliveryMedia.objects.values_list('media_id', flat=True))
+        self.assertTrue(old_alarm_media)
+
+        drop_partitions(before)
+
+        self.assertFalse(Alarm.objects.filter(created_at__lt=cutoff).exists())
+        self.assertFalse(AlarmMedia.objects.filter(created_at__lt=cutoff).exists())
+        self.assertFalse(Media.objects.filter(id__in=old_alarm_media).exists())
+        self.assertEqual(AlarmKey.objects.count(), keys)
+        self.assertEqual(DeliveryMedia.objects.count(), delivery_media)
+        self.assertFalse(DeliveryMedia.objects.exclude(media_id__in=Media.objects.values('id')).exists())
@@ -0,0 +1,265 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+from django.db import connection, transaction
+from django.db.models import Min, Prefetch
+from acceptance_control.models import (
+    Media,
+    Alarm,
+    AlarmTag,
+    AlarmAttr,
+    AlarmMedia,
+    AlarmFeedback,
+    Delivery,
+    DeliveryFlag,
+    DeliveryFlagSummary,
+    DeliveryMedia,
+    DeliveryERPAttachment,
+    VideoArchiveMedia,
+)
+from common_utils.archive.store import write_month, month_bounds
+from common_utils.partitions.monthly import month_start, add_months
+
+# alarms or deliveries read, written and deleted at once while archiving
+ARCHIVE_CHUNK_SIZE = int(os.environ.get("ARCHIVE_CHUNK_SIZE", 1000))
+
+# tables holding the rows of an alarm or a delivery, deleted before it
+ALARM_DEPENDENTS = (AlarmTag, AlarmAttr, AlarmFeedback, AlarmMedia)
+DELIVERY_DEPENDENTS = (DeliveryFlagSummary, DeliveryFlag, DeliveryERPAttachment, DeliveryMedia)
+MEDIA_LINKS = (AlarmMedia, DeliveryMedia, VideoArchiveMedia)
+
+def archive_horizon(tenant, now:datetime=None):
+    """
+    First month of the tenant kept in the database, the months before the
+    one archive_after_days ago are archived. None if the tenant keeps
+    everything in the database.
+    """
+    if tenant.archive_after_days is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    return month_start((now - timedelta(days=tenant.archive_after_days)).astimezone(timezone.utc).date())
+
+def dumps(value):
+    return json.dumps(value) if value is not None else None
+
+def media_record(media):
+    return {
+        'id': media.id,
+        'media_id': media.media_id,
+        'media_name': media.media_name,
+        'media_type': media.media_type,
+        'media_url': media.media_url,
+        'file_size': media.file_size,
+        'sensor_box_id': media.sensor_box_id,
+        'created_at': media.created_at,
+    }
+
+def alarm_records(ids):
+    alarms = Alarm.objects.filter(id__in=ids).select_related(
+        'entity', 'flag_type', 'severity',
+    ).prefetch_related(
+        Prefetch('alarmmedia_set', queryset=AlarmMedia.objects.select_related('media').order_by('id')),
+        Prefetch('alarm_tags', queryset=AlarmTag.objects.select_related('tag').order_by('id')),
+        Prefetch('alarm_attr', queryset=AlarmAttr.objects.order_by('id')),
+        Prefetch('alarmfeedback_set', queryset=AlarmFeedback.objects.order_by('id')),
+    ).order_by('id')
+
+    return [
+        {
+            'id': alarm.id,
+            'event_uid': alarm.event_uid,
+            'created_at': alarm.created_at,
+            'timestamp': alarm.timestamp,
+            'entity_id': alarm.entity_id,
+            'entity_uid': alarm.entity.entity_uid,
+            'entity_type_id': alarm.entity.entity_type_id,
+            'flag_type_id': alarm.flag_type_id,
+            'flag_type': alarm.flag_type.name,
+            'severity_id': alarm.severity_id,
+            'severity_level': alarm.severity.level,
+            'severity_unicode_char': alarm.severity.unicode_char,
+            'delivery_id': alarm.delivery_id,
+            'ack_status': alarm.ack_status,
+            'feedback_provided': alarm.feedback_provided,
+            'is_actual_alarm': alarm.is_actual_alarm,
+            'exclude_from_dashboard': alarm.exclude_from_dashboard,
+            'value': alarm.value,
+            'numeric_value': alarm.numeric_value,
+            'meta_info': dumps(alarm.meta_info),
+            'media': [media_record(alarm_media.media) for alarm_media in alarm.alarmmedia_set.all()],
+            'tags': [
+                {
+                    'name': alarm_tag.tag.name,
+                    'tagged_by': alarm_tag.tagged_by,
+                    'tagged_at': alarm_tag.tagged_at,
+                    'source': alarm_tag.source,
+                    'confidence': alarm_tag.confidence,
+                }
+                for alarm_tag in alarm.alarm_tags.all()
+            ],
+            'attrs': [
+                {'key': attr.key, 'value': attr.value, 'data_type_id': attr.data_type_id}
+                for attr in alarm.alarm_attr.all()
+            ],
+            'feedbacks': [
+                {
+                    'user_id': feedback.user_id,
+                    'is_actual_alarm': feedback.is_actual_alarm,
+                    'comment': feedback.comment,
+                    'rating_id': feedback.rating_id,
+                    'contains_other_object': feedback.contains_other_object,
+                    'meta_info': dumps(feedback.meta_info),
+                    'created_at': feedback.created_at,
+                    'updated_at': feedback.updated_at,
+                }
+                for feedback in alarm.alarmfeedback_set.all()
+            ],
+        }
+        for alarm in alarms
+    ]
+
+def delivery_records(ids):
+    deliveries = Delivery.objects.filter(id__in=ids).prefetch_related(
+        Prefetch('flags', queryset=DeliveryFlag.objects.select_related('severity').order_by('id')),
+        Prefetch('flag_summaries', queryset=DeliveryFlagSummary.objects.select_related('severity').order_by('id')),
+        Prefetch('deliveryerpattachment_set', queryset=DeliveryERPAttachment.objects.order_by('id')),
+        Prefetch('deliverymedia_set', queryset=DeliveryMedia.objects.select_related('media').order_by('id')),
+    ).order_by('id')
+
+    return [
+        {
+            'id': delivery.id,
+            'delivery_id': delivery.delivery_id,
+            'created_at': delivery.created_at,
+            'delivery_start': delivery.delivery_start,
+            'delivery_end': delivery.delivery_end,
+            'delivery_status': delivery.delivery_status,
+            'delivery_location': delivery.delivery_location,
+            'entity_id': delivery.entity_id,
+            'is_deleted': delivery.is_deleted,
+            'flags': [
+                {
+                    'id': flag.id,
+                    'flag_type_id': flag.flag_type_id,
+                    'severity_id': flag.severity_id,
+                    'severity_level': flag.severity.level,
+                    'event_uid': flag.event_uid,
+                    'feedback_provided': flag.feedback_provided,
+                    'is_actual_alarm': flag.is_actual_alarm,
+                    'exclude_from_dashboard': flag.exclude_from_dashboard,
+                }
+                for flag in delivery.flags.all()
+            ],
+            'flag_summaries': [
+                {
+                    'flag_type_id': summary.flag_type_id,
+                    'severity_id': summary.severity_id,
+                    'severity_unicode_char': summary.severity.unicode_char,
+                }
+                for summary in delivery.flag_summaries.all()
+            ],
+            'erp': [
+                {
+                    'attachment_type_id': attachment.attachment_type_id,
+                    'value': attachment.value,
+                    'source_reference': attachment.source_reference,
+                    'fetched_at': attachment.fetched_at,
+                    'created_at': attachment.created_at,
+                }
+                for attachment in delivery.deliveryerpattachment_set.all()
+            ],
+            'media': [media_record(delivery_media.media) for delivery_media in delivery.deliverymedia_set.all()],
+        }
+        for delivery in deliveries
+    ]
+
+def in_clause(ids):
+    return ", ".join(["%s"] * len(ids))
+
+def delete_with_dependents(cursor, model, dependents, column:str, ids):
+    """
+    Delete the rows of model with the ids, their rows in the dependent tables
+    and the media only they linked to. Raw deletes: the rows are gone from
+    the archive's point of view, no signal is sent for them.
+    """
+    link = next(dependent for dependent in dependents if dependent in MEDIA_LINKS)
+    cursor.execute(
+        f'SELECT "media_id" FROM "{link._meta.db_table}" WHERE "{column}" IN ({in_clause(ids)})', list(ids)
+    )
+    media_ids = [row[0] for row in cursor.fetchall()]
+
+    for dependent in dependents:
+        cursor.execute(f'DELETE FROM "{dependent._meta.db_table}" WHERE "{column}" IN ({in_clause(ids)})', list(ids))
+    cursor.execute(f'DELETE FROM "{model._meta.db_table}" WHERE "id" IN ({in_clause(ids)})', list(ids))
+
+    if media_ids:
+        media_table = Media._meta.db_table
+        unlinked = " ".join(
+            f'AND NOT EXISTS (SELECT 1 FROM "{other._meta.db_table}" l WHERE l."media_id" = "{media_table}"."id")'
+            for other in MEDIA_LINKS
+        )
+        cursor.execute(
+            f'DELETE FROM "{media_table}" WHERE "id" IN ({in_clause(media_ids)}) {unlinked}', media_ids
+        )
+
+# archived table: model, records of a chunk of ids, dependent tables, their column
+ARCHIVED_TABLES = {
+    'alarm': (Alarm, alarm_records, ALARM_DEPENDENTS, 'alarm_id'),
+    'delivery': (Delivery, delivery_records, DELIVERY_DEPENDENTS, 'delivery_id'),
+}
+
+def archive_month(tenant, table:str, month, chunk_size:int=ARCHIVE_CHUNK_SIZE, dry_run:bool=False):
+    """
+    Write the alarms or deliveries of the tenant created in the month, in
+    UTC, with their media, tags, feedbacks, flags and ERP values to the
+    archive file of the month, then delete them from the database chunk by
+    chunk. Returns the number of rows archived.
+
+    The file is complete before the first row is deleted: rows of a run
+    stopped in between are still stored and archived again by the next run.
+    """
+    model, records, dependents, column = ARCHIVED_TABLES[table]
+    start, end = month_bounds(month)
+    ids = list(
+        model.objects.filter(
+            tenant=tenant, created_at__gte=start, created_at__lt=end,
+        ).order_by('id').values_list('id', flat=True)
+    )
+    if dry_run or not ids:
+        return len(ids)
+
+    chunks = [ids[index:index + chunk_size] for index in range(0, len(ids), chunk_size)]
+    write_month(table, tenant.domain, month, (records(chunk) for chunk in chunks))
+    for chunk in chunks:
+        with transaction.atomic(), connection.cursor() as cursor:
+            delete_with_dependents(cursor, model, dependents, column, chunk)
+
+    return len(ids)
+
+def archive_tenant(tenant, now:datetime=None, chunk_size:int=ARCHIVE_CHUNK_SIZE, dry_run:bool=False):
+    """
+    Archive the alarms and deliveries of the tenant of every month before its
+    archive horizon. Returns [(table, month, rows)] of the months archived,
+    nothing for tenants without archive_after_days.
+
+    Whole months are archived: a month is only archived once all of it is
+    older than archive_after_days. The daily stats are kept.
+    """
+    horizon = archive_horizon(tenant, now)
+    if horizon is None:
+        return []
+
+    archived = []
+    for table, (model, *_) in ARCHIVED_TABLES.items():
+        first = model.objects.filter(tenant=tenant).aggregate(first=Min('created_at'))['first']
+        if first is None:
+            continue
+
+        month = month_start(first.astimezone(timezone.utc).date())
+        while month < horizon:
+            rows = archive_month(tenant, table, month, chunk_size=chunk_size, dry_run=dry_run)
+            if rows:
+                archived.append((table, month, rows))
+            month = add_months(month, 1)
+
+    return archived
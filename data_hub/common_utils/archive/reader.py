@@ -0,0 +1,58 @@
+from datetime import datetime
+from common_utils.archive.store import archive_boundary
+from common_utils.pagination.keyset import (
+    encode_cursor,
+    decode_cursor,
+    paginate_by_cursor,
+)
+
+def exclude_archived(queryset, table:str, domain:str, from_date:datetime):
+    """
+    Restrict the queryset to the rows created after the archive of the
+    tenant when from_date reaches back into it. Returns the queryset and
+    whether archived rows have to be read as well.
+
+    Archived rows are deleted from the database, the restriction only spares
+    the database from looking for them.
+    """
+    boundary = archive_boundary(table, domain)
+    if boundary is None or from_date >= boundary:
+        return queryset, False
+    return queryset.filter(created_at__gte=boundary), True
+
+def paginate(queryset, archived, cursor:str, page:int, items_per_page:int):
+    """
+    One page of the database rows of the queryset followed by the archived
+    records, all older than the database rows. archived is read_page with
+    its table, tenant, range and filters bound, only the records of the page
+    are read, or None when the archive is not read. Returns the rows of the
+    page from the database, the records of the page from the archive and,
+    with a cursor, the cursor of the next page (None on the last page).
+
+    Cursors of pages in the archive point to an archived record, the
+    database has no row before them and only the archive is read.
+    """
+    if cursor is not None:
+        items, next_cursor = paginate_by_cursor(queryset, cursor, items_per_page)
+        if next_cursor is not None or archived is None:
+            return items, [], next_cursor
+
+        before = decode_cursor(cursor) if cursor and not items else None
+        count = items_per_page - len(items)
+        records = archived(offset=0, limit=count + 1, before=before)
+        page_records = records[:count]
+        if len(records) <= count:
+            return items, page_records, None
+        if page_records:
+            return items, page_records, encode_cursor(page_records[-1]['created_at'], page_records[-1]['id'])
+        return items, page_records, encode_cursor(items[-1].created_at, items[-1].id)
+
+    start = (page - 1) * items_per_page
+    items = list(queryset[start:start + items_per_page])
+    if len(items) == items_per_page or archived is None:
+        return items, [], None
+
+    # the database rows end on this page, the archived records follow them
+    stored = start + len(items) if items or not start else queryset.count()
+    offset = max(start - stored, 0)
+    return items, archived(offset=offset, limit=items_per_page - len(items), before=None), None
@@ -0,0 +1,381 @@
+import os
+import re
+import uuid
+import operator
+import itertools
+from datetime import date, datetime, timezone
+from collections import defaultdict
+from django.conf import settings
+from django.db import models
+from django.core.exceptions import ImproperlyConfigured
+from common_utils.partitions.monthly import add_months
+
+# directory of the archived rows, one Parquet file per table, tenant and month:
+# {ARCHIVE_ROOT}/{table}/tenant={domain}/month={YYYY-MM}/data.parquet
+ARCHIVE_ROOT = os.environ.get("ARCHIVE_ROOT", str(settings.BASE_DIR / "archive"))
+
+# parquet compression codec of the archive files
+ARCHIVE_COMPRESSION = os.environ.get("ARCHIVE_COMPRESSION", "zstd")
+# rows of an archive file held in memory at once by iter_rows
+ARCHIVE_READ_BATCH_SIZE = int(os.environ.get("ARCHIVE_READ_BATCH_SIZE", 2000))
+# rows per row group of the archive files, iter_rows skips the row groups
+# whose created_at statistics are out of the range read
+ARCHIVE_ROW_GROUP_SIZE = int(os.environ.get("ARCHIVE_ROW_GROUP_SIZE", 10000))
+
+ARCHIVE_FILE = "data.parquet"
+MONTH_DIRECTORY = re.compile(r'^month=(?P<year>\d{4})-(?P<month>\d{2})$')
+
+MEDIA_FIELDS = (
+    ('id', 'int64'),
+    ('media_id', 'string'),
+    ('media_name', 'string'),
+    ('media_type', 'string'),
+    ('media_url', 'string'),
+    ('file_size', 'int64'),
+    ('sensor_box_id', 'int64'),
+    ('created_at', 'timestamp'),
+)
+
+# columns of the archive files, a list is a list column of the type it
+# holds, a tuple of (name, type) a struct column
+SCHEMAS = {
+    'alarm': (
+        ('id', 'int64'),
+        ('event_uid', 'string'),
+        ('created_at', 'timestamp'),
+        ('timestamp', 'timestamp'),
+        ('entity_id', 'int64'),
+        ('entity_uid', 'string'),
+        ('entity_type_id', 'int64'),
+        ('flag_type_id', 'int64'),
+        ('flag_type', 'string'),
+        ('severity_id', 'int64'),
+        ('severity_level', 'int64'),
+        ('severity_unicode_char', 'string'),
+        ('delivery_id', 'string'),
+        ('ack_status', 'bool'),
+        ('feedback_provided', 'bool'),
+        ('is_actual_alarm', 'bool'),
+        ('exclude_from_dashboard', 'bool'),
+        ('value', 'string'),
+        ('numeric_value', 'float64'),
+        ('meta_info', 'string'),
+        ('media', [MEDIA_FIELDS]),
+        ('tags', [(
+            ('name', 'string'),
+            ('tagged_by', 'string'),
+            ('tagged_at', 'timestamp'),
+            ('source', 'string'),
+            ('confidence', 'float64'),
+        )]),
+        ('attrs', [(
+            ('key', 'string'),
+            ('value', 'string'),
+            ('data_type_id', 'int64'),
+        )]),
+        ('feedbacks', [(
+            ('user_id', 'string'),
+            ('is_actual_alarm', 'bool'),
+            ('comment', 'string'),
+            ('rating_id', 'int64'),
+            ('contains_other_object', 'bool'),
+            ('meta_info', 'string'),
+            ('created_at', 'timestamp'),
+            ('updated_at', 'timestamp'),
+        )]),
+    ),
+    'delivery': (
+        ('id', 'int64'),
+        ('delivery_id', 'string'),
+        ('created_at', 'timestamp'),
+        ('delivery_start', 'timestamp'),
+        ('delivery_end', 'timestamp'),
+        ('delivery_status', 'string'),
+        ('delivery_location', 'string'),
+        ('entity_id', 'int64'),
+        ('is_deleted', 'bool'),
+        ('flags', [(
+            ('id', 'int64'),
+            ('flag_type_id', 'int64'),
+            ('severity_id', 'int64'),
+            ('severity_level', 'int64'),
+            ('event_uid', 'string'),
+            ('feedback_provided', 'bool'),
+            ('is_actual_alarm', 'bool'),
+            ('exclude_from_dashboard', 'bool'),
+        )]),
+        ('flag_summaries', [(
+            ('flag_type_id', 'int64'),
+            ('severity_id', 'int64'),
+            ('severity_unicode_char', 'string'),
+        )]),
+        ('erp', [(
+            ('attachment_type_id', 'int64'),
+            ('value', 'string'),
+            ('source_reference', 'string'),
+            ('fetched_at', 'timestamp'),
+            ('created_at', 'timestamp'),
+        )]),
+        ('media', [MEDIA_FIELDS]),
+    ),
+}
+
+# Django lookups of the dashboard filters supported on archived rows: the
+# column they apply to, or (list column, field) for lookups through a
+# relation, which hold if one item of the list matches all of them
+LOOKUP_COLUMNS = {
+    'alarm': {
+        'exclude_from_dashboard': 'exclude_from_dashboard',
+        'entity': 'entity_id',
+        'entity__entity_type': 'entity_type_id',
+        'flag_type': 'flag_type_id',
+        'severity__level': 'severity_level',
+        'numeric_value': 'numeric_value',
+        'media__media_type': ('media', 'media_type'),
+    },
+    'delivery': {
+        'is_deleted': 'is_deleted',
+        'entity': 'entity_id',
+        'flags__flag_type': ('flags', 'flag_type_id'),
+        'flags__severity__level': ('flags', 'severity_level'),
+        'flags__exclude_from_dashboard': ('flags', 'exclude_from_dashboard'),
+    },
+}
+
+OPERATORS = {
+    'exact': operator.eq,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+}
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise ImproperlyConfigured("pyarrow is required to read and write the archive, pip install pyarrow")
+    return pyarrow
+
+def arrow_type(pa, spec):
+    if isinstance(spec, list):
+        return pa.list_(arrow_type(pa, spec[0]))
+    if isinstance(spec, tuple):
+        return pa.struct([(name, arrow_type(pa, field)) for name, field in spec])
+    if spec == 'timestamp':
+        return pa.timestamp('us', tz='UTC')
+    return {'int64': pa.int64(), 'float64': pa.float64(), 'bool': pa.bool_(), 'string': pa.string()}[spec]
+
+def arrow_schema(table:str):
+    pa = load_pyarrow()
+    return pa.schema([(name, arrow_type(pa, spec)) for name, spec in SCHEMAS[table]])
+
+def month_bounds(month:date):
+    """
+    Aware UTC datetimes of the first instant of the month and of the next one.
+    """
+    end = add_months(month, 1)
+    return (
+        datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+        datetime(end.year, end.month, 1, tzinfo=timezone.utc),
+    )
+
+def tenant_directory(table:str, domain:str):
+    return os.path.join(ARCHIVE_ROOT, table, f"tenant={domain}")
+
+def month_path(table:str, domain:str, month:date):
+    return os.path.join(tenant_directory(table, domain), f"month={month.year:04d}-{month.month:02d}", ARCHIVE_FILE)
+
+def archived_months(table:str, domain:str):
+    """
+    Months of the table archived for the tenant, oldest first.
+    """
+    directory = tenant_directory(table, domain)
+    if not os.path.isdir(directory):
+        return []
+
+    months = []
+    for name in os.listdir(directory):
+        match = MONTH_DIRECTORY.match(name)
+        if match and os.path.exists(os.path.join(directory, name, ARCHIVE_FILE)):
+            months.append(date(int(match['year']), int(match['month']), 1))
+    return sorted(months)
+
+def archive_boundary(table:str, domain:str):
+    """
+    Start of the month following the last archived month of the tenant, rows
+    created before it are read from the archive, or None if nothing is archived.
+    """
+    months = archived_months(table, domain)
+    if not months:
+        return None
+    return month_bounds(months[-1])[1]
+
+def write_month(table:str, domain:str, month:date, batches):
+    """
+    Add the records, given in batches of dicts shaped after SCHEMAS, to the
+    archive file of the month. Records already archived under the same id are
+    replaced, so that a month can be archived again after a failed run. The
+    file is written aside and moved in place at once, readers never see a
+    partial file. Returns the number of rows of the file.
+    """
+    pa = load_pyarrow()
+    schema = arrow_schema(table)
+    tables = [pa.Table.from_pylist(batch, schema=schema) for batch in batches if batch]
+    if not tables:
+        return 0
+
+    new = pa.concat_tables(tables)
+    path = month_path(table, domain, month)
+    if os.path.exists(path):
+        archived = pa.parquet.read_table(path, schema=schema)
+        replaced = pa.compute.is_in(archived['id'], value_set=new['id'])
+        new = pa.concat_tables([archived.filter(pa.compute.invert(replaced)), new])
+
+    new = new.sort_by([('created_at', 'descending'), ('id', 'descending')])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{uuid.uuid4().hex}.partial"
+    try:
+        pa.parquet.write_table(new, partial, compression=ARCHIVE_COMPRESSION, row_group_size=ARCHIVE_ROW_GROUP_SIZE)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+    return new.num_rows
+
+class UnsupportedLookup(ValueError):
+    """
+    A filter of the dashboard tables with no column in the archive files,
+    see LOOKUP_COLUMNS.
+    """
+
+def split_lookup(lookup:str):
+    path, _, suffix = lookup.rpartition('__')
+    if path and suffix in OPERATORS:
+        return path, suffix
+    return lookup, 'exact'
+
+def compare(actual, op:str, expected):
+    if isinstance(expected, models.Model):
+        expected = expected.pk
+    if actual is None or expected is None:
+        return op == 'exact' and actual is expected
+    if isinstance(actual, (int, float)) and not isinstance(actual, bool):
+        expected = float(expected)
+    return OPERATORS[op](actual, expected)
+
+def compile_lookups(table:str, lookups):
+    """
+    Split the (lookup, value) pairs into conditions on columns and conditions
+    on the items of list columns. Raises UnsupportedLookup on lookups that
+    cannot be applied to archived rows.
+    """
+    columns = []
+    nested = defaultdict(list)
+    for lookup, value in lookups:
+        path, op = split_lookup(lookup)
+        column = LOOKUP_COLUMNS[table].get(path)
+        if column is None:
+            raise UnsupportedLookup(f"Filter {lookup} is not supported on archived {table} rows")
+        if isinstance(column, tuple):
+            nested[column[0]].append((column[1], op, value))
+        else:
+            columns.append((column, op, value))
+    return columns, dict(nested)
+
+def matches(record:dict, columns, nested):
+    for column, op, value in columns:
+        if not compare(record.get(column), op, value):
+            return False
+    for column, conditions in nested.items():
+        if not any(
+            all(compare(item.get(field), op, value) for field, op, value in conditions)
+            for item in record.get(column) or []
+        ):
+            return False
+    return True
+
+def months_between(table:str, domain:str, from_date:datetime, to_date:datetime):
+    return [
+        month for month in archived_months(table, domain)
+        if month_bounds(month)[1] > from_date and month_bounds(month)[0] <= to_date
+    ]
+
+def row_groups(archive_file, from_date:datetime, to_date:datetime):
+    """
+    Indexes of the row groups of the archive file holding rows created from
+    from_date to to_date, from the created_at statistics of the row groups.
+    """
+    column = archive_file.schema_arrow.get_field_index('created_at')
+    groups = []
+    for index in range(archive_file.metadata.num_row_groups):
+        statistics = archive_file.metadata.row_group(index).column(column).statistics
+        if statistics is not None and statistics.has_min_max and (
+            statistics.max < from_date or statistics.min > to_date
+        ):
+            continue
+        groups.append(index)
+    return groups
+
+def iter_rows(table:str, domain:str, from_date:datetime, to_date:datetime, lookups=(), predicate=None,
+              before=None, columns=None, batch_size:int=ARCHIVE_READ_BATCH_SIZE):
+    """
+    Archived records of the tenant created from from_date to to_date included
+    that match the (lookup, value) pairs, the filters of the dashboard tables,
+    and the predicate, if any, sorted like the tables by (created_at, id)
+    descending. before, a (created_at, id) position, leaves out the records
+    not older than it. columns restricts the records to the columns the
+    predicate reads, the columns of the lookups are always read.
+
+    The archive files are sorted by (created_at, id) descending and read
+    newest month first, batch_size rows at a time: whatever the number of
+    records only a batch is held in memory. Only the files of the months of
+    the range and their row groups within it are read.
+    """
+    if before is not None:
+        to_date = min(to_date, before[0])
+
+    months = months_between(table, domain, from_date, to_date)
+    if not months:
+        return
+
+    pa = load_pyarrow()
+    lookup_columns, nested = compile_lookups(table, lookups)
+    if columns is not None:
+        columns = list(dict.fromkeys([
+            'id', 'created_at', *columns, *(column for column, _, _ in lookup_columns), *nested,
+        ]))
+
+    for month in reversed(months):
+        archive_file = pa.parquet.ParquetFile(month_path(table, domain, month))
+        groups = row_groups(archive_file, from_date, to_date)
+        if not groups:
+            continue
+
+        for batch in archive_file.iter_batches(batch_size=batch_size, row_groups=groups, columns=columns):
+            for record in batch.to_pylist():
+                if not from_date <= record['created_at'] <= to_date:
+                    continue
+                if before is not None and (record['created_at'], record['id']) >= before:
+                    continue
+                if matches(record, lookup_columns, nested) and (predicate is None or predicate(record)):
+                    yield record
+
+def read_page(table:str, domain:str, from_date:datetime, to_date:datetime, lookups=(), predicate=None,
+              offset:int=0, limit:int=None, before=None):
+    """
+    The records of iter_rows from the offset-th on, at most limit of them:
+    the files are read up to the last record of the page only.
+    """
+    records = iter_rows(table, domain, from_date, to_date, lookups, predicate, before=before)
+    return list(itertools.islice(records, offset, None if limit is None else offset + limit))
+
+def count_rows(table:str, domain:str, from_date:datetime, to_date:datetime, lookups=(), predicate=None, columns=()):
+    """
+    Number of the records of iter_rows. Only the columns of the lookups and
+    the columns read by the predicate are read.
+    """
+    return sum(1 for _ in iter_rows(table, domain, from_date, to_date, lookups, predicate, columns=columns))
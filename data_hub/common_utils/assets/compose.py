@@ -0,0 +1,106 @@
+from collections import defaultdict
+from acceptance_control.models import DeliveryMedia, AlarmMedia
+from metadata.models import TableAsset, TableAssetItem
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+class MediaIndex:
+    """
+    Media of one parent (alarm, delivery, video archive, ...) grouped by media
+    type. The media are read with a single query, on first use, instead of one
+    query per asset item.
+    """
+    def __init__(self, queryset):
+        self.queryset = queryset.select_related('media')
+        self._by_type = None
+
+    def _load(self):
+        if self._by_type is None:
+            self._by_type = defaultdict(list)
+            for row in self.queryset:
+                self._by_type[row.media.media_type].append(row.media)
+        return self._by_type
+
+    def get(self, media_type:str):
+        return self._load().get(media_type, [])
+
+    def __len__(self):
+        return sum(len(medias) for medias in self._load().values())
+
+def delivery_item_media(delivery_id):
+    """
+    Media of the items of the delivery asset layout: the items keyed "delivery"
+    show the media of the delivery in sensor box order, the items keyed
+    "impurity" the media of the impurity alarms of the delivery shown on the
+    dashboard, other items have none.
+    """
+    delivery_media = MediaIndex(
+        DeliveryMedia.objects.filter(delivery__delivery_id=delivery_id).order_by('media__sensor_box__order')
+    )
+    impurity_media = MediaIndex(
+        AlarmMedia.objects.filter(
+            alarm__delivery_id=delivery_id,
+            alarm__flag_type__name="impurity",
+            alarm__exclude_from_dashboard=False,
+        )
+    )
+
+    def item_media(item):
+        if "delivery" in item.key:
+            return delivery_media.get(item.media_type)
+        if "impurity" in item.key:
+            return impurity_media.get(item.media_type)
+        return []
+
+    return item_media
+
+def compose_assets(assets, localizer, item_media, account_key:str, placeholder:dict=None, media_types=None):
+    """
+    categories and data of an assets response.
+        - assets: asset layout of the tenant table, see TableConfig.assets
+        - localizer: LocalizationResolver of the language of the response
+        - item_media: function returning the media of an asset item
+        - placeholder: data of the items without media, they are left empty if None
+        - media_types: media types of the items to show, all of them if None
+    """
+    categories = []
+    data = []
+    for table_asset, asset_items in assets:
+        title = localizer.title(TableAsset, table_asset.id, default=table_asset.key)
+        categories.append(
+            {
+                'key': table_asset.key,
+                'name': title,
+            }
+        )
+
+        items = []
+        for item in asset_items:
+            if media_types is not None and item.media_type not in media_types:
+                continue
+
+            medias = item_media(item)
+            items.append(
+                {
+                    'key': item.key,
+                    'title': localizer.title(TableAssetItem, item.id, default=item.name),
+                    'type': item.media_type,
+                    'data': [
+                        {
+                            'url': f"{media.media_url}?{account_key}",
+                            'name': media.media_name,
+                            'time': media.created_at.strftime(DATETIME_FORMAT),
+                        } for media in medias
+                    ] if medias or placeholder is None else [placeholder]
+                },
+            )
+
+        data.append(
+            {
+                "key": table_asset.key,
+                "title": title,
+                "items": items,
+            }
+        )
+
+    return categories, data
@@ -0,0 +1,250 @@
+import math
+import time
+import random
+import asyncio
+import platform
+from datetime import date, datetime, timedelta, timezone
+from django.db import connection
+from tenants.models import Tenant, PlantEntity
+from acceptance_control.models import Alarm, Delivery, DeliveryFlag, Media, FlagType
+from common_utils.db import executor
+
+# event uids and delivery ids sampled per tenant to address the detail routes
+SAMPLE_SIZE = 500
+
+class Targets:
+    """
+    Rows of the synthetic tenants the requests of the scenarios address.
+    """
+    def __init__(self, prefix:str, days:int):
+        self.prefix = prefix
+        self.to_date = date.today() + timedelta(days=1)
+        self.from_date = self.to_date - timedelta(days=days + 1)
+        self.tenants = list(Tenant.objects.filter(domain__startswith=f"{prefix}-").order_by('domain').values_list('domain', flat=True))
+        self.locations = {
+            domain: list(PlantEntity.objects.filter(entity_type__tenant__domain=domain).values_list('entity_uid', flat=True))
+            for domain in self.tenants
+        }
+        self.event_uids = {
+            domain: list(Alarm.objects.filter(tenant__domain=domain).order_by('-id').values_list('event_uid', flat=True)[:SAMPLE_SIZE])
+            for domain in self.tenants
+        }
+        self.delivery_ids = {
+            domain: list(Delivery.objects.filter(tenant__domain=domain).order_by('-id').values_list('delivery_id', flat=True)[:SAMPLE_SIZE])
+            for domain in self.tenants
+        }
+        self.flag_types = list(FlagType.objects.filter(name__startswith=f"{prefix}_").values_list('name', flat=True))
+
+    def dataset(self):
+        return {
+            'tenants': len(self.tenants),
+            'alarms': Alarm.objects.filter(tenant__domain__in=self.tenants).count(),
+            'deliveries': Delivery.objects.filter(tenant__domain__in=self.tenants).count(),
+            'delivery_flags': DeliveryFlag.objects.filter(delivery__tenant__domain__in=self.tenants).count(),
+            'media': Media.objects.filter(media_id__startswith=f"{self.prefix}-").count(),
+        }
+
+    def listing(self, domain:str, rng):
+        return {
+            'tenant_domain': domain,
+            'from_date': self.from_date.isoformat(),
+            'to_date': self.to_date.isoformat(),
+            'page': rng.randint(1, 5),
+        }
+
+class Scenario:
+    """
+    Requests of one kind sent to one of the apps. build(targets, rng, index)
+    returns the keyword arguments of the request: method, url and params or json.
+    """
+    def __init__(self, name:str, app:str, build):
+        self.name = name
+        self.app = app
+        self.build = build
+
+def alarm_payload(targets, rng, domain, event_uid):
+    return {
+        'tenant_domain': domain,
+        'location': rng.choice(targets.locations[domain]),
+        'event_uid': event_uid,
+        'flag_type': rng.choice(targets.flag_types),
+        'severity_level': rng.randint(1, 3),
+        'timestamp': datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+        'meta_info': {'value': str(round(rng.uniform(0, 300), 1))},
+    }
+
+def build_scenarios(run_id:str):
+    def read(url, params):
+        def build(targets, rng, index):
+            domain = rng.choice(targets.tenants)
+            return {'method': 'GET', 'url': url(targets, rng, domain), 'params': params(targets, rng, domain)}
+        return build
+
+    def ingest_alarm(targets, rng, index):
+        domain = rng.choice(targets.tenants)
+        return {'method': 'POST', 'url': '/api/v1/alarm', 'json': alarm_payload(targets, rng, domain, f"{run_id}-a{index}")}
+
+    def ingest_alarm_batch(targets, rng, index):
+        domain = rng.choice(targets.tenants)
+        return {
+            'method': 'POST', 'url': '/api/v1/alarm/batch',
+            'json': [alarm_payload(targets, rng, domain, f"{run_id}-b{index}-{item}") for item in range(50)],
+        }
+
+    def alarm_ack(targets, rng, index):
+        domain = rng.choice(targets.tenants)
+        return {'method': 'POST', 'url': '/api/v1/alarm/live', 'json': {'event_uid': rng.choice(targets.event_uids[domain])}}
+
+    def ingest_delivery(targets, rng, index):
+        domain = rng.choice(targets.tenants)
+        delivery_start = datetime.now(timezone.utc).replace(tzinfo=None)
+        return {
+            'method': 'POST', 'url': '/api/v1/delivery',
+            'json': {
+                'tenant_domain': domain,
+                'delivery_id': f"{run_id}-d{index}",
+                'location': rng.choice(targets.locations[domain]),
+                'delivery_start': delivery_start.isoformat(),
+                'delivery_end': (delivery_start + timedelta(minutes=5)).isoformat(),
+                'delivery_status': 'done',
+            },
+        }
+
+    return [
+        Scenario('alarm_list', 'data_api', read(
+            lambda targets, rng, domain: '/api/v1/alarm',
+            lambda targets, rng, domain: targets.listing(domain, rng),
+        )),
+        Scenario('alarm_list_filtered', 'data_api', read(
+            lambda targets, rng, domain: '/api/v1/alarm',
+            lambda targets, rng, domain: {
+                **targets.listing(domain, rng),
+                'user_filters': f'{{"severity_level": "2", "location": "{rng.choice(targets.locations[domain])}"}}',
+            },
+        )),
+        Scenario('alarm_live', 'data_api', read(
+            lambda targets, rng, domain: '/api/v1/alarm/live',
+            lambda targets, rng, domain: {'tenant_domain': domain, 'severity_level': 1},
+        )),
+        Scenario('alarm_assets', 'data_api', read(
+            lambda targets, rng, domain: f"/api/v1/alarm/assets/{rng.choice(targets.event_uids[domain])}",
+            lambda targets, rng, domain: {},
+        )),
+        Scenario('delivery_list', 'data_api', read(
+            lambda targets, rng, domain: '/api/v1/delivery',
+            lambda targets, rng, domain: targets.listing(domain, rng),
+        )),
+        Scenario('delivery_assets', 'data_api', read(
+            lambda targets, rng, domain: f"/api/v1/delivery/assets/{rng.choice(targets.delivery_ids[domain])}",
+            lambda targets, rng, domain: {},
+        )),
+        Scenario('alarm_metadata', 'data_api', read(
+            lambda targets, rng, domain: '/api/v1/alarm/metadata',
+            lambda targets, rng, domain: {'tenant_domain': domain},
+        )),
+        Scenario('report_delivery', 'data_api', read(
+            lambda targets, rng, domain: f"/api/v1/report/delivery/{rng.choice(targets.delivery_ids[domain])}",
+            lambda targets, rng, domain: {},
+        )),
+        Scenario('feedback_out', 'data_api', read(
+            lambda targets, rng, domain: f"/api/v1/feedback/alarm/out/{rng.choice(targets.event_uids[domain])}",
+            lambda targets, rng, domain: {},
+        )),
+        Scenario('tags', 'data_api', read(
+            lambda targets, rng, domain: '/api/v1/tags',
+            lambda targets, rng, domain: {},
+        )),
+        Scenario('alarm_ack', 'data_api', alarm_ack),
+        Scenario('ingest_alarm', 'events_api', ingest_alarm),
+        Scenario('ingest_alarm_batch', 'events_api', ingest_alarm_batch),
+        Scenario('ingest_delivery', 'events_api', ingest_delivery),
+    ]
+
+def percentile(values, fraction:float):
+    """
+    Nearest rank percentile of sorted values.
+    """
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+def summarize(app:str, latencies, statuses, duration:float):
+    latencies = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        'app': app,
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(latencies) / duration, 2) if duration else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            **{
+                name: round(percentile(latencies, fraction) * 1000, 2) if latencies else None
+                for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+            },
+        },
+    }
+
+async def run_scenario(client, scenario:Scenario, targets:Targets, requests:int, concurrency:int, warmup:int, seed:int):
+    """
+    Send warmup unrecorded requests, then requests with concurrency of them
+    in flight, and summarize their latencies.
+    """
+    rng = random.Random(f"{seed}-{scenario.name}")
+    for index in range(warmup):
+        await client.request(**scenario.build(targets, rng, -index - 1))
+
+    pending = iter(range(requests))
+    latencies, statuses = [], {}
+
+    async def worker():
+        for index in pending:
+            request = scenario.build(targets, rng, index)
+            before = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - before)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    before = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(scenario.app, latencies, statuses, time.perf_counter() - before)
+
+def build_report(targets:Targets, options:dict, results:dict):
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'db_threadpool_size': executor.DB_THREADPOOL_SIZE,
+        },
+        'options': options,
+        'dataset': targets.dataset(),
+        'scenarios': results,
+    }
+
+def compare_reports(baseline:dict, report:dict):
+    """
+    Change of the throughput and latency percentiles of each scenario run in
+    both reports, in percent of the baseline: [(scenario, {metric: change}), ...].
+    """
+    comparison = []
+    for name, result in report['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+
+        metrics = {
+            'throughput_rps': (before['throughput_rps'], result['throughput_rps']),
+            **{
+                f"{key}_ms": (before['latency_ms'][key], result['latency_ms'][key])
+                for key in ('p50', 'p95', 'p99')
+            },
+        }
+        comparison.append((name, {
+            metric: round((new - old) / old * 100, 1) if old and new is not None else None
+            for metric, (old, new) in metrics.items()
+        }))
+
+    return comparison
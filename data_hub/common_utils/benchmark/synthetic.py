@@ -0,0 +1,363 @@
+import random
+import zoneinfo
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from tenants.models import (
+    Tenant,
+    EntityType,
+    PlantEntity,
+    SensorBox,
+    TenantStorageSettings,
+)
+from acceptance_control.models import (
+    Media,
+    MediaKey,
+    Alarm,
+    AlarmKey,
+    AlarmMedia,
+    Delivery,
+    DeliveryFlag,
+    DeliveryMedia,
+    FlagType,
+    FlagTypeLocalization,
+    Severity,
+    TenantFlagDeployment,
+)
+from common_utils.delivery_flags.summary import refresh_flag_summaries
+from common_utils.stats.rollup import rebuild_stats
+from common_utils.partitions.keys import claim_unique
+from metadata.models import (
+    Language,
+    PlantEntityLocalization,
+    TableType,
+    TenantTable,
+    FieldOrder,
+    TableFilter,
+    FilterLocalization,
+    TenantTableFilter,
+    TableAsset,
+    TableAssetLocalization,
+    TableAssetItem,
+    TableAssetItemLocalization,
+    TenantTableAsset,
+    TenantTableAssetItem,
+    DataType,
+    FormField,
+    FormFieldLocalization,
+    FeedbackForm,
+    FeedbackFormField,
+    FeedbackFormFieldItem,
+    FeedbackFormFieldItemLocalization,
+    TenantFeedbackForm,
+    TagGroup,
+    TagGroupLocalization,
+    Tag,
+    TagLocalization,
+)
+
+# rows built in memory and inserted per transaction
+CHUNK_SIZE = 5000
+
+LANGUAGE_NAMES = {'de': 'German', 'en': 'English', 'fr': 'French', 'es': 'Spanish'}
+FLAG_TYPES = ('impurity', 'hotspot', 'dust', 'overfill')
+SEVERITIES = ((1, '#00FF00', '🟩'), (2, '#FFFF00', '🟨'), (3, '#FF0000', '🟥'))
+ENTITY_TYPE = 'gate'
+SENSOR_BOX_LOCATIONS = ('front', 'top')
+TABLE_TYPES = ('alarm', 'delivery', 'video_archive')
+TABLE_FILTERS = ('location', 'flag_type', 'severity_level')
+# asset layout of the tables: (asset key, ((item key, media type), ...)), the
+# item keys select the media of the delivery or of its alarms, see assets.compose
+TABLE_ASSETS = (
+    ('delivery_assets', (('delivery_snapshots', 'image'), ('delivery_videos', 'video'))),
+    ('impurity_assets', (('impurity_snapshots', 'image'), ('impurity_videos', 'video'))),
+)
+# form of the alarm feedback: (field name, data type, ((item key, color), ...))
+FEEDBACK_FORM = 'alarm'
+FEEDBACK_FIELDS = (
+    ('decision', 'enum', (('accepted', '#00FF00'), ('rejected', '#FF0000'))),
+    ('comment', 'text', ()),
+)
+# tags offered with the feedback: (group, (tag, ...))
+TAG_GROUPS = (('material', ('plastic', 'metal')),)
+
+class ReferenceData:
+    """
+    Rows shared by the synthetic tenants: languages, flag types with their
+    severities, table types, filters, assets, the alarm feedback form, tags
+    and their localizations.
+    """
+    def __init__(self, prefix:str, language_codes):
+        self.prefix = prefix
+        self.languages = [
+            Language.objects.get_or_create(code=code, defaults={'name': LANGUAGE_NAMES.get(code, code)})[0]
+            for code in language_codes
+        ]
+        self.field_orders = [
+            FieldOrder.objects.get_or_create(field_position=position)[0] for position in range(len(TABLE_FILTERS))
+        ]
+
+        self.flag_types = []
+        self.severities = {}
+        for name in FLAG_TYPES:
+            flag_type, _ = FlagType.objects.get_or_create(name=f"{prefix}_{name}")
+            self.localize(FlagTypeLocalization, 'flag_type', flag_type, title=name.title())
+            for level, color_code, unicode_char in SEVERITIES:
+                self.severities[(flag_type.id, level)], _ = Severity.objects.get_or_create(
+                    flag_type=flag_type, level=level,
+                    defaults={'color_code': color_code, 'unicode_char': unicode_char},
+                )
+            self.flag_types.append(flag_type)
+
+        self.table_types = {}
+        for name in TABLE_TYPES:
+            table_type = TableType.objects.filter(name=name).order_by('id').first()
+            self.table_types[name] = table_type or TableType.objects.create(name=name)
+
+        self.table_filters = []
+        for name in TABLE_FILTERS:
+            table_filter, _ = TableFilter.objects.get_or_create(filter_name=name, defaults={'type': 'enum'})
+            self.localize(FilterLocalization, 'table_filter', table_filter, title=name.replace('_', ' ').title())
+            self.table_filters.append(table_filter)
+
+        self.table_assets = []
+        for key, items in TABLE_ASSETS:
+            table_asset, _ = TableAsset.objects.get_or_create(key=f"{prefix}_{key}")
+            self.localize(TableAssetLocalization, 'asset', table_asset, title=key.replace('_', ' ').title())
+            asset_items = []
+            for item_key, media_type in items:
+                asset_item, _ = TableAssetItem.objects.get_or_create(
+                    asset=table_asset, key=item_key, defaults={'media_type': media_type, 'name': item_key},
+                )
+                self.localize(TableAssetItemLocalization, 'asset_item', asset_item, title=item_key.replace('_', ' ').title())
+                asset_items.append(asset_item)
+            self.table_assets.append((table_asset, asset_items))
+
+        self.feedback_form = FeedbackForm.objects.filter(name=FEEDBACK_FORM).order_by('id').first()
+        if self.feedback_form is None:
+            self.feedback_form = FeedbackForm.objects.create(name=FEEDBACK_FORM)
+            for (name, data_type, items), field_order in zip(FEEDBACK_FIELDS, self.field_orders):
+                form_field = FormField.objects.create(
+                    name=f"{prefix}_{name}", type=DataType.objects.get_or_create(type=data_type)[0],
+                )
+                self.localize(FormFieldLocalization, 'field', form_field, title=name.title())
+                FeedbackFormField.objects.create(form=self.feedback_form, form_field=form_field, field_order=field_order)
+                for (item_key, color), item_order in zip(items, self.field_orders):
+                    field_item = FeedbackFormFieldItem.objects.create(
+                        field=form_field, item_key=item_key, color=color, field_order=item_order,
+                    )
+                    self.localize(FeedbackFormFieldItemLocalization, 'field_item', field_item, title=item_key.title())
+
+        for group_name, tag_names in TAG_GROUPS:
+            tag_group, _ = TagGroup.objects.get_or_create(name=f"{prefix}_{group_name}")
+            self.localize(TagGroupLocalization, 'tag_group', tag_group, name=group_name.title())
+            for tag_name in tag_names:
+                tag, _ = Tag.objects.get_or_create(name=f"{prefix}_{tag_name}", defaults={'group': tag_group})
+                self.localize(TagLocalization, 'tag', tag, name=tag_name.title())
+
+    def localize(self, localization_model, foreign_key, row, **fields):
+        for language in self.languages:
+            localization_model.objects.get_or_create(
+                **{foreign_key: row, 'language': language},
+                defaults={name: f"{value} ({language.code})" for name, value in fields.items()},
+            )
+
+    def severity(self, rng, flag_type):
+        return self.severities[(flag_type.id, rng.choice(SEVERITIES)[0])]
+
+def create_tenant(reference:ReferenceData, domain:str, entities:int):
+    """
+    Tenant with its storage settings, entities, sensor boxes, deployed flag
+    types and table configurations. Returns the tenant and its entities.
+    """
+    tenant = Tenant.objects.create(
+        tenant_id=domain,
+        tenant_name=domain,
+        location='benchmark',
+        domain=domain,
+        default_language=reference.languages[0].code,
+        timezone='Europe/Berlin',
+    )
+    TenantStorageSettings.objects.create(tenant=tenant, provider_name='azure', account_name=domain, account_key='sv=benchmark')
+    entity_type = EntityType.objects.create(tenant=tenant, entity_type=ENTITY_TYPE)
+
+    plant_entities = []
+    for index in range(entities):
+        plant_entity = PlantEntity.objects.create(
+            entity_type=entity_type, entity_uid=f"gate{index:02d}", description=f"Gate {index}",
+        )
+        reference.localize(PlantEntityLocalization, 'plant_entity', plant_entity, title=f"Gate {index}")
+        for order, location in enumerate(SENSOR_BOX_LOCATIONS):
+            SensorBox.objects.create(
+                plant_entity=plant_entity, sensor_box_name=f"{plant_entity.entity_uid}_{location}",
+                sensor_box_location=location, order=order,
+            )
+        plant_entities.append(plant_entity)
+
+    for flag_type in reference.flag_types:
+        TenantFlagDeployment.objects.create(tenant=tenant, flag_type=flag_type)
+
+    TenantFeedbackForm.objects.create(tenant=tenant, feedback_form=reference.feedback_form)
+
+    for table_type in reference.table_types.values():
+        tenant_table = TenantTable.objects.create(tenant=tenant, table_type=table_type)
+        for table_filter, field_order in zip(reference.table_filters, reference.field_orders):
+            TenantTableFilter.objects.create(table_filter=table_filter, tenant_table=tenant_table, field_order=field_order)
+
+        for (table_asset, asset_items), field_order in zip(reference.table_assets, reference.field_orders):
+            tenant_asset = TenantTableAsset.objects.create(table_asset=table_asset, tenant_table=tenant_table, field_order=field_order)
+            for asset_item in asset_items:
+                TenantTableAssetItem.objects.create(tenant_table_asset=tenant_asset, asset_item=asset_item)
+
+    return tenant, plant_entities
+
+def chunks(count:int, size:int=CHUNK_SIZE):
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+def media(media_id:str, media_type:str, sensor_box=None):
+    extension = 'jpg' if media_type == 'image' else 'mp4'
+    return Media(
+        media_id=media_id,
+        media_name=f"{media_id}.{extension}",
+        media_type=media_type,
+        media_url=f"https://benchmark.blob.core.windows.net/media/{media_id}.{extension}",
+        sensor_box=sensor_box,
+    )
+
+def ids_of(model, field:str, keys):
+    return dict(model.objects.filter(**{f"{field}__in": keys}).values_list(field, 'id'))
+
+def generate_deliveries(reference:ReferenceData, rng, tenant, plant_entities, count:int, max_flags:int, days:int):
+    """
+    Deliveries of the tenant spread over the last days, each with up to
+    max_flags flags and one image per sensor box of its entity.
+    Returns the delivery ids.
+    """
+    sensor_boxes = {}
+    for sensor_box in SensorBox.objects.filter(plant_entity__in=plant_entities):
+        sensor_boxes.setdefault(sensor_box.plant_entity_id, []).append(sensor_box)
+
+    now = timezone.now()
+    delivery_ids = []
+    for indexes in chunks(count):
+        deliveries, medias, flags = [], [], []
+        for index in indexes:
+            plant_entity = rng.choice(plant_entities)
+            delivery_start = now - timedelta(seconds=rng.uniform(0, days * 86400))
+            delivery = Delivery(
+                tenant=tenant,
+                entity=plant_entity,
+                delivery_id=f"{tenant.domain}-d{index:08d}",
+                delivery_start=delivery_start,
+                delivery_end=delivery_start + timedelta(seconds=rng.randint(30, 900)),
+                delivery_status='done',
+                delivery_location=plant_entity.entity_uid,
+            )
+            deliveries.append(delivery)
+            for sensor_box in sensor_boxes[plant_entity.id]:
+                medias.append((delivery.delivery_id, media(f"{delivery.delivery_id}-{sensor_box.sensor_box_location}", 'image', sensor_box)))
+            for _ in range(rng.randint(0, max_flags)):
+                flag_type = rng.choice(reference.flag_types)
+                flags.append((delivery.delivery_id, flag_type, reference.severity(rng, flag_type)))
+
+        with transaction.atomic():
+            Delivery.objects.bulk_create(deliveries)
+            Media.objects.bulk_create([row for _, row in medias])
+            claim_unique(MediaKey, [row.media_id for _, row in medias], {row.media_id: row.created_at for _, row in medias})
+            keys = [delivery.delivery_id for delivery in deliveries]
+            delivery_pks = ids_of(Delivery, 'delivery_id', keys)
+            media_pks = ids_of(Media, 'media_id', [row.media_id for _, row in medias])
+            delivery_starts = {delivery.delivery_id: delivery.delivery_start for delivery in deliveries}
+            DeliveryMedia.objects.bulk_create([
+                DeliveryMedia(
+                    delivery_id=delivery_pks[delivery_id], media_id=media_pks[row.media_id],
+                    created_at=delivery_starts[delivery_id],
+                )
+                for delivery_id, row in medias
+            ])
+            DeliveryFlag.objects.bulk_create([
+                DeliveryFlag(delivery_id=delivery_pks[delivery_id], flag_type=flag_type, severity=severity)
+                for delivery_id, flag_type, severity in flags
+            ])
+            refresh_flag_summaries(delivery_pks.values())
+            # created_at is set on insert, move it to the time of the delivery
+            Delivery.objects.filter(delivery_id__in=keys).update(created_at=F('delivery_start'))
+
+        delivery_ids.extend(keys)
+
+    return delivery_ids
+
+def generate_alarms(reference:ReferenceData, rng, tenant, plant_entities, count:int, delivery_ids, days:int):
+    """
+    Alarms of the tenant spread over the last days, each with an image and
+    every fourth with a video, attached to one of the deliveries.
+    """
+    now = timezone.now()
+    for indexes in chunks(count):
+        alarms, medias = [], []
+        for index in indexes:
+            flag_type = rng.choice(reference.flag_types)
+            value = round(rng.uniform(0, 300), 1)
+            alarm = Alarm(
+                tenant=tenant,
+                entity=rng.choice(plant_entities),
+                flag_type=flag_type,
+                severity=reference.severity(rng, flag_type),
+                timestamp=now - timedelta(seconds=rng.uniform(0, days * 86400)),
+                event_uid=f"{tenant.domain}-a{index:08d}",
+                delivery_id=rng.choice(delivery_ids) if delivery_ids else None,
+                ack_status=rng.random() < 0.5,
+                value=str(value),
+                numeric_value=value,
+            )
+            alarms.append(alarm)
+            medias.append((alarm.event_uid, media(f"{alarm.event_uid}-image", 'image')))
+            if index % 4 == 0:
+                medias.append((alarm.event_uid, media(f"{alarm.event_uid}-video", 'video')))
+
+        with transaction.atomic():
+            Alarm.objects.bulk_create(alarms)
+            Media.objects.bulk_create([row for _, row in medias])
+            keys = [alarm.event_uid for alarm in alarms]
+            claim_unique(AlarmKey, keys, {alarm.event_uid: alarm.timestamp for alarm in alarms})
+            claim_unique(MediaKey, [row.media_id for _, row in medias], {row.media_id: row.created_at for _, row in medias})
+            alarm_pks = ids_of(Alarm, 'event_uid', keys)
+            media_pks = ids_of(Media, 'media_id', [row.media_id for _, row in medias])
+            timestamps = {alarm.event_uid: alarm.timestamp for alarm in alarms}
+            AlarmMedia.objects.bulk_create([
+                AlarmMedia(alarm_id=alarm_pks[event_uid], media_id=media_pks[row.media_id], created_at=timestamps[event_uid])
+                for event_uid, row in medias
+            ])
+            # created_at is set on insert, move it to the time of the alarm
+            Alarm.objects.filter(event_uid__in=keys).update(created_at=F('timestamp'))
+
+def generate_dataset(prefix:str='bench', tenants:int=2, entities:int=4, alarms:int=10000, deliveries:int=2000,
+                     max_flags:int=2, days:int=30, languages=('de', 'en'), seed:int=0, log=print):
+    """
+    Synthetic tenants {prefix}-000, {prefix}-001, ... with their entities,
+    alarms, deliveries, delivery flags, media and localizations in every
+    language. The same arguments generate the same rows; tenants that
+    already exist are kept as they are.
+    """
+    reference = ReferenceData(prefix, languages)
+    for index in range(tenants):
+        domain = f"{prefix}-{index:03d}"
+        if Tenant.objects.filter(domain=domain).exists():
+            log(f"{domain} exists, kept")
+            continue
+
+        rng = random.Random(f"{seed}-{domain}")
+        with transaction.atomic():
+            tenant, plant_entities = create_tenant(reference, domain, entities)
+
+        delivery_ids = generate_deliveries(reference, rng, tenant, plant_entities, deliveries, max_flags, days)
+        log(f"{domain}: {len(delivery_ids)} deliveries")
+        generate_alarms(reference, rng, tenant, plant_entities, alarms, delivery_ids, days)
+        log(f"{domain}: {alarms} alarms")
+        # the rows are bulk inserted, the daily stats are computed once at the end
+        today = timezone.localdate(timezone=zoneinfo.ZoneInfo(tenant.timezone))
+        rebuild_stats(tenant, today - timedelta(days=days + 1), today)
+
+    return reference
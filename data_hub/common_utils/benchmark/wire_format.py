@@ -0,0 +1,71 @@
+import time
+from datetime import datetime, timezone
+from kombu.serialization import dumps, loads
+from events_api.schemas.alarm import AlarmRequest
+from events_api.schemas.delivery import DeliveryRequest
+from events_api.config.wire_format import register_serializer, encode_payload
+
+# task bodies serialized and read back per measure
+WIRE_FORMAT_MESSAGES = 5000
+
+def sample_requests():
+    """
+    Typical request models of the ingest routes, by name.
+    """
+    return {
+        "alarm": AlarmRequest(
+            tenant_domain="tenant-000",
+            location="gate-01",
+            event_uid="8a0f6c1e-3f7b-4d3c-9b61-0b2c5f1f3a10",
+            flag_type="long_object",
+            severity_level=2,
+            timestamp=datetime(2026, 10, 18, 8, 30, tzinfo=timezone.utc),
+            delivery_id="delivery-000123",
+            meta_info={"length": 2.4, "unit": "m"},
+        ),
+        "delivery": DeliveryRequest(
+            tenant_domain="tenant-000",
+            delivery_id="delivery-000123",
+            location="gate-01",
+            delivery_start=datetime(2026, 10, 18, 8, 20, tzinfo=timezone.utc),
+            delivery_end=datetime(2026, 10, 18, 8, 40, tzinfo=timezone.utc),
+        ),
+    }
+
+def task_body(payload):
+    """
+    Body of a protocol 2 task message carrying the payload: args, kwargs and
+    the embedded options.
+    """
+    return [[payload], {}, {"callbacks": None, "errbacks": None, "chain": None, "chord": None}]
+
+def measure(serializer, body, messages=WIRE_FORMAT_MESSAGES):
+    """
+    Size in bytes of the body serialized with serializer, and the messages per
+    second written and read back, as the events API and the workers do.
+    """
+    start = time.perf_counter()
+    for _ in range(messages):
+        content_type, content_encoding, data = dumps(body, serializer=serializer)
+    enqueue = messages / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(messages):
+        loads(data, content_type, content_encoding, accept=[content_type])
+    dequeue = messages / (time.perf_counter() - start)
+
+    return len(data), enqueue, dequeue
+
+def compare_wire_formats(messages=WIRE_FORMAT_MESSAGES):
+    """
+    The orjson envelope of encode_payload against the pickled request models
+    it replaced, per sample request: (name, pickled, encoded) with the
+    measures of each.
+    """
+    register_serializer()
+    for name, request in sample_requests().items():
+        yield (
+            name,
+            measure("pickle", task_body(request), messages),
+            measure("orjson", task_body(encode_payload(request)), messages),
+        )
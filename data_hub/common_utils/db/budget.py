@@ -0,0 +1,59 @@
+import os
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# gunicorn workers of the data API and of the admin, keep in line with the -w
+# of their programs in supervisord.conf
+DATA_API_WORKERS = int(os.environ.get("DATA_API_WORKERS", 4))
+ADMIN_WORKERS = int(os.environ.get("ADMIN_WORKERS", 4))
+# LISTEN connection of a process, shared by its channels: the live feed and
+# the cache invalidations, see common_utils.live_feed.channel
+LISTENER_CONNECTIONS = 1
+# celery workers started with the default concurrency, and those started with
+# --concurrency=1 (video_archive, partitions), see supervisord.conf
+CELERY_QUEUE_WORKERS = 5
+CELERY_SINGLE_WORKERS = 2
+
+def connection_budget():
+    """
+    Database connections the deployment of supervisord.conf may hold open at
+    once, per program. Every thread that ran a unit of work keeps its
+    connection for CONN_MAX_AGE seconds, so the bound is the number of
+    threads, not the traffic:
+        - data_api: per worker, the database threadpool, the exports and the
+          listeners
+        - admin: one per sync gunicorn worker
+        - celery: per prefork child, its tasks and the listener of the
+          reference cache
+    The events API and beat do not use the database.
+    """
+    from common_utils.db.executor import DB_THREADPOOL_SIZE
+    from common_utils.export.stream import EXPORT_CONCURRENCY
+    from events_api.config.celery_config import BaseConfig
+
+    return {
+        "data_api": DATA_API_WORKERS * (DB_THREADPOOL_SIZE + EXPORT_CONCURRENCY + LISTENER_CONNECTIONS),
+        "admin": ADMIN_WORKERS,
+        "celery": (CELERY_QUEUE_WORKERS * BaseConfig.CELERY_WORKER_CONCURRENCY + CELERY_SINGLE_WORKERS) * (1 + LISTENER_CONNECTIONS),
+    }
+
+@register()
+def check_connection_budget(app_configs, **kwargs):
+    """
+    Warn when the connections of connection_budget do not fit in the
+    DATABASE_MAX_CONNECTIONS of the database server.
+    """
+    budget = connection_budget()
+    total = sum(budget.values())
+    if total <= settings.DATABASE_MAX_CONNECTIONS:
+        return []
+
+    detail = ", ".join(f"{name} {count}" for name, count in budget.items())
+    return [
+        Warning(
+            f"The deployment may hold {total} database connections ({detail}), "
+            f"over DATABASE_MAX_CONNECTIONS={settings.DATABASE_MAX_CONNECTIONS}.",
+            hint="Lower DB_THREADPOOL_SIZE, EXPORT_CONCURRENCY or CELERY_WORKER_CONCURRENCY, or raise max_connections of the database server.",
+            id="db.W001",
+        )
+    ]
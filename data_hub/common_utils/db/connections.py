@@ -0,0 +1,107 @@
+import os
+import threading
+from contextlib import contextmanager
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+
+class ConnectionStats:
+    """
+    Counters of the database connections of the process:
+        - opened: connections established
+        - closed: connections closed past CONN_MAX_AGE or found unusable
+        - units: units of work (requests, tasks) run
+        - reused: units of work started on an already open connection
+        - in_use: units of work running
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.closed = 0
+        self.units = 0
+        self.reused = 0
+        self.in_use = 0
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "opened": self.opened,
+                "closed": self.closed,
+                "units": self.units,
+                "reused": self.reused,
+                "in_use": self.in_use,
+            }
+
+connection_stats = ConnectionStats()
+
+def count_connection(sender, connection, **kwargs):
+    connection_stats.add(opened=1)
+
+connection_created.connect(count_connection, dispatch_uid="common_utils.db.connections")
+
+def close_old_connections():
+    """
+    Same as django.db.close_old_connections, closing the connections of this
+    thread that are past their CONN_MAX_AGE or in an unusable state, and
+    counting them.
+    """
+    closed = 0
+    for connection in connections.all(initialized_only=True):
+        was_open = connection.connection is not None
+        connection.close_if_unusable_or_obsolete()
+        if was_open and connection.connection is None:
+            closed += 1
+
+    if closed:
+        connection_stats.add(closed=closed)
+
+def begin_unit():
+    close_old_connections()
+    reused = connections[DEFAULT_DB_ALIAS].connection is not None
+    connection_stats.add(units=1, reused=int(reused), in_use=1)
+
+def end_unit():
+    connection_stats.add(in_use=-1)
+    close_old_connections()
+
+@contextmanager
+def managed_connection():
+    """
+    Run a unit of work (a request, a task) on the persistent connection of the
+    current thread, the way Django does around a request: the connection is
+    kept open between units of work for CONN_MAX_AGE seconds, checked before
+    reuse when CONN_HEALTH_CHECKS is set, and replaced when it went bad.
+    """
+    begin_unit()
+    try:
+        yield
+    finally:
+        end_unit()
+
+def setup_celery_connections(celery_app):
+    """
+    Keep the connection of each Celery worker process open across tasks
+    instead of connecting for every task. Prefork children drop the
+    connections inherited from the parent through the Django fixup of Celery.
+    """
+    from celery import signals
+
+    # the Django fixup of Celery closes the connection around every task
+    # unless told to reuse it, CONN_MAX_AGE decides when it is closed instead
+    celery_app.conf.update(CELERY_DB_REUSE_MAX=int(os.environ.get("CELERY_DB_REUSE_MAX", 1000)))
+
+    # eager tasks run inside the unit of work of their caller
+    @signals.task_prerun.connect(weak=False)
+    def task_begin(task=None, **kwargs):
+        if not getattr(task.request, 'is_eager', False):
+            begin_unit()
+
+    @signals.task_postrun.connect(weak=False)
+    def task_end(task=None, **kwargs):
+        if not getattr(task.request, 'is_eager', False):
+            end_unit()
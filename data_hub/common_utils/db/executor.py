@@ -0,0 +1,91 @@
+import os
+import inspect
+import functools
+import anyio
+from common_utils.db.connections import managed_connection
+
+# threads the route handlers run their blocking ORM code in, in place of
+# Starlette's threadpool: the handlers stay synchronous, the limiter only
+# bounds how many requests of a process hold a database connection at once.
+# Every gunicorn worker of the data API has its own, see common_utils.db.budget
+DB_THREADPOOL_SIZE = int(os.environ.get("DB_THREADPOOL_SIZE", 10))
+
+_limiter = None
+
+def db_limiter():
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(DB_THREADPOOL_SIZE)
+    return _limiter
+
+def _run(func, *args, **kwargs):
+    with managed_connection():
+        return func(*args, **kwargs)
+
+async def run_db(func, *args, **kwargs):
+    """
+    Run the blocking ORM code func in a worker thread of the database
+    threadpool and await its result, without blocking the event loop.
+
+    The whole unit of work runs in one thread, with the connection of that
+    thread: Django's async queryset methods (aget, afirst, ...) would instead
+    send every query of every request through a single shared thread.
+    The connection is kept open across units of work, see managed_connection.
+    """
+    return await run_limited(db_limiter(), func, *args, **kwargs)
+
+async def run_limited(limiter, func, *args, **kwargs):
+    """
+    Run func like run_db, in a worker thread taken from limiter instead of
+    the database threadpool, e.g. for long units of work that must not hold
+    the threads of the requests.
+    """
+    return await anyio.to_thread.run_sync(
+        functools.partial(_run, func, *args, **kwargs), limiter=limiter,
+    )
+
+def db_handler(func):
+    """
+    Run a synchronous route handler on the database threadpool instead of
+    Starlette's threadpool, see run_db. The handler keeps its blocking ORM
+    code: at the same size this adds no concurrency, it bounds the threads
+    holding a database connection and runs each request inside
+    managed_connection. The signature is kept for FastAPI.
+
+        @router.api_route("/alarm", methods=["GET"])
+        @db_handler
+        def get_alarm_data(response: Response, tenant_domain:str):
+            ...
+    """
+    @functools.wraps(func)
+    async def handler(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+
+    return handler
+
+def wrap_routes(router):
+    """
+    Wrap every synchronous handler of the router in db_handler, those of the
+    routers it includes as well.
+    """
+    for route in router.routes:
+        included = getattr(route, 'original_router', None)
+        if included is not None:
+            wrap_routes(included)
+            continue
+
+        endpoint = getattr(route, 'endpoint', None)
+        if endpoint is not None and not inspect.iscoroutinefunction(endpoint):
+            route.endpoint = db_handler(endpoint)
+
+def include_router(app, router):
+    """
+    Include the routes of the router into the app like app.include_router,
+    with every synchronous handler wrapped in db_handler: all the routes of
+    the app run their ORM work on the database threadpool, inside
+    managed_connection, whether or not their module applied db_handler.
+    Handlers defined async, e.g. the live stream, run their ORM work through
+    run_db themselves.
+    """
+    wrap_routes(router)
+    app.include_router(router)
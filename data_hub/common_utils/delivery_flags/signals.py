@@ -0,0 +1,11 @@
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from acceptance_control.models import DeliveryFlag
+from common_utils.delivery_flags.summary import refresh_flag_summaries
+
+# flags created with bulk_create send no signal, their summaries are refreshed
+# by the caller, see events_api.tasks.delivery_flag
+@receiver(post_save, sender=DeliveryFlag)
+@receiver(post_delete, sender=DeliveryFlag)
+def refresh_delivery_flag_summary(sender, instance, **kwargs):
+    refresh_flag_summaries([instance.delivery_id])
@@ -0,0 +1,42 @@
+from django.db import transaction
+from acceptance_control.models import Delivery, DeliveryFlag, DeliveryFlagSummary
+
+def worst_flags(delivery_ids):
+    """
+    {(delivery id, flag type id): severity id} of the worst flag of each type
+    of the deliveries, flags excluded from the dashboard left out. Among flags
+    of the same level the last stored one wins.
+    """
+    worst = {}
+    for delivery_id, flag_type_id, severity_id, level in DeliveryFlag.objects.filter(
+        delivery_id__in=delivery_ids,
+        exclude_from_dashboard=False,
+    ).order_by('id').values_list('delivery_id', 'flag_type_id', 'severity_id', 'severity__level'):
+        key = (delivery_id, flag_type_id)
+        if key not in worst or level >= worst[key][1]:
+            worst[key] = (severity_id, level)
+
+    return {key: severity_id for key, (severity_id, _) in worst.items()}
+
+def refresh_flag_summaries(delivery_ids):
+    """
+    Recompute the DeliveryFlagSummary rows of the deliveries from their flags.
+    The deliveries are locked for the time of the refresh, so concurrent
+    refreshes of a delivery are applied one after the other and the last one
+    sees the flags committed by the others. Call it in the transaction that
+    changes the flags. Returns the number of summary rows written.
+    """
+    delivery_ids = set(delivery_ids)
+    if not delivery_ids:
+        return 0
+
+    with transaction.atomic():
+        list(Delivery.objects.select_for_update().filter(id__in=delivery_ids).values_list('id', flat=True))
+        summaries = [
+            DeliveryFlagSummary(delivery_id=delivery_id, flag_type_id=flag_type_id, severity_id=severity_id)
+            for (delivery_id, flag_type_id), severity_id in worst_flags(delivery_ids).items()
+        ]
+        DeliveryFlagSummary.objects.filter(delivery_id__in=delivery_ids).delete()
+        DeliveryFlagSummary.objects.bulk_create(summaries)
+
+    return len(summaries)
@@ -0,0 +1,119 @@
+import io
+import os
+import csv
+import json
+import asyncio
+import contextlib
+import anyio
+from fastapi.responses import StreamingResponse
+from common_utils.db.executor import run_limited
+
+# rows read from the database at once by an export, the media, tags and
+# other related rows of the rows are loaded per chunk
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+# encoded chunks waiting for a slow client before the export is paused
+EXPORT_BUFFERED_CHUNKS = int(os.environ.get("EXPORT_BUFFERED_CHUNKS", 2))
+# exports streamed at the same time per process, each holds a thread and a
+# database connection until its client has read the whole file; further
+# exports wait for one to end. They do not use the database threadpool of
+# the requests, see common_utils.db.executor
+EXPORT_CONCURRENCY = int(os.environ.get("EXPORT_CONCURRENCY", 4))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return "; ".join(str(item) for item in value)
+    return value
+
+def encode_csv(rows, columns, header:bool=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([[csv_value(row.get(column)) for column in columns] for row in rows])
+    return buffer.getvalue()
+
+def encode_ndjson(rows):
+    return "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+
+def encoded_chunks(chunks, export_format:str, columns):
+    """
+    The lists of rows of chunks encoded in the export format, the CSV header first.
+    """
+    if export_format == "csv":
+        yield encode_csv([], columns, header=True)
+        for rows in chunks:
+            yield encode_csv(rows, columns)
+    else:
+        for rows in chunks:
+            yield encode_ndjson(rows)
+
+_limiter = None
+
+def export_limiter():
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(EXPORT_CONCURRENCY)
+    return _limiter
+
+def pump(chunks, send):
+    # closed in this thread, with the connection of its cursors
+    with contextlib.closing(chunks):
+        for chunk in chunks:
+            if chunk:
+                anyio.from_thread.run(send.send, chunk)
+
+async def stream_chunks(chunks):
+    """
+    Async iterator over the chunks of text of the generator chunks, run in
+    a thread of the exports, see EXPORT_CONCURRENCY. The generator runs in
+    one worker thread from its first row to its last, on one connection,
+    which the server-side cursors of QuerySet.iterator require.
+
+    At most EXPORT_BUFFERED_CHUNKS chunks wait for the client, the generator
+    is paused meanwhile. A client leaving stops it at its next chunk.
+    """
+    send, receive = anyio.create_memory_object_stream(max_buffer_size=EXPORT_BUFFERED_CHUNKS)
+
+    async def produce():
+        with send:
+            await run_limited(export_limiter(), pump, chunks, send)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        with receive:
+            async for chunk in receive:
+                yield chunk
+    finally:
+        receive.close()
+        try:
+            await producer
+        except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+            pass
+
+def export_response(chunks, export_format:str, columns, filename:str):
+    """
+    StreamingResponse of the rows of chunks, a generator of lists of row
+    dicts, as a CSV file with the columns or as newline delimited JSON.
+    """
+    return StreamingResponse(
+        stream_chunks(encoded_chunks(chunks, export_format, columns)),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
+
+def chunked(iterable, size:int=EXPORT_CHUNK_SIZE):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
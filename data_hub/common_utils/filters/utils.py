@@ -1,5 +1,18 @@
 
 import re
+import math
+
+def parse_numeric_value(value):
+    """
+    Numeric representation of an alarm value, None if it is not a finite number.
+    """
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
 
 def map_value_range(value:str):
     value = value.strip().lower()
@@ -10,8 +23,8 @@ def map_value_range(value:str):
         lower = int(range_match.group(1)) / 100
         upper = int(range_match.group(2)) / 100
         return [
-            ("value__gte", lower),
-            ("value__lte", upper)
+            ("numeric_value__gte", lower),
+            ("numeric_value__lte", upper)
         ]
 
     # Handle range like "51 - 100"
@@ -20,24 +33,24 @@ def map_value_range(value:str):
         lower = int(range_match.group(1)) / 100
         upper = int(range_match.group(2)) / 100
         return [
-            ("value__gte", lower),
-            ("value__lte", upper)
+            ("numeric_value__gte", lower),
+            ("numeric_value__lte", upper)
         ]
 
     # Handle threshold like "> 150 cm"
     gt_match = re.match(r"^>\s*(\d+)", value)
     if gt_match:
         threshold = int(gt_match.group(1))
-        return ("value__gt", threshold / 100)
+        return ("numeric_value__gt", threshold / 100)
     
     lt_match = re.match(r"^<\s*(\d+)", value)
     if lt_match:
         threshold = int(lt_match.group(1))
-        return ("value__lt", threshold / 100)
+        return ("numeric_value__lt", threshold / 100)
     
     try:
         num = int(value) / 100
-        return ("value__gte", num)
+        return ("numeric_value__gte", num)
     except ValueError:
         raise ValueError(f"Unrecognized value format: {value}")
     
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import select
+import logging
+import threading
+from collections import defaultdict
+from django.db import connection, connections, transaction, DEFAULT_DB_ALIAS
+
+CHANNEL = "alarm_live"
+RECONNECT_DELAY = 5
+
+_local_callbacks = defaultdict(list)
+
+def publish(event:dict, channel:str=CHANNEL):
+    """
+    Send an event to the listeners of the channel, the live feed by default.
+
+    On PostgreSQL the event is a NOTIFY: it is delivered to the listeners of
+    every process once the current transaction commits, and never if it rolls
+    back. Other databases have no channel between processes, the event only
+    reaches the listeners of the current process, also on commit.
+    """
+    payload = json.dumps(event)
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [channel, payload])
+        return
+
+    def deliver():
+        for callback in list(_local_callbacks[channel]):
+            callback(json.loads(payload))
+
+    transaction.on_commit(deliver)
+
+def listen(callback, channel:str=CHANNEL, on_connect=None):
+    """
+    Call callback(event) for every event published on the channel, from the
+    listener thread of the process. One thread and database connection
+    listen to every channel of the process, see Listener.
+
+    on_connect() is called once the channel is listened to, and again after
+    every reconnection: the events published while the listener was down are
+    lost, caches drop their entries there instead.
+    """
+    if connection.vendor != "postgresql":
+        logging.warning(
+            f"Listening to channel {channel} on {connection.vendor}: only the events published by this process "
+            f"reach it, those of the workers and of the other processes never do. Use PostgreSQL to serve it."
+        )
+        _local_callbacks[channel].append(callback)
+        return None
+
+    return listener.subscribe(channel, callback, on_connect)
+
+class Listener:
+    """
+    The LISTEN connection of the process, shared by the channels, held by a
+    background thread started on the first subscription. The thread
+    reconnects after RECONNECT_DELAY seconds when the connection is lost.
+    """
+    def __init__(self):
+        self.subscriptions = defaultdict(list)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def subscribe(self, channel:str, callback, on_connect=None):
+        with self.lock:
+            self.subscriptions[channel].append((callback, on_connect))
+            # the thread of a parent process is not running in its forks,
+            # e.g. the prefork children of the celery workers
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                # written to by subscribe to wake the thread up for a new channel
+                self.wakeup_read, self.wakeup_write = os.pipe()
+                self.thread = threading.Thread(target=self.run, name="channel-listener", daemon=True)
+                self.thread.start()
+
+        os.write(self.wakeup_write, b"\0")
+        return self.thread
+
+    def run(self):
+        while True:
+            db = connections.create_connection(DEFAULT_DB_ALIAS)
+            listened = set()
+            try:
+                db.ensure_connection()
+                db.set_autocommit(True)
+                raw = db.connection
+
+                while True:
+                    listened |= self.listen_new(raw, listened)
+                    ready, _, _ = select.select([raw, self.wakeup_read], [], [], RECONNECT_DELAY)
+                    if self.wakeup_read in ready:
+                        os.read(self.wakeup_read, 1024)
+                    if raw not in ready:
+                        continue
+
+                    raw.poll()
+                    while raw.notifies:
+                        self.dispatch(raw.notifies.pop(0))
+
+            except Exception as err:
+                logging.error(f"Listener of channels {sorted(listened)} disconnected, reconnecting in {RECONNECT_DELAY}s: {err}")
+                time.sleep(RECONNECT_DELAY)
+            finally:
+                db.close()
+
+    def listen_new(self, raw, listened:set):
+        """
+        LISTEN to the channels subscribed to since the last call, then call
+        their on_connect: the events published before are not received.
+        """
+        with self.lock:
+            channels = {
+                channel: list(subscriptions) for channel, subscriptions in self.subscriptions.items()
+                if channel not in listened
+            }
+
+        with raw.cursor() as cursor:
+            for channel in channels:
+                cursor.execute(f"LISTEN {channel};")
+
+        for channel, subscriptions in channels.items():
+            for _, on_connect in subscriptions:
+                if on_connect is not None:
+                    on_connect()
+
+        return set(channels)
+
+    def dispatch(self, notify):
+        with self.lock:
+            callbacks = [callback for callback, _ in self.subscriptions[notify.channel]]
+
+        for callback in callbacks:
+            try:
+                callback(json.loads(notify.payload))
+            except Exception as err:
+                logging.error(f"Callback of channel {notify.channel} failed on {notify.payload}: {err}")
+
+listener = Listener()
@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from tenants.models import PlantEntity
+from acceptance_control.models import FlagType, FlagTypeLocalization
+from metadata.models import (
+    PlantEntityLocalization,
+    TableField,
+    TableFieldLocalization,
+    TableAsset,
+    TableAssetLocalization,
+    TableAssetItem,
+    TableAssetItemLocalization,
+    TableFilter,
+    FilterLocalization,
+    FilterItem,
+    FilterItemLocalization,
+    FormField,
+    FormFieldLocalization,
+    FeedbackFormFieldItem,
+    FeedbackFormFieldItemLocalization,
+    TagGroup,
+    TagGroupLocalization,
+    Tag,
+    TagLocalization,
+)
+from common_utils.live_feed.channel import listen
+
+# seconds the localizations of a language are served from memory before they are
+# read again, this bounds how stale a process can get when an invalidation is missed
+LOCALIZATION_CACHE_TTL = float(os.environ.get("LOCALIZATION_CACHE_TTL", 300))
+LOCALIZATION_CHANNEL = "localization"
+
+# localized model: (localization model, foreign key to the localized model,
+# localized fields kept in memory, the first one being the title)
+LOCALIZATIONS = {
+    PlantEntity: (PlantEntityLocalization, 'plant_entity', ('title',)),
+    FlagType: (FlagTypeLocalization, 'flag_type', ('title',)),
+    TableField: (TableFieldLocalization, 'field', ('title', 'description')),
+    TableAsset: (TableAssetLocalization, 'asset', ('title',)),
+    TableAssetItem: (TableAssetItemLocalization, 'asset_item', ('title',)),
+    TableFilter: (FilterLocalization, 'table_filter', ('title', 'description', 'placeholder')),
+    FilterItem: (FilterItemLocalization, 'filter_item', ('item_value',)),
+    FormField: (FormFieldLocalization, 'field', ('title', 'description', 'placeholder')),
+    FeedbackFormFieldItem: (FeedbackFormFieldItemLocalization, 'field_item', ('title', 'description', 'color', 'placeholder')),
+    TagGroup: (TagGroupLocalization, 'tag_group', ('name', 'description')),
+    Tag: (TagLocalization, 'tag', ('name', 'description')),
+}
+
+class LocalizationCache:
+    """
+    Process local cache of the localizations, one map {pk: localized fields}
+    per (localized model, language), loaded with a single query on first use.
+
+    Saves and deletes of a localization drop the maps of its model in every
+    process through the localization channel, see localization.signals.
+    """
+    def __init__(self, ttl:float=LOCALIZATION_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def get_map(self, model, language_id:int):
+        self._listen()
+        key = (model._meta.model_name, language_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+
+        if entry and entry[0] > now:
+            return entry[1]
+
+        localization_model, foreign_key, fields = LOCALIZATIONS[model]
+        rows = localization_model.objects.filter(language_id=language_id).values_list(f"{foreign_key}_id", *fields)
+        values = {row[0]: dict(zip(fields, row[1:])) for row in rows}
+
+        with self._lock:
+            # a map read while an invalidation went through may already be stale
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, values)
+
+        return values
+
+    def invalidate(self, model_name:str=None):
+        with self._lock:
+            self._generation += 1
+            if model_name is None:
+                self._entries.clear()
+                return
+
+            for key in [key for key in self._entries if key[0] == model_name]:
+                del self._entries[key]
+
+    def _listen(self):
+        if self._listening:
+            return
+
+        with self._lock:
+            if self._listening:
+                return
+            self._listening = True
+
+        # the invalidations sent while the listener was disconnected are lost
+        listen(lambda event: self.invalidate(event.get("model")), LOCALIZATION_CHANNEL, on_connect=self.invalidate)
+
+localization_cache = LocalizationCache()
+
+class LocalizationResolver:
+    """
+    Localizations of one language, looked up by (model, pk) in memory instead
+    of one query per row. Create one per request.
+    """
+    def __init__(self, language, cache:LocalizationCache=localization_cache):
+        self.language_id = language.id
+        self.cache = cache
+        self._maps = {}
+
+    def get(self, model, pk):
+        """
+        Localized fields of the row as a dict, None if the row has no
+        localization in the language.
+        """
+        if model not in self._maps:
+            self._maps[model] = self.cache.get_map(model, self.language_id)
+        return self._maps[model].get(pk)
+
+    def title(self, model, pk, default=None):
+        fields = self.get(model, pk)
+        if fields is None:
+            return default
+        return fields[LOCALIZATIONS[model][2][0]]
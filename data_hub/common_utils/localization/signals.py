@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from common_utils.live_feed.channel import publish
+from common_utils.localization.resolver import LOCALIZATIONS, LOCALIZATION_CHANNEL, localization_cache
+
+LOCALIZED_MODELS = {
+    localization_model: model for model, (localization_model, _, _) in LOCALIZATIONS.items()
+}
+
+def invalidate_localization_cache(sender, **kwargs):
+    model_name = LOCALIZED_MODELS[sender]._meta.model_name
+    localization_cache.invalidate(model_name)
+    publish({"model": model_name}, LOCALIZATION_CHANNEL)
+
+for localization_model in LOCALIZED_MODELS:
+    post_save.connect(invalidate_localization_cache, sender=localization_model)
+    post_delete.connect(invalidate_localization_cache, sender=localization_model)
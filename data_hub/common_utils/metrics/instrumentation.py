@@ -0,0 +1,195 @@
+import os
+import re
+import time
+from contextvars import ContextVar
+from django.db.backends.signals import connection_created
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from common_utils.db.connections import connection_stats
+
+REQUEST_LABELS = ("app", "method", "route", "status")
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent, per route",
+    REQUEST_LABELS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL queries run by a request, per route",
+    REQUEST_LABELS,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in SQL queries by a request, per route",
+    REQUEST_LABELS,
+)
+
+class RequestDBStats:
+    """
+    SQL queries of one request, whatever the thread they run in. When shapes
+    is a Counter, e.g. set by the query budget guard, the queries are also
+    counted by SQL shape, see sql_shape.
+    """
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+        self.shapes = None
+
+request_db_stats = ContextVar("request_db_stats", default=None)
+
+def enter_request_stats():
+    """
+    RequestDBStats of the current request, created if no outer middleware
+    did. Returns the stats and the token to reset the context variable with,
+    None when the stats were not created here.
+    """
+    stats = request_db_stats.get()
+    if stats is not None:
+        return stats, None
+
+    stats = RequestDBStats()
+    return stats, request_db_stats.set(stats)
+
+IN_LIST = re.compile(r"\((?:\s*%s\s*,)*\s*%s\s*\)")
+LIMIT_OFFSET = re.compile(r"\b(LIMIT|OFFSET)\s+\d+")
+
+def sql_shape(sql:str):
+    """
+    SQL with the parts that vary between two runs of the same query in a loop
+    collapsed: IN lists of any length and LIMIT/OFFSET values. Parameters are
+    already placeholders.
+    """
+    return LIMIT_OFFSET.sub(r"\1 N", IN_LIST.sub("(%s, ...)", sql))
+
+def record_query(execute, sql, params, many, context):
+    stats = request_db_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    before = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.duration += time.perf_counter() - before
+        if stats.shapes is not None:
+            stats.shapes[sql_shape(sql)] += 1
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+connection_created.connect(install_query_recorder, dispatch_uid="common_utils.metrics.instrumentation")
+
+def route_template(scope):
+    """
+    Path template of the route that handled the request, with the prefixes of
+    the routers it is included in, e.g. /api/v1/alarm/assets/{event_uid}.
+    Requests matching no route share the "unmatched" label.
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched"
+
+    # the matched route may be the one declared in the router, without the
+    # prefixes, the prefix is what precedes the matched part of the path
+    path = scope["path"]
+    try:
+        matched = path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return path_format
+
+    if path.endswith(matched):
+        return path[:len(path) - len(matched)] + path_format
+    return path_format
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency, the number of SQL queries and the
+    time spent in them of every request, labelled by route template, and
+    setting the X-Response-Time header.
+
+    The request runs in a context of its own, which the worker threads of
+    run_in_threadpool and run_db inherit, so its queries are counted whatever
+    the thread the handler runs in.
+    """
+    def __init__(self, app, app_name:str):
+        self.app = app
+        self.app_name = app_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = enter_request_stats()
+        before = time.perf_counter()
+        response = {"status": 500, "duration": None}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["duration"] = time.perf_counter() - before
+                MutableHeaders(scope=message)["X-Response-Time"] = str(response["duration"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if token is not None:
+                request_db_stats.reset(token)
+            labels = (
+                self.app_name,
+                scope["method"],
+                route_template(scope),
+                str(response["status"]),
+            )
+            duration = response["duration"]
+            REQUEST_DURATION.labels(*labels).observe(duration if duration is not None else time.perf_counter() - before)
+            REQUEST_DB_QUERIES.labels(*labels).observe(stats.queries)
+            REQUEST_DB_DURATION.labels(*labels).observe(stats.duration)
+
+class ConnectionStatsCollector:
+    """
+    Database connection counters of the process, see db.connections.
+    """
+    def collect(self):
+        snapshot = connection_stats.snapshot()
+        for name in ("opened", "closed", "units", "reused"):
+            metric = CounterMetricFamily(f"db_connections_{name}", f"Database connection counter {name} of the process")
+            metric.add_metric([], snapshot[name])
+            yield metric
+
+        metric = GaugeMetricFamily("db_connections_in_use", "Units of work running on a database connection")
+        metric.add_metric([], snapshot["in_use"])
+        yield metric
+
+connection_stats_collector = ConnectionStatsCollector()
+REGISTRY.register(connection_stats_collector)
+
+def metrics_response():
+    """
+    Prometheus exposition of the metrics. Under gunicorn, set
+    PROMETHEUS_MULTIPROC_DIR to an empty directory to aggregate the request
+    metrics of all the workers, the connection counters are always the ones
+    of the answering worker.
+    """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(connection_stats_collector)
+
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,150 @@
+import os
+import json
+import logging
+from collections import Counter
+from common_utils.metrics.instrumentation import enter_request_stats, request_db_stats, route_template
+
+logger = logging.getLogger(__name__)
+
+# off: no checks, log: log the requests over budget, raise: answer them with a 500
+QUERY_BUDGET_MODE = os.environ.get("QUERY_BUDGET_MODE", "off")
+# budget of the routes missing from QUERY_BUDGETS
+DEFAULT_QUERY_BUDGET = int(os.environ.get("DEFAULT_QUERY_BUDGET", 50))
+# runs of the same SQL shape in one request reported as an N+1
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 5))
+
+# most queries a request of the route may run, with the table configuration
+# and localization caches of the process still empty. They do not depend on
+# the number of rows, a request over budget runs queries in a loop.
+QUERY_BUDGETS = {
+    "/api/v1/alarm": 18,
+    "/api/v1/alarm/live": 10,
+    "/api/v1/alarm/assets/{event_uid}": 14,
+    "/api/v1/delivery": 18,
+    "/api/v1/delivery/assets/{delivery_id}": 15,
+    "/api/v1/video_archive": 14,
+    "/api/v1/video_archive/assets/{event_uid}": 14,
+    "/api/v1/report/delivery/{delivery_id}": 24,
+    "/api/v1/report/delivery/assets/{delivery_id}": 15,
+    "/api/v1/report/delivery/flags/{delivery_id}": 19,
+    "/api/v1/report/delivery/erp/{delivery_id}": 19,
+    "/api/v1/{table_type}/metadata": 20,
+    "/api/v1/feedback/{feedback_type}/metadata": 23,
+    "/api/v1/feedback/alarm/out/{event_uid}": 6,
+    "/api/v1/tags": 8,
+    "/api/v1/tags/flat": 8,
+    "/api/v1/stats": 10,
+    # exports are checked when the file starts, before their rows are read
+    "/api/v1/alarm/export": 12,
+    "/api/v1/delivery/export": 12,
+}
+
+class QueryBudgetCheck:
+    """
+    Queries run by a request against the budget of its route, with the SQL
+    shapes run N_PLUS_ONE_THRESHOLD times or more.
+    """
+    def __init__(self, method:str, route:str, status:int, queries:int, budget:int, repeated:dict):
+        self.method = method
+        self.route = route
+        self.status = status
+        self.queries = queries
+        self.budget = budget
+        self.repeated = repeated
+
+    @property
+    def exceeded(self):
+        return self.queries > self.budget
+
+    def __str__(self):
+        return f"{self.method} {self.route} ran {self.queries} queries for a budget of {self.budget}"
+
+    def as_error(self):
+        return {
+            'status_code': 'query-budget-exceeded',
+            'status_description': str(self),
+            'detail': [
+                {"queries": count, "sql": sql} for sql, count in self.repeated.items()
+            ],
+        }
+
+def repeated_shapes(shapes:Counter, threshold:int=N_PLUS_ONE_THRESHOLD):
+    """
+    SQL shapes run at least threshold times, the N+1 candidates, most run first.
+    """
+    return {sql: count for sql, count in shapes.most_common() if count >= threshold}
+
+def log_check(check:QueryBudgetCheck):
+    if check.exceeded:
+        logger.warning(f"{check}, repeated: {json.dumps(check.repeated)}")
+    elif check.repeated:
+        logger.info(f"{check.method} {check.route} repeated: {json.dumps(check.repeated)}")
+
+class QueryBudgetMiddleware:
+    """
+    ASGI middleware checking the number of SQL queries of each request against
+    the budget of its route, see QUERY_BUDGETS, and reporting the SQL shapes
+    run N_PLUS_ONE_THRESHOLD times or more. The check is made when the
+    response starts, in raise mode the response is replaced by a 500 carrying
+    the repeated queries.
+
+    Meant for debugging and CI, counting by shape costs a regular expression
+    per query.
+    """
+    def __init__(self, app, mode:str=QUERY_BUDGET_MODE, budgets:dict=None, on_check=log_check):
+        self.app = app
+        self.mode = mode
+        self.budgets = QUERY_BUDGETS if budgets is None else budgets
+        self.on_check = on_check
+
+    def check(self, scope, status:int, stats):
+        route = route_template(scope)
+        return QueryBudgetCheck(
+            scope["method"],
+            route,
+            status,
+            stats.queries,
+            self.budgets.get(route, DEFAULT_QUERY_BUDGET),
+            repeated_shapes(stats.shapes),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = enter_request_stats()
+        stats.shapes = Counter()
+        replaced = False
+
+        async def send_checked(message):
+            nonlocal replaced
+            if replaced:
+                return
+
+            if message["type"] == "http.response.start":
+                check = self.check(scope, message["status"], stats)
+                self.on_check(check)
+                if check.exceeded and self.mode == "raise":
+                    replaced = True
+                    body = json.dumps({"error": check.as_error()}).encode()
+                    await send(
+                        {
+                            "type": "http.response.start",
+                            "status": 500,
+                            "headers": [
+                                (b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                            ],
+                        }
+                    )
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_checked)
+        finally:
+            if token is not None:
+                request_db_stats.reset(token)
@@ -0,0 +1,53 @@
+from collections import Counter
+from django.db import connection, IntegrityError
+from django.utils import timezone
+
+# keys inserted per statement by claim_keys
+CLAIM_CHUNK_SIZE = 500
+
+def claim_keys(model, keys, created_at=None):
+    """
+    Insert the keys into the key table of model, AlarmKey or MediaKey, and
+    return the set of those inserted: keys already claimed are left out.
+    created_at maps each key to the created_at of its row, now by default.
+
+    Partitioned tables can only be unique together with created_at, the key
+    tables are not partitioned and keep event_uid and media_id unique across
+    months. Claim the keys in the transaction storing the rows: a key
+    claimed by a concurrent transaction waits for it to end, and the keys of
+    rows rolled back are released with them.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return set()
+
+    now = timezone.now()
+    table = model._meta.db_table
+    column = model._meta.pk.column
+    claimed = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), CLAIM_CHUNK_SIZE):
+            chunk = keys[start:start + CLAIM_CHUNK_SIZE]
+            params = []
+            for key in chunk:
+                params.extend([key, connection.ops.adapt_datetimefield_value((created_at or {}).get(key, now))])
+            cursor.execute(
+                f'INSERT INTO "{table}" ("{column}", "created_at") VALUES {", ".join(["(%s, %s)"] * len(chunk))} '
+                f'ON CONFLICT DO NOTHING RETURNING "{column}"',
+                params,
+            )
+            claimed.update(row[0] for row in cursor.fetchall())
+
+    return claimed
+
+def claim_unique(model, keys, created_at=None):
+    """
+    Claim the keys like claim_keys, raise IntegrityError if one of them is
+    repeated or already claimed, as the unique constraint would have.
+    """
+    keys = list(keys)
+    claimed = claim_keys(model, keys, created_at)
+    if len(claimed) < len(keys):
+        repeated = {key for key, count in Counter(keys).items() if count > 1}
+        taken = sorted((set(keys) - claimed) | repeated)
+        raise IntegrityError(f"{model._meta.pk.name} already exists: {', '.join(taken)}")
@@ -0,0 +1,311 @@
+import os
+import re
+import logging
+from datetime import date, datetime, timezone
+from django.db import connection, transaction
+
+# months of partitions kept created ahead of the current one, so that
+# inserts never fall back on the default partition
+PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", 3))
+
+PARTITION_COLUMN = 'created_at'
+
+# partitioned table: its columns unique on their own before partitioning, unique
+# together with created_at afterwards, which no longer rejects a duplicate
+# stored in another month, see KEY_TABLES. Children first, in the order their
+# partitions are dropped
+PARTITIONED_TABLES = {
+    'alarm_media': (),
+    'delivery_media': (),
+    'video_archive_media': (),
+    'alarm': ('event_uid',),
+    'media': ('media_id',),
+}
+
+# (table, column) keeping a column of a partitioned table unique across months,
+# see common_utils.partitions.keys. The keys outlive the rows: an event
+# replayed after its month was dropped is still rejected as a duplicate
+KEY_TABLES = {
+    'alarm': ('alarm_event_uid', 'event_uid'),
+    'media': ('media_media_id', 'media_id'),
+}
+
+# (table, column) of the parent of the link tables whose parent is not
+# partitioned: links are only dropped once their parent is gone, e.g.
+# archived by archive_old_data, the deliveries and video archives are kept
+# by drop_partitions
+UNPARTITIONED_PARENTS = {
+    'delivery_media': ('delivery', 'delivery_id'),
+    'video_archive_media': ('video_archive', 'video_archive_id'),
+}
+
+# (table, column) of the links to the media: a media is kept as long as a
+# link kept references it
+MEDIA_LINKS = (
+    ('alarm_media', 'media_id'),
+    ('delivery_media', 'media_id'),
+    ('video_archive_media', 'media_id'),
+)
+
+PARTITION_NAME = re.compile(r'^(?P<table>.+)_p(?P<year>\d{4})(?P<month>\d{2})$')
+
+def is_supported(conn=connection):
+    """
+    Native range partitioning is only used on PostgreSQL, the tables stay
+    plain tables on other databases, e.g. SQLite in local development.
+    """
+    return conn.vendor == 'postgresql'
+
+def month_start(day:date):
+    return date(day.year, day.month, 1)
+
+def add_months(month:date, months:int):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table:str, month:date):
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+def default_partition_name(table:str):
+    return f"{table}_default"
+
+def bound(month:date):
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+def is_partitioned(cursor, table:str):
+    cursor.execute(
+        "SELECT c.relkind = 'p' FROM pg_class c WHERE c.oid = to_regclass(%s)", [table]
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+def list_partitions(cursor, table:str):
+    """
+    {month: partition name} of the monthly partitions of the table.
+    """
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%s)", [table]
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match and match['table'] == table:
+            partitions[date(int(match['year']), int(match['month']), 1)] = name
+    return partitions
+
+def create_partition(cursor, table:str, month:date, parent:str=None):
+    """
+    Create the partition of the month of the table if missing. Rows of the
+    month stored meanwhile in the default partition are moved into it, which
+    the attach requires. Returns True if the partition was created.
+    """
+    parent = parent or table
+    name = partition_name(table, month)
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    if cursor.fetchone()[0]:
+        return False
+
+    start, end = bound(month), bound(add_months(month, 1))
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{parent}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{default_partition_name(table)}" '
+        f'WHERE "{PARTITION_COLUMN}" >= {start} AND "{PARTITION_COLUMN}" < {end} RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved'
+    )
+    cursor.execute(f'ALTER TABLE "{parent}" ATTACH PARTITION "{name}" FOR VALUES FROM ({start}) TO ({end})')
+    return True
+
+def partition_table(cursor, table:str, unique_columns=(), months_ahead:int=PARTITION_MONTHS_AHEAD):
+    """
+    Convert the plain table into a table partitioned by month on created_at,
+    with a partition per month from its first row to months_ahead months from
+    now and a default partition for rows outside of them. The rows are copied
+    once, the table is locked meanwhile.
+
+    The primary key and the unique constraints become unique together with
+    created_at, as PostgreSQL requires of partitioned tables: the unique
+    columns are only unique within a month, KEY_TABLES keep them unique
+    across months. The other
+    indexes and the foreign keys of the table are recreated as they were,
+    foreign keys referencing the table must have been dropped before.
+    """
+    if is_partitioned(cursor, table):
+        return
+
+    cursor.execute(
+        "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "WHERE i.indrelid = to_regclass(%s) AND NOT i.indisunique", [table]
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'", [table]
+    )
+    foreign_keys = cursor.fetchall()
+
+    new_table = f"{table}_partitioned"
+    cursor.execute(
+        f'CREATE TABLE "{new_table}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) '
+        f'PARTITION BY RANGE ("{PARTITION_COLUMN}")'
+    )
+    # the default of id, if any, uses the sequence of the old table, dropped with it
+    cursor.execute(f'ALTER TABLE "{new_table}" ALTER COLUMN "id" DROP DEFAULT')
+    cursor.execute(f'CREATE TABLE "{default_partition_name(table)}" PARTITION OF "{new_table}" DEFAULT')
+
+    cursor.execute(f'SELECT MIN("{PARTITION_COLUMN}"), MAX("id") FROM "{table}"')
+    first, last_id = cursor.fetchone()
+    month = month_start(first.astimezone(timezone.utc).date() if first else datetime.now(timezone.utc).date())
+    last_month = add_months(month_start(datetime.now(timezone.utc).date()), months_ahead)
+    while month <= last_month:
+        create_partition(cursor, table, month, parent=new_table)
+        month = add_months(month, 1)
+
+    cursor.execute(f'INSERT INTO "{new_table}" SELECT * FROM "{table}"')
+    cursor.execute(f'DROP TABLE "{table}"')
+    cursor.execute(f'ALTER TABLE "{new_table}" RENAME TO "{table}"')
+
+    cursor.execute(f'CREATE SEQUENCE "{table}_id_seq" OWNED BY "{table}"."id"')
+    cursor.execute(f"SELECT setval('\"{table}_id_seq\"', %s, false)", [(last_id or 0) + 1])
+    cursor.execute(f'ALTER TABLE "{table}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{table}_id_seq"\')')
+
+    cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ("id", "{PARTITION_COLUMN}")')
+    for column in unique_columns:
+        cursor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{column}_key" UNIQUE ("{column}", "{PARTITION_COLUMN}")'
+        )
+    for index in indexes:
+        cursor.execute(index)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+def create_partitions(months_ahead:int=PARTITION_MONTHS_AHEAD, from_month:date=None):
+    """
+    Create the missing partitions of every partitioned table from from_month,
+    the current month by default, to months_ahead months after it. Returns
+    the names of the partitions created, none on databases without native
+    partitioning.
+    """
+    if not is_supported():
+        return []
+
+    from_month = month_start(from_month or datetime.now(timezone.utc).date())
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cursor, table):
+                logging.warning(f"{table} is not partitioned, run the migrations first")
+                continue
+
+            for months in range(months_ahead + 1):
+                month = add_months(from_month, months)
+                if create_partition(cursor, table, month):
+                    created.append(partition_name(table, month))
+
+    return created
+
+def dependent_tables(table:str):
+    """
+    (table, column) of the tables that are not partitioned and reference
+    rows of the partitioned table, e.g. the tags and feedbacks of the alarms.
+    """
+    from django.apps import apps
+
+    dependents = []
+    for model in apps.get_models():
+        if model._meta.db_table != table:
+            continue
+        for relation in model._meta.related_objects:
+            related_table = relation.related_model._meta.db_table
+            if related_table not in PARTITIONED_TABLES and relation.field.concrete:
+                dependents.append((related_table, relation.field.column))
+    return dependents
+
+def kept_condition(table:str, source:str, cutoff):
+    """
+    SQL condition, with its params, true for the rows of source, the table
+    or one of its partitions, kept whatever their month: links whose parent
+    is not partitioned and still exists, media referenced by a link kept.
+    None when every row of the table is dropped with its month.
+    """
+    if table in UNPARTITIONED_PARENTS:
+        parent, column = UNPARTITIONED_PARENTS[table]
+        return f'EXISTS (SELECT 1 FROM "{parent}" WHERE "{parent}"."id" = "{source}"."{column}")', []
+
+    if table == 'media':
+        conditions, params = [], []
+        for link, column in MEDIA_LINKS:
+            # links of the months kept, or kept themselves
+            link_kept, link_params = f'"{link}"."{PARTITION_COLUMN}" >= %s', [cutoff]
+            condition, condition_params = kept_condition(link, link, cutoff)
+            if condition:
+                link_kept, link_params = f'({link_kept} OR {condition})', link_params + condition_params
+            conditions.append(f'EXISTS (SELECT 1 FROM "{link}" WHERE "{link}"."{column}" = "{source}"."id" AND {link_kept})')
+            params.extend(link_params)
+        return ' OR '.join(conditions), params
+
+    return None, []
+
+def drop_partitions(before:date, dry_run:bool=False):
+    """
+    Drop the rows of the partitioned tables created before the month of
+    before, with the rows of the tables referencing them. On PostgreSQL the
+    monthly partitions are detached and dropped at once instead of deleted
+    row by row, elsewhere the rows are deleted. Returns [(table, partition
+    or None when deleted row by row, rows)].
+
+    Rows still referenced are kept, see kept_condition: the media links of
+    the deliveries and video archives, which are not partitioned, until their
+    parent is archived or deleted, and the media of the links kept. A
+    partition holding such rows is not dropped, its other rows are deleted
+    one by one. The keys of the alarms and media dropped are kept, see
+    KEY_TABLES.
+    """
+    before = month_start(before)
+    cutoff = connection.ops.adapt_datetimefield_value(datetime(before.year, before.month, 1, tzinfo=timezone.utc))
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            if is_supported() and is_partitioned(cursor, table):
+                partitions = [
+                    name for month, name in sorted(list_partitions(cursor, table).items()) if month < before
+                ]
+                # rows left in the default partition are deleted one by one
+                sources = partitions + [default_partition_name(table)]
+            else:
+                partitions = []
+                sources = [table]
+
+            for source in sources:
+                where, params = f' WHERE "{source}"."{PARTITION_COLUMN}" < %s', [cutoff]
+                kept, kept_params = kept_condition(table, source, cutoff)
+                if kept:
+                    where, params = f'{where} AND NOT ({kept})', params + kept_params
+
+                    if source in partitions:
+                        cursor.execute(f'SELECT COUNT(*) FROM "{source}" WHERE {kept}', kept_params)
+                        held = cursor.fetchone()[0]
+                        if held:
+                            logging.warning(f"{source}: {held} rows still referenced are kept, the partition is not dropped")
+                            partitions.remove(source)
+
+                cursor.execute(f'SELECT COUNT(*) FROM "{source}"{where}', params)
+                rows = cursor.fetchone()[0]
+                if dry_run:
+                    dropped.append((table, source if source in partitions else None, rows))
+                    continue
+
+                for dependent, column in dependent_tables(table):
+                    cursor.execute(
+                        f'DELETE FROM "{dependent}" WHERE "{column}" IN (SELECT "id" FROM "{source}"{where})', params
+                    )
+
+                if source in partitions:
+                    cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{source}"')
+                    cursor.execute(f'DROP TABLE "{source}"')
+                    dropped.append((table, source, rows))
+                else:
+                    cursor.execute(f'DELETE FROM "{source}"{where}', params)
+                    dropped.append((table, None, rows))
+
+    return dropped
@@ -0,0 +1,106 @@
+import os
+import time
+import threading
+from acceptance_control.models import FlagType, Severity
+from tenants.models import Tenant, PlantEntity, SensorBox, Camera
+from common_utils.live_feed.channel import listen
+
+# seconds a reference row is served from memory before it is read again,
+# this bounds how stale a worker can get when an invalidation is missed
+REFERENCE_CACHE_TTL = float(os.environ.get("REFERENCE_CACHE_TTL", 60))
+REFERENCE_CHANNEL = "reference_data"
+
+class ReferenceCache:
+    """
+    Process local TTL cache for slowly changing rows (tenants, entities, flag
+    types, ...) looked up by the ingest workers. Keys are tuples whose first
+    item is the model name, which is what invalidate() works with. Missing
+    rows are not cached, so a row created later is found right away.
+
+    Saves and deletes of the rows drop them in every process through the
+    reference data channel, see reference_data.signals.
+    """
+    def __init__(self, ttl:float=REFERENCE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def get_or_load(self, key, loader):
+        self._listen()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry and entry[0] > now:
+            return entry[1]
+
+        value = loader()
+        if value is not None:
+            with self._lock:
+                self._entries[key] = (now + self.ttl, value)
+
+        return value
+
+    def invalidate(self, model_name:str=None):
+        with self._lock:
+            if model_name is None:
+                self._entries.clear()
+                return
+
+            for key in [key for key in self._entries if key[0] == model_name]:
+                del self._entries[key]
+
+    def _listen(self):
+        if self._listening:
+            return
+
+        with self._lock:
+            if self._listening:
+                return
+            self._listening = True
+
+        # the invalidations sent while the listener was disconnected are lost
+        listen(lambda event: self.invalidate(event.get("model")), REFERENCE_CHANNEL, on_connect=self.invalidate)
+
+reference_cache = ReferenceCache()
+
+def get_tenant(domain:str):
+    return reference_cache.get_or_load(
+        (Tenant._meta.model_name, domain),
+        lambda: Tenant.objects.get(domain=domain),
+    )
+
+def get_plant_entity(tenant:Tenant, entity_uid:str):
+    return reference_cache.get_or_load(
+        (PlantEntity._meta.model_name, tenant.id, entity_uid),
+        lambda: PlantEntity.objects.select_related('entity_type').get(entity_uid=entity_uid, entity_type__tenant=tenant),
+    )
+
+def get_flag_type(name:str):
+    return reference_cache.get_or_load(
+        (FlagType._meta.model_name, name),
+        lambda: FlagType.objects.get(name=name),
+    )
+
+def get_severity(flag_type:FlagType, level:int):
+    return reference_cache.get_or_load(
+        (Severity._meta.model_name, flag_type.id, level),
+        lambda: Severity.objects.get(flag_type=flag_type, level=level),
+    )
+
+def get_sensor_box(plant_entity_id:int, sensor_box_location:str):
+    """
+    First sensor box of the entity at the given location, None if there is none.
+    """
+    return reference_cache.get_or_load(
+        (SensorBox._meta.model_name, plant_entity_id, sensor_box_location),
+        lambda: SensorBox.objects.filter(plant_entity_id=plant_entity_id, sensor_box_location=sensor_box_location).first(),
+    )
+
+def get_camera(sensor_box:SensorBox, camera_id:str):
+    return reference_cache.get_or_load(
+        (Camera._meta.model_name, sensor_box.id, camera_id),
+        lambda: Camera.objects.get(camera_id=camera_id, sensor_box=sensor_box),
+    )
+
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from acceptance_control.models import FlagType, Severity
+from tenants.models import Tenant, PlantEntity, SensorBox, Camera
+from common_utils.live_feed.channel import publish
+from common_utils.reference_data.cache import reference_cache, REFERENCE_CHANNEL
+
+CACHED_MODELS = (Tenant, PlantEntity, FlagType, Severity, SensorBox, Camera)
+
+def invalidate_reference_cache(sender, **kwargs):
+    model_name = sender._meta.model_name
+    reference_cache.invalidate(model_name)
+    publish({"model": model_name}, REFERENCE_CHANNEL)
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_reference_cache, sender=model)
+    post_delete.connect(invalidate_reference_cache, sender=model)
@@ -0,0 +1,49 @@
+import logging
+from django.db import transaction
+from acceptance_control.models import PendingChild
+
+def park(kind:str, parent_key:str, payload:dict):
+    """
+    Keep a child event whose parent is not stored yet, see attach_pending.
+    """
+    PendingChild.objects.create(kind=kind, parent_key=parent_key, payload=payload)
+
+def attach_pending(kind:str, parent_keys, attach, fallback):
+    """
+    Attach the children of the given kind parked for the parents, once these
+    are stored. attach(pending) receives all of them at once and runs in the
+    same transaction as their removal from the staging table, so each child is
+    attached exactly once even when several workers store the same parents.
+
+    If attach fails, every child payload is passed to fallback(payload) to be
+    processed on its own instead. Returns the number of children attached.
+    """
+    parent_keys = set(parent_keys)
+    if not parent_keys or not PendingChild.objects.filter(kind=kind, parent_key__in=parent_keys).exists():
+        return 0
+
+    try:
+        with transaction.atomic():
+            pending = list(
+                PendingChild.objects.select_for_update(skip_locked=True).filter(
+                    kind=kind, parent_key__in=parent_keys
+                ).order_by('id')
+            )
+            if pending:
+                attach(pending)
+                PendingChild.objects.filter(id__in=[child.id for child in pending]).delete()
+    except Exception as err:
+        logging.error(f"Error attaching pending {kind} of {parent_keys}, processing them one by one: {err}")
+        with transaction.atomic():
+            pending = list(
+                PendingChild.objects.select_for_update(skip_locked=True).filter(
+                    kind=kind, parent_key__in=parent_keys
+                ).order_by('id')
+            )
+            PendingChild.objects.filter(id__in=[child.id for child in pending]).delete()
+
+        for child in pending:
+            fallback(child.payload)
+        return 0
+
+    return len(pending)
@@ -0,0 +1,146 @@
+from zoneinfo import ZoneInfo
+from datetime import datetime, timedelta, time as dtime
+from collections import Counter, defaultdict
+from django.db import transaction, IntegrityError
+from django.db.models import F, Q, Count
+from django.db.models.functions import TruncDate
+from acceptance_control.models import Alarm, DeliveryFlag, DailyFlagStats
+from common_utils.timezone_utils.timeloc import convert_to_local_time
+
+STAT_FIELDS = ('alarms', 'reviewed_alarms', 'actual_alarms', 'delivery_flags')
+
+def alarm_counts(alarm):
+    return {
+        'alarms': 1,
+        'reviewed_alarms': int(alarm.is_actual_alarm is not None),
+        'actual_alarms': int(alarm.is_actual_alarm is True),
+    }
+
+class StatsDelta:
+    """
+    Changes to the daily stats of alarms and delivery flags, keyed by
+    (tenant id, day, entity id, flag type id, severity id), applied at once
+    by apply(). To move a row to another key, e.g. after a feedback changed
+    its severity, add it with sign -1 before the change and 1 after it.
+    """
+    def __init__(self):
+        self.changes = defaultdict(Counter)
+
+    def add_alarm(self, alarm, sign:int=1):
+        day = convert_to_local_time(alarm.created_at, alarm.tenant.timezone).date()
+        key = (alarm.tenant_id, day, alarm.entity_id, alarm.flag_type_id, alarm.severity_id)
+        for field, count in alarm_counts(alarm).items():
+            self.changes[key][field] += sign * count
+
+    def add_delivery_flag(self, flag, sign:int=1):
+        delivery = flag.delivery
+        day = convert_to_local_time(delivery.created_at, delivery.tenant.timezone).date()
+        key = (delivery.tenant_id, day, delivery.entity_id, flag.flag_type_id, flag.severity_id)
+        self.changes[key]['delivery_flags'] += sign
+
+    def apply(self):
+        # keys are applied in the same order in every worker, so that two
+        # workers updating the same rows wait on each other instead of deadlocking
+        for key in sorted(self.changes):
+            counts = {field: count for field, count in self.changes[key].items() if count}
+            if counts:
+                add_counts(key, counts)
+        self.changes.clear()
+
+def add_counts(key, counts:dict):
+    """
+    Add counts to the stats row of key, created if missing. Safe against
+    concurrent workers: the counts are added by the database.
+    """
+    tenant_id, day, entity_id, flag_type_id, severity_id = key
+    row = DailyFlagStats.objects.filter(
+        tenant_id=tenant_id, day=day, entity_id=entity_id, flag_type_id=flag_type_id, severity_id=severity_id,
+    )
+    increments = {field: F(field) + count for field, count in counts.items()}
+    if row.update(**increments):
+        return
+
+    try:
+        with transaction.atomic():
+            DailyFlagStats.objects.create(
+                tenant_id=tenant_id, day=day, entity_id=entity_id, flag_type_id=flag_type_id, severity_id=severity_id,
+                **counts,
+            )
+    except IntegrityError:
+        # created by another worker in the meantime
+        row.update(**increments)
+
+def record_alarms(alarms):
+    delta = StatsDelta()
+    for alarm in alarms:
+        delta.add_alarm(alarm)
+    delta.apply()
+
+def record_delivery_flags(flags):
+    delta = StatsDelta()
+    for flag in flags:
+        delta.add_delivery_flag(flag)
+    delta.apply()
+
+def local_range(tenant, from_day, to_day):
+    tz = ZoneInfo(tenant.timezone)
+    return (
+        datetime.combine(from_day, dtime.min, tzinfo=tz),
+        datetime.combine(to_day + timedelta(days=1), dtime.min, tzinfo=tz),
+    )
+
+def rebuild_stats(tenant, from_day, to_day):
+    """
+    Recompute the daily stats of the tenant from from_day to to_day included
+    from the alarms and the delivery flags. Returns the number of rows written.
+
+    Counts added by the ingest while the range is recomputed may be lost,
+    rebuild ranges that are still receiving events again once they are quiet.
+    """
+    tz = ZoneInfo(tenant.timezone)
+    start, end = local_range(tenant, from_day, to_day)
+    rows = defaultdict(Counter)
+
+    for row in Alarm.objects.filter(
+        tenant=tenant, created_at__gte=start, created_at__lt=end,
+    ).annotate(
+        day=TruncDate('created_at', tzinfo=tz),
+    ).values(
+        'day', 'entity_id', 'flag_type_id', 'severity_id',
+    ).annotate(
+        alarms=Count('id'),
+        reviewed_alarms=Count('id', filter=Q(is_actual_alarm__isnull=False)),
+        actual_alarms=Count('id', filter=Q(is_actual_alarm=True)),
+    ).order_by():
+        key = (tenant.id, row['day'], row['entity_id'], row['flag_type_id'], row['severity_id'])
+        for field in ('alarms', 'reviewed_alarms', 'actual_alarms'):
+            rows[key][field] += row[field]
+
+    for row in DeliveryFlag.objects.filter(
+        delivery__tenant=tenant, delivery__created_at__gte=start, delivery__created_at__lt=end,
+    ).annotate(
+        day=TruncDate('delivery__created_at', tzinfo=tz),
+    ).values(
+        'day', 'delivery__entity_id', 'flag_type_id', 'severity_id',
+    ).annotate(
+        delivery_flags=Count('id'),
+    ).order_by():
+        key = (tenant.id, row['day'], row['delivery__entity_id'], row['flag_type_id'], row['severity_id'])
+        rows[key]['delivery_flags'] += row['delivery_flags']
+
+    with transaction.atomic():
+        DailyFlagStats.objects.filter(tenant=tenant, day__gte=from_day, day__lte=to_day).delete()
+        DailyFlagStats.objects.bulk_create(
+            [
+                DailyFlagStats(
+                    tenant_id=tenant_id, day=day, entity_id=entity_id, flag_type_id=flag_type_id, severity_id=severity_id,
+                    **{field: counts[field] for field in STAT_FIELDS},
+                )
+                for (tenant_id, day, entity_id, flag_type_id, severity_id), counts in rows.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['tenant', 'day', 'entity', 'flag_type', 'severity'],
+            update_fields=list(STAT_FIELDS),
+        )
+
+    return len(rows)
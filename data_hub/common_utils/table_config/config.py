@@ -0,0 +1,169 @@
+import os
+import time
+import threading
+from typing import Dict, Optional
+from django.db.models import Prefetch
+from pydantic import create_model
+from tenants.models import PlantEntity, EntityType
+from acceptance_control.models import FlagType
+from metadata.models import (
+    TenantTable,
+    TenantTableFilter,
+    TenantTableAsset,
+    TenantTableAssetItem,
+)
+from common_utils.live_feed.channel import listen
+
+# seconds a compiled table configuration is used before it is compiled again,
+# this bounds how stale a process can get when an invalidation is missed
+TABLE_CONFIG_TTL = float(os.environ.get("TABLE_CONFIG_TTL", 300))
+TABLE_CONFIG_CHANNEL = "table_config"
+
+def create_filter_model(fields: Dict[str, Optional[str]]):
+    """
+    This function creates a dynamic Pydantic model based on the fields provided,
+    with the given default values.
+    """
+    return create_model("DynamicFilterModel", **{k: (Optional[str], v) for k, v in fields.items()})
+
+class TableConfig:
+    """
+    Configuration of the table of a tenant, compiled once and shared by the
+    requests of the process until it is invalidated:
+        - tenant_table: the TenantTable, with its table_type
+        - filter_model: pydantic model of the active filters, with their defaults
+        - filter_model_without_defaults: same model, every filter defaulting to None
+        - assets: [(TableAsset, [TableAssetItem, ...]), ...] of the active assets
+          and asset items, in their field order
+        - get_plant_entity, get_flag_type, get_entity_type: rows the filter
+          values map to, loaded on first use
+    """
+    def __init__(self, tenant_table, table_filters, table_assets, version):
+        self.tenant_table = tenant_table
+        self.table_type = tenant_table.table_type
+        self.tenant_id = tenant_table.tenant_id
+        self.version = version
+        self.filter_defaults = {
+            table_filter.table_filter.filter_name: table_filter.default for table_filter in table_filters
+        }
+        self.filter_model = create_filter_model(self.filter_defaults)
+        self.filter_model_without_defaults = create_filter_model(
+            {filter_name: None for filter_name in self.filter_defaults}
+        )
+        self.assets = [
+            (
+                table_asset.table_asset,
+                [tenant_item.asset_item for tenant_item in table_asset.active_items],
+            ) for table_asset in table_assets
+        ]
+        self._lookups = {}
+
+    def _lookup(self, name, queryset, key):
+        if name not in self._lookups:
+            self._lookups[name] = {getattr(row, key): row for row in queryset}
+        return self._lookups[name]
+
+    def get_plant_entity(self, entity_uid:str):
+        entities = self._lookup(
+            'plant_entity', PlantEntity.objects.filter(entity_type__tenant_id=self.tenant_id), 'entity_uid',
+        )
+        if entity_uid not in entities:
+            raise PlantEntity.DoesNotExist("PlantEntity matching query does not exist.")
+        return entities[entity_uid]
+
+    def get_flag_type(self, name:str):
+        flag_types = self._lookup('flag_type', FlagType.objects.all(), 'name')
+        if name not in flag_types:
+            raise FlagType.DoesNotExist("FlagType matching query does not exist.")
+        return flag_types[name]
+
+    def get_entity_type(self, entity_type:str):
+        """
+        Entity type of the tenant, None if the tenant has none of that name.
+        """
+        entity_types = self._lookup(
+            'entity_type', EntityType.objects.filter(tenant_id=self.tenant_id), 'entity_type',
+        )
+        return entity_types.get(entity_type)
+
+def compile_table_config(tenant, table_type_name:str, version:int):
+    tenant_table = TenantTable.objects.select_related('table_type').filter(
+        tenant=tenant, table_type__name=table_type_name,
+    ).order_by('id').first()
+    if tenant_table is None:
+        return None
+
+    table_filters = TenantTableFilter.objects.filter(
+        tenant_table=tenant_table, is_active=True,
+    ).select_related('table_filter').order_by('id')
+
+    table_assets = TenantTableAsset.objects.filter(
+        tenant_table=tenant_table, is_active=True,
+    ).select_related('table_asset').prefetch_related(
+        Prefetch(
+            'tenant_asset_items',
+            queryset=TenantTableAssetItem.objects.filter(is_active=True).select_related('asset_item').order_by('id'),
+            to_attr='active_items',
+        )
+    ).order_by('field_order__field_position', 'id')
+
+    return TableConfig(tenant_table, list(table_filters), list(table_assets), version)
+
+class TableConfigCache:
+    """
+    Process local cache of the compiled table configurations, keyed by
+    (tenant id, table type name). Saves and deletes of the rows a
+    configuration is compiled from bump the version in every process through
+    the table config channel, see table_config.signals, and configurations
+    compiled at an older version are compiled again on their next use.
+    Tables that do not exist are not cached.
+    """
+    def __init__(self, ttl:float=TABLE_CONFIG_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def get(self, tenant, table_type_name:str):
+        self._listen()
+        key = (tenant.id, table_type_name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            version = self.version
+
+        if entry and entry[0] > now and entry[1].version == version:
+            return entry[1]
+
+        config = compile_table_config(tenant, table_type_name, version)
+        if config is not None:
+            with self._lock:
+                self._entries[key] = (now + self.ttl, config)
+
+        return config
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def _listen(self):
+        if self._listening:
+            return
+
+        with self._lock:
+            if self._listening:
+                return
+            self._listening = True
+
+        # the invalidations sent while the listener was disconnected are lost
+        listen(lambda event: self.invalidate(), TABLE_CONFIG_CHANNEL, on_connect=self.invalidate)
+
+table_config_cache = TableConfigCache()
+
+def get_table_config(tenant, table_type_name:str):
+    """
+    Compiled configuration of the table of the tenant, None if the table type
+    does not exist or is not defined for the tenant.
+    """
+    return table_config_cache.get(tenant, table_type_name)
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save, post_delete
+from tenants.models import PlantEntity, EntityType
+from acceptance_control.models import FlagType
+from metadata.models import (
+    TableType,
+    TenantTable,
+    TableFilter,
+    TenantTableFilter,
+    TableAsset,
+    TenantTableAsset,
+    TableAssetItem,
+    TenantTableAssetItem,
+)
+from common_utils.live_feed.channel import publish
+from common_utils.table_config.config import TABLE_CONFIG_CHANNEL, table_config_cache
+
+CONFIG_MODELS = (
+    TableType,
+    TenantTable,
+    TableFilter,
+    TenantTableFilter,
+    TableAsset,
+    TenantTableAsset,
+    TableAssetItem,
+    TenantTableAssetItem,
+    PlantEntity,
+    EntityType,
+    FlagType,
+)
+
+def invalidate_table_config(sender, **kwargs):
+    table_config_cache.invalidate()
+    publish({"model": sender._meta.model_name}, TABLE_CONFIG_CHANNEL)
+
+for model in CONFIG_MODELS:
+    post_save.connect(invalidate_table_config, sender=model)
+    post_delete.connect(invalidate_table_config, sender=model)
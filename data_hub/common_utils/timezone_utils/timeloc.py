@@ -1,12 +1,24 @@
+import logging
 import requests
+from functools import lru_cache
 from datetime import datetime, timezone
 import pytz
 
-def get_location_and_timezone():
-    response = requests.get("https://ipinfo.io")
-    data = response.json()
-    timezone = data['timezone']
-    return timezone
+# same default as Tenant.timezone
+DEFAULT_TIMEZONE = "Europe/Berlin"
+
+@lru_cache(maxsize=1)
+def get_location_and_timezone(timeout:float=3):
+    """
+    Timezone of the host based on its public IP. The lookup is done once per
+    process on first use; prefer Tenant.timezone whenever a tenant is known.
+    """
+    try:
+        response = requests.get("https://ipinfo.io", timeout=timeout)
+        return response.json()['timezone']
+    except Exception as err:
+        logging.warning(f"Failed to resolve timezone from ipinfo.io, using {DEFAULT_TIMEZONE}: {err}")
+        return DEFAULT_TIMEZONE
 
 def convert_to_local_time(utc_time:datetime, timezone_str:str):
     if utc_time.tzinfo is None:
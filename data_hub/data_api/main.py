@@ -14,6 +14,9 @@ from fastapi import HTTPException, Body, status, Request
 from fastapi.responses import JSONResponse
 from fastapi.exception_handlers import http_exception_handler
 from asgi_correlation_id import correlation_id
+from common_utils.metrics.instrumentation import MetricsMiddleware, metrics_response
+from common_utils.metrics.query_budget import QueryBudgetMiddleware, QUERY_BUDGET_MODE
+from common_utils.db.executor import include_router
 
 ROUTERS_DIR = os.path.dirname(__file__) + "/routers"
 ROUTERS = [
@@ -55,13 +58,16 @@ def create_app() -> FastAPI:
         allow_headers=["X-Requested-With", "X-Request-ID"],
         expose_headers=["X-Request-ID"],
     )
+    if QUERY_BUDGET_MODE != "off":
+        app.add_middleware(QueryBudgetMiddleware)
+    app.add_middleware(MetricsMiddleware, app_name="data_api")
 
     for R in ROUTERS:
         try:
             module = importlib.import_module(R)
             attr = getattr(module, 'endpoint')
             if inspect.ismodule(attr):
-                app.include_router(module.endpoint.router)
+                include_router(app, module.endpoint.router)
         except ImportError as err:
             logging.error(f'Failed to import {R}: {err}')
             
@@ -69,6 +75,10 @@ def create_app() -> FastAPI:
 
 app = create_app()
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return metrics_response()
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
@@ -17,26 +17,10 @@ QUERIES = [
     if not f.endswith('__.py')
     ]
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
 
 router = APIRouter(
     prefix="/api/v1",
     tags=["Alarm"],
-    route_class=TimedRoute,
     responses={404: {"description": "Not found"}},
 )
 
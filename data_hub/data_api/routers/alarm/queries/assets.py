@@ -4,7 +4,6 @@ import math
 import time
 import django
 django.setup()
-from django.db import connection
 from datetime import datetime, timedelta
 from datetime import date, timezone
 from typing import Callable
@@ -28,11 +27,14 @@ from metadata.models import (
     TenantTable,
     TenantTableAsset,
     TableAssetItem,
-    TableAssetLocalization,
-    TableAssetItemLocalization,
+    TableAsset,
     TenantTableFilter,
     TenantTableAssetItem,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.table_config.config import get_table_config
+from common_utils.assets.compose import MediaIndex, compose_assets
+from common_utils.db.executor import db_handler
 
 from tenants.models import (
     TenantStorageSettings,
@@ -41,25 +43,8 @@ from tenants.models import (
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 AzAccoutKey = os.getenv('AzAccoutKey')
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
 
-        return custom_route_handler
-
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 # def create_filter_model(fields: Dict[str, Optional[str]]):
 #     """
@@ -133,6 +118,7 @@ This API is used to fetch comprehensive information and analytics related to a s
 @router.api_route(
     "/alarm/assets/{event_uid}", methods=["GET"], tags=["Alarm"], description=description,
 )
+@db_handler
 def get_alarm_assets(response: Response, event_uid:str, language:str=None):
     results = {}
     try:
@@ -145,7 +131,8 @@ def get_alarm_assets(response: Response, event_uid:str, language:str=None):
             response.status_code = status.HTTP_400_BAD_REQUEST
             return results
     
-        if not Alarm.objects.filter(event_uid=event_uid).exists():
+        alarm = Alarm.objects.select_related('tenant').filter(event_uid=event_uid).first()
+        if alarm is None:
             results['error'] = {
                 'status_code': "Not-Found",
                 'status_description': f"event_uid {event_uid} is not found",
@@ -154,8 +141,6 @@ def get_alarm_assets(response: Response, event_uid:str, language:str=None):
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
             
-        alarm = Alarm.objects.get(event_uid=event_uid)
-        alarm_media = AlarmMedia.objects.filter(alarm=alarm)
 
         tenant = alarm.tenant
 
@@ -169,7 +154,8 @@ def get_alarm_assets(response: Response, event_uid:str, language:str=None):
                 language = 'de'
                 msg = f"using german language"
         
-        if not Language.objects.filter(code=language).exists():
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -180,14 +166,10 @@ def get_alarm_assets(response: Response, event_uid:str, language:str=None):
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
         
-        language = Language.objects.get(code=language)
-        table_assets = TenantTableAsset.objects.filter(
-            tenant_table=TenantTable.objects.get(
-                tenant=tenant,
-                table_type=TableType.objects.get(name='alarm'),
-            ),
-            is_active=True,
-        )
+        language = language_obj
+        config = get_table_config(tenant, 'alarm')
+        if config is None:
+            raise TenantTable.DoesNotExist("TenantTable matching query does not exist.")
         
         AzAccoutKey = TenantStorageSettings.objects.get(tenant=tenant).account_key
         placeholder = {
@@ -197,43 +179,15 @@ def get_alarm_assets(response: Response, event_uid:str, language:str=None):
             }
         
         
-        categories = []
-        data = []
-        
-        for table_asset in table_assets:
-            categories.append(
-                {
-                    'key': table_asset.table_asset.key,
-                    'name': TableAssetLocalization.objects.get(asset=table_asset.table_asset, language=language).title if TableAssetLocalization.objects.filter(asset=table_asset.table_asset, language=language) else table_asset.table_asset.key,
-                }
-            )
-            
-            items = []
-            table_asset_items = TenantTableAssetItem.objects.filter(tenant_table_asset=table_asset, is_active=True)
-            for item in table_asset_items:
-                item = item.asset_item
-                items.append(
-                    {
-                        'key': item.key,
-                        'title': TableAssetItemLocalization.objects.get(asset_item=item, language=language).title if TableAssetItemLocalization.objects.filter(asset_item=item, language=language) else item.name,
-                        'type': item.media_type,
-                        'data': [
-                            {
-                                'url': f"{media.media.media_url}?{AzAccoutKey}",
-                                'name': media.media.media_name,
-                                'time': media.media.created_at.strftime(DATETIME_FORMAT),
-                            } for media in alarm_media if media.media.media_type == item.media_type
-                        ] if len(alarm_media) else [placeholder]
-                    },
-                )
-            
-            data.append(
-                {
-                    "key": table_asset.table_asset.key,
-                    "title":  TableAssetLocalization.objects.get(asset=table_asset.table_asset, language=language).title if TableAssetLocalization.objects.filter(asset=table_asset.table_asset, language=language) else table_asset.table_asset.key,
-                    "items": items,
-                }
-            )
+        # created_at limits the lookup to the partition of the alarm
+        alarm_media = MediaIndex(AlarmMedia.objects.filter(alarm=alarm, created_at=alarm.created_at))
+        categories, data = compose_assets(
+            config.assets,
+            localizer=LocalizationResolver(language),
+            item_media=lambda item: alarm_media.get(item.media_type),
+            account_key=AzAccoutKey,
+            placeholder=placeholder if not len(alarm_media) else None,
+        )
         
         results = {
             "msg": msg,
@@ -241,8 +195,6 @@ def get_alarm_assets(response: Response, event_uid:str, language:str=None):
             "data": data,
         }
         
-        
-        connection.close()
         return results    
     
     except HTTPException as e:
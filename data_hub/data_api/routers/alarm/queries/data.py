@@ -2,6 +2,7 @@ import os
 import json
 import time
 import math
+import functools
 import django
 import pytz
 import logging
@@ -30,6 +31,12 @@ from common_utils.filters.utils import (
     map_value,
     map_entity_type_to_table_type,
 )
+from common_utils.pagination.keyset import (
+    COUNT_MODES,
+    count_records,
+)
+from common_utils.archive.store import read_page, count_rows, compile_lookups, UnsupportedLookup
+from common_utils.archive.reader import exclude_archived, paginate
 
 logger = logging.getLogger(__name__)
 
@@ -49,19 +56,19 @@ from acceptance_control.models import (
     Media,
     Severity,
     FlagType,
-    FlagTypeLocalization,
 )
 
 from metadata.models import (
     TableType,
     TenantTable,
     Language,
-    TenantTableFilter,
-    PlantEntityLocalization,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.table_config.config import get_table_config
+from common_utils.db.executor import db_handler
 
 
-def filter_mapping(key, value, tenant):
+def filter_mapping(key, value, config):
     try:
         if value is None:
             return None
@@ -80,54 +87,155 @@ def filter_mapping(key, value, tenant):
         if key == "location":
             return (
                 "entity",
-                PlantEntity.objects.get(entity_uid=value, entity_type__tenant=tenant),
+                config.get_plant_entity(value),
             )
         if key == "flag_type":
-            return ("flag_type", FlagType.objects.get(name=value))
+            return ("flag_type", config.get_flag_type(value))
         if key == "value":
             return map_value_range(value)
         if key == "entity_type":
-            return ("entity__entity_type", EntityType.objects.get(entity_type=value))
+            entity_type = config.get_entity_type(value)
+            if entity_type is None:
+                raise EntityType.DoesNotExist("EntityType matching query does not exist.")
+            return ("entity__entity_type", entity_type)
     except Exception as err:
         raise ValueError(f"Failed to map filter value {value} filter {key}: {err}")
 
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
+def alarm_values(alarm):
+    """
+    Values of a stored alarm the table rows are built from, shaped like the
+    archived alarms of common_utils.archive with its first image as media.
+    """
+    return {
+        "id": alarm.id,
+        "event_uid": alarm.event_uid,
+        "created_at": alarm.created_at,
+        "timestamp": alarm.timestamp,
+        "entity_id": alarm.entity_id,
+        "entity_uid": alarm.entity.entity_uid,
+        "flag_type_id": alarm.flag_type_id,
+        "flag_type": alarm.flag_type.name,
+        "severity_level": alarm.severity.level,
+        "severity_unicode_char": alarm.severity.unicode_char,
+        "value": alarm.value,
+        "ack_status": alarm.ack_status,
+        "feedback_provided": alarm.feedback_provided,
+        "media": [
+            {"media_type": alarm_media.media.media_type, "media_url": alarm_media.media.media_url}
+            for alarm_media in alarm.first_image_media
+        ],
+        "tags": [{"name": alarm_tag.tag.name} for alarm_tag in alarm.alarm_tags.all()],
+    }
+
+
+def alarm_filters(tenant, entity_type, validated_filters, config, from_date, to_date):
+    """
+    Q of the alarms of the table matching the validated filters, with the
+    same filters as (lookup, value) pairs for the archived alarms.
+    """
+    lookup_filters = Q()
+    lookup_filters &= Q(tenant=tenant)
+    lookup_filters &= Q(exclude_from_dashboard=False)
+    lookup_filters &= Q(created_at__range=(from_date, to_date))
+
+    # the same filters, applied to the archived alarms
+    archive_lookups = [("exclude_from_dashboard", False), ("media__media_type", Media.IMAGE)]
+    if entity_type:
+        lookup_filters &= Q(entity__entity_type=entity_type)
+        archive_lookups.append(("entity__entity_type", entity_type))
+
+    for key, value in validated_filters:
+        filter_map = filter_mapping(key, value, config)
+        if filter_map:
+            if isinstance(filter_map, list):
+                for field, val in filter_map:
+                    lookup_filters &= Q(**{field: val})
+                    archive_lookups.append((field, val))
+            else:
+                field, val = filter_map
+                lookup_filters &= Q(**{field: val})
+                archive_lookups.append((field, val))
 
-        return custom_route_handler
+    return lookup_filters, archive_lookups
 
 
-router = APIRouter(
-    route_class=TimedRoute,
-)
+def alarms_with_images(lookup_filters):
+    """
+    Alarms matching the filters that have an image, newest first, with their
+    first image and their tags prefetched.
+    """
+    return (
+        Alarm.objects.filter(lookup_filters)
+        .filter(
+            models.Exists(
+                AlarmMedia.objects.filter(
+                    alarm=models.OuterRef("pk"),
+                    created_at=models.OuterRef("created_at"),
+                    media__media_type=Media.IMAGE,
+                )
+            )
+        )
+        .select_related(
+            "flag_type", "severity", "entity", "entity__entity_type", "tenant"
+        )
+        .prefetch_related(
+            Prefetch("alarm_tags", queryset=AlarmTag.objects.select_related("tag")),
+            Prefetch(
+                "alarmmedia_set",
+                queryset=AlarmMedia.objects.select_related("media")
+                .filter(media__media_type=Media.IMAGE)
+                .order_by("id")[:1],
+                to_attr="first_image_media",
+            ),
+        )
+        .distinct()
+        .order_by("-created_at")
+    )
 
 
-def create_filter_model(fields: Dict[str, Optional[str]]):
+def alarm_row(alarm, location, event_name, timezone_str, AzAccoutKey):
     """
-    This function creates a dynamic Pydantic model based on the fields provided,
-    without setting default values.
+    Table row of the alarm values, see alarm_values, previewed by its first image.
     """
-    return create_model(
-        "DynamicFilterModel", **{k: (Optional[str], v) for k, v in fields.items()}
-    )
+    media = next(media for media in alarm["media"] if media["media_type"] == Media.IMAGE)
+    return {
+        "id": alarm["id"],
+        "event_uid": alarm["event_uid"],
+        "event_date": convert_to_local_time(alarm["created_at"], timezone_str=timezone_str).strftime("%Y-%m-%d"),
+        "start_time": convert_to_local_time(alarm["timestamp"], timezone_str=timezone_str).strftime("%H:%M:%S"),
+        "end_time": convert_to_local_time(alarm["timestamp"], timezone_str=timezone_str).strftime("%H:%M:%S"),
+        "timestamp": convert_to_local_time(alarm["created_at"], timezone_str=timezone_str).strftime("%H:%M:%S"),
+        "location": location,
+        "event_name": event_name,
+        "media_type": media["media_type"],
+        "severity_level": alarm["severity_unicode_char"],
+        "value": map_value(alarm["value"], flag_type=alarm["flag_type"]),
+        "preview": f"{media['media_url']}?{AzAccoutKey}",
+        "ack_status": "✅" if alarm["ack_status"] else "⬛",
+        "severity_level_numerical": int(alarm["severity_level"]),
+        "feedback_provided": "✅" if alarm["feedback_provided"] else "⬛",
+        "tags": [tag["name"] for tag in alarm["tags"]],
+    }
+
+
+router = APIRouter()
 
 
 description = """
     URL Path: /alarm
 
-    TO DO
+    Pagination:
+        By default pages are addressed with page/items_per_page.
+        Passing cursor switches to keyset pagination on (created_at, id):
+        an empty cursor returns the first page and every response carries
+        the next_cursor to request the following one (null on the last page).
+        count_mode selects how total_record is computed:
+        exact (default), estimated, cached or none.
+
+    Archive:
+        Alarms of the months archived for the tenant are read from the
+        archive files and follow the alarms of the database.
 
 """
 
@@ -138,6 +246,7 @@ description = """
     tags=["Alarm"],
     description=description,
 )
+@db_handler
 def get_alarm_data(
     response: Response,
     tenant_domain: str,
@@ -148,6 +257,8 @@ def get_alarm_data(
     page: int = 1,
     language: str = None,
     entity_type: str = f"gate",
+    cursor: Optional[str] = None,
+    count_mode: str = "exact",
 ):
     results = {}
     try:
@@ -161,7 +272,8 @@ def get_alarm_data(
                     status_code=400, detail="Invalid JSON format for user_filters"
                 )
 
-        if not Tenant.objects.filter(domain=tenant_domain).exists():
+        tenant = Tenant.objects.filter(domain=tenant_domain).first()
+        if tenant is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -174,7 +286,8 @@ def get_alarm_data(
             return results
 
         alarm_type = map_entity_type_to_table_type(entity_type)
-        if not TableType.objects.filter(name=alarm_type).exists():
+        config = get_table_config(tenant, alarm_type)
+        if config is None and not TableType.objects.filter(name=alarm_type).exists():
             results = {
                 "error": {
                     "status_code": "not found",
@@ -186,13 +299,7 @@ def get_alarm_data(
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
 
-        # language = Language.objects.get(code=language)
-        table_type = TableType.objects.get(name=alarm_type)
-        tenant = Tenant.objects.get(domain=tenant_domain)
         timezone_str = tenant.timezone
-        entity_type = EntityType.objects.filter(
-            entity_type=entity_type, tenant=tenant
-        ).first()
 
         msg = f"using given language {language}"
         if not language:
@@ -203,7 +310,8 @@ def get_alarm_data(
             else:
                 language = "de"
                 msg = f"using german language"
-        if not Language.objects.filter(code=language).exists():
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -215,10 +323,10 @@ def get_alarm_data(
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
 
-        language = Language.objects.get(code=language)
+        language = language_obj
         AzAccoutKey = TenantStorageSettings.objects.get(tenant=tenant).account_key
 
-        if not TenantTable.objects.filter(tenant=tenant, table_type=table_type):
+        if config is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -231,6 +339,7 @@ def get_alarm_data(
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
 
+        entity_type = config.get_entity_type(entity_type)
         today = datetime.today()
         if from_date is None:
             from_date = datetime(today.year, today.month, today.day)
@@ -255,148 +364,95 @@ def get_alarm_data(
             response.status_code = status.HTTP_400_BAD_REQUEST
             return results
 
-        tenant_table = TenantTable.objects.get(tenant=tenant, table_type=table_type)
-
-        tenant_table_filter = TenantTableFilter.objects.filter(
-            tenant_table=tenant_table, is_active=True
-        )
+        if count_mode not in COUNT_MODES:
+            results["error"] = {
+                "status_code": 400,
+                "status_description": f"Bad Request, unknown count_mode {count_mode}",
+                "detail": f"Supported count modes: {COUNT_MODES}",
+            }
 
-        filter_fields = {
-            fil.table_filter.filter_name: fil.default for fil in tenant_table_filter
-        }
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return results
 
-        DynamicFilterModel = create_filter_model(filter_fields)
         try:
-            validated_filters = DynamicFilterModel(**filters_dict)
+            validated_filters = config.filter_model(**filters_dict)
         except ValidationError as e:
             results["error"] = {"status_code": 422, "detail": f"{e.errors()}"}
 
             response.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
             return results
 
-        lookup_filters = Q()
-        lookup_filters &= Q(tenant=tenant)
-        lookup_filters &= Q(exclude_from_dashboard=False)
-        lookup_filters &= Q(created_at__range=(from_date, to_date))
-
-        if entity_type:
-            lookup_filters &= Q(entity__entity_type=entity_type)
-
-        for key, value in validated_filters:
-            filter_map = filter_mapping(key, value, tenant)
-            if filter_map:
-                if isinstance(filter_map, list):
-                    for field, val in filter_map:
-                        lookup_filters &= Q(**{field: val})
-                else:
-                    field, val = filter_map
-                    lookup_filters &= Q(**{field: val})
-
-        alarms_with_images = (
-            Alarm.objects.filter(lookup_filters)
-            .filter(
-                models.Exists(
-                    AlarmMedia.objects.filter(
-                        alarm=models.OuterRef("pk"), media__media_type=Media.IMAGE
-                    )
-                )
-            )
-            .select_related(
-                "flag_type", "severity", "entity", "entity__entity_type", "tenant"
-            )
-            .prefetch_related(
-                Prefetch("alarm_tags", queryset=AlarmTag.objects.select_related("tag")),
-                Prefetch(
-                    "alarmmedia_set",
-                    queryset=AlarmMedia.objects.select_related("media")
-                    .filter(media__media_type=Media.IMAGE)
-                    .order_by("id")[:1],
-                    to_attr="first_image_media",
-                ),
-            )
-            .distinct()
-            .order_by("-created_at")
+        lookup_filters, archive_lookups = alarm_filters(
+            tenant, entity_type, validated_filters, config, from_date, to_date
+        )
+        alarms, read_archive = exclude_archived(
+            alarms_with_images(lookup_filters), "alarm", tenant.domain, from_date
         )
+        archived_alarms = None
+        if read_archive:
+            try:
+                compile_lookups("alarm", archive_lookups)
+            except UnsupportedLookup as err:
+                results["error"] = {
+                    "status_code": 400,
+                    "status_description": f"Bad Request, filter not supported on archived alarms",
+                    "detail": f"{err}",
+                }
 
-        total_count = alarms_with_images.count()
+                response.status_code = status.HTTP_400_BAD_REQUEST
+                return results
 
-        # Apply pagination
-        start = (page - 1) * items_per_page
-        end = start + items_per_page
-        paginated_alarms = alarms_with_images[start:end]
+            # only the archived alarms of the page are read
+            archived_alarms = functools.partial(read_page, "alarm", tenant.domain, from_date, to_date, archive_lookups)
 
-        rows = []
-        for alarm in paginated_alarms:
+        total_count = count_records(alarms, count_mode)
+        if total_count is not None and read_archive:
+            total_count += count_rows("alarm", tenant.domain, from_date, to_date, archive_lookups)
 
-            flag_type = alarm.flag_type
-            plant_entity = PlantEntity.objects.get(
-                entity_uid=alarm.entity.entity_uid, entity_type__tenant=tenant
+        # Apply pagination
+        try:
+            paginated_alarms, archived_page, next_cursor = paginate(
+                alarms, archived_alarms, cursor, page, items_per_page
             )
+        except ValueError as err:
+            results["error"] = {
+                "status_code": 400,
+                "status_description": f"Bad Request, invalid cursor",
+                "detail": f"{err}",
+            }
+
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return results
 
-            if not PlantEntityLocalization.objects.filter(
-                plant_entity=plant_entity,
-                language=language,
-            ).exists():
+        localizer = LocalizationResolver(language)
+        rows = []
+        for alarm in [alarm_values(alarm) for alarm in paginated_alarms] + archived_page:
+
+            location = localizer.title(PlantEntity, alarm["entity_id"])
+            if location is None:
                 results["error"] = {
                     "status_code": "non-matching-query",
-                    "status_description": f"localization {language.name} not found for {plant_entity.entity_uid}",
-                    "detail": f"localization {language.name} not found for {plant_entity.entity_uid}",
+                    "status_description": f"localization {language.name} not found for {alarm['entity_uid']}",
+                    "detail": f"localization {language.name} not found for {alarm['entity_uid']}",
                 }
 
                 response.status_code = status.HTTP_404_NOT_FOUND
                 return results
 
-            if not FlagTypeLocalization.objects.filter(
-                flag_type=flag_type, language=language
-            ).exists():
+            event_name = localizer.title(FlagType, alarm["flag_type_id"])
+            if event_name is None:
                 results["error"] = {
                     "status_code": "non-matching-query",
-                    "status_description": f"localization {language.name} not found for {flag_type.name}",
-                    "detail": f"localization {language.name} not found for {flag_type.name}",
+                    "status_description": f"localization {language.name} not found for {alarm['flag_type']}",
+                    "detail": f"localization {language.name} not found for {alarm['flag_type']}",
                 }
 
                 response.status_code = status.HTTP_404_NOT_FOUND
                 return results
 
-            plant_entity_localization = PlantEntityLocalization.objects.get(
-                plant_entity=PlantEntity.objects.get(
-                    entity_uid=alarm.entity.entity_uid, entity_type__tenant=tenant
-                ),
-                language=language,
-            )
-
-            flag_type_localization = FlagTypeLocalization.objects.get(
-                flag_type=flag_type,
-                language=language,
-            )
+            logger.info(f"================= {alarm['event_uid']}")
 
-            # media = AlarmMedia.objects.filter(
-            #     alarm=alarm, media__media_type="image"
-            # ).first()
-
-            if alarm.first_image_media:  # check if not empty
-                media = alarm.first_image_media[0].media  # AlarmMedia → media FK
-
-            logger.info(f"================= {media} {alarm.event_uid}")
-
-            row = {
-                "id": alarm.id,
-                "event_uid": alarm.event_uid,
-                "event_date": convert_to_local_time(alarm.created_at, timezone_str=timezone_str).strftime("%Y-%m-%d"),
-                "start_time": convert_to_local_time(alarm.timestamp, timezone_str=timezone_str).strftime("%H:%M:%S"),
-                "end_time": convert_to_local_time(alarm.timestamp, timezone_str=timezone_str).strftime("%H:%M:%S"),
-                "timestamp": convert_to_local_time(alarm.created_at, timezone_str=timezone_str).strftime("%H:%M:%S"),
-                "location": plant_entity_localization.title,
-                "event_name": flag_type_localization.title,
-                "media_type": media.media_type,
-                "severity_level": alarm.severity.unicode_char,
-                "value": map_value(alarm.value, flag_type=flag_type.name),
-                "preview": f"{media.media_url}?{AzAccoutKey}",
-                "ack_status": "✅" if alarm.ack_status else "⬛",
-                "severity_level_numerical": int(alarm.severity.level),
-                "feedback_provided": "✅" if alarm.feedback_provided else "⬛",
-                "tags": [alarm_tag.tag.name for alarm_tag in alarm.alarm_tags.all()],
-            }
+            row = alarm_row(alarm, location, event_name, timezone_str, AzAccoutKey)
 
             rows.append(row)
 
@@ -409,9 +465,11 @@ def get_alarm_data(
             "total_record": total_record,
             "user_filters": lookup_filters.children,
             "validated_filters": validated_filters,
-            "pages": math.ceil(total_record / items_per_page),
+            "pages": math.ceil(total_record / items_per_page) if total_record is not None else None,
             "items": rows,
         }
+        if cursor is not None:
+            results["data"]["next_cursor"] = next_cursor
         results["status_code"] = "ok"
         results["detail"] = "data retrieved successfully"
         results["status_description"] = "OK"
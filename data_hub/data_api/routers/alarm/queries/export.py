@@ -0,0 +1,230 @@
+import json
+import pytz
+import django
+from datetime import datetime
+from datetime import time as dtime
+from typing import Optional
+from fastapi import status
+from fastapi import Response
+from fastapi import APIRouter
+from fastapi import HTTPException, Query
+from pydantic import ValidationError
+from common_utils.filters.utils import map_entity_type_to_table_type
+
+django.setup()
+from django.core.exceptions import ObjectDoesNotExist
+from tenants.models import (
+    Tenant,
+    PlantEntity,
+    TenantStorageSettings,
+)
+from acceptance_control.models import FlagType
+from metadata.models import Language
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.table_config.config import get_table_config
+from common_utils.archive.store import iter_rows, compile_lookups, UnsupportedLookup
+from common_utils.archive.reader import exclude_archived
+from common_utils.export.stream import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    chunked,
+    export_response,
+)
+from common_utils.db.executor import db_handler
+from data_api.routers.alarm.queries.data import (
+    alarm_filters,
+    alarms_with_images,
+    alarm_values,
+    alarm_row,
+)
+
+router = APIRouter()
+
+EXPORT_COLUMNS = (
+    "id", "event_uid", "event_date", "start_time", "end_time", "timestamp", "location", "event_name",
+    "media_type", "severity_level", "value", "preview", "ack_status", "severity_level_numerical",
+    "feedback_provided", "tags",
+)
+
+def export_chunks(alarms, archived, localizer, timezone_str, AzAccoutKey):
+    """
+    Rows of the alarms, EXPORT_CHUNK_SIZE at a time, then of the archived
+    alarms. The alarms are read through a server-side cursor, their first
+    image and tags are prefetched per chunk, the titles come from the
+    localization cache.
+    """
+    stored = (alarm_values(alarm) for alarm in alarms.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    for source in (stored, archived):
+        for chunk in chunked(source, EXPORT_CHUNK_SIZE):
+            yield [
+                alarm_row(
+                    alarm,
+                    localizer.title(PlantEntity, alarm["entity_id"], default=alarm["entity_uid"]),
+                    localizer.title(FlagType, alarm["flag_type_id"], default=alarm["flag_type"]),
+                    timezone_str,
+                    AzAccoutKey,
+                )
+                for alarm in chunk
+            ]
+
+description = """
+    URL Path: /alarm/export
+
+    All the alarms of GET /alarm for the same user_filters, date range,
+    language and entity_type, streamed as a file instead of paged.
+
+    Query:
+        - format: csv (default), a header line then one line per alarm, or
+          ndjson, one JSON object per line with the fields of the items of GET /alarm
+
+    Alarms are read in chunks through a server-side cursor, the memory used
+    does not depend on the number of alarms exported. Errors found once the
+    file has started end it early.
+"""
+
+@router.api_route(
+    "/alarm/export", methods=["GET"], tags=["Alarm"], description=description,
+)
+@db_handler
+def export_alarm_data(
+    response: Response,
+    tenant_domain: str,
+    user_filters: Optional[str] = Query(None),
+    from_date: datetime = None,
+    to_date: datetime = None,
+    language: str = None,
+    entity_type: str = "gate",
+    export_format: str = Query("csv", alias="format"),
+):
+    results = {}
+    try:
+        if export_format not in EXPORT_FORMATS:
+            results["error"] = {
+                "status_code": 400,
+                "status_description": f"Bad Request, unknown format {export_format}",
+                "detail": f"Supported formats: {list(EXPORT_FORMATS)}",
+            }
+
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return results
+
+        filters_dict = {}
+        if user_filters:
+            try:
+                filters_dict = json.loads(user_filters)
+            except json.JSONDecodeError:
+                raise HTTPException(
+                    status_code=400, detail="Invalid JSON format for user_filters"
+                )
+
+        tenant = Tenant.objects.filter(domain=tenant_domain).first()
+        if tenant is None:
+            results["error"] = {
+                "status_code": "not found",
+                "status_description": f"Tenant {tenant_domain} not found",
+                "detail": f"Tenant {tenant_domain} not found !",
+            }
+
+            response.status_code = status.HTTP_404_NOT_FOUND
+            return results
+
+        config = get_table_config(tenant, map_entity_type_to_table_type(entity_type))
+        if config is None:
+            results["error"] = {
+                "status_code": "not found",
+                "status_description": f"Table Type alarm not defined for tenant {tenant_domain}",
+                "detail": f"Table Type alarm not found for {tenant_domain}!",
+            }
+
+            response.status_code = status.HTTP_404_NOT_FOUND
+            return results
+
+        language = language or tenant.default_language or "de"
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
+            results["error"] = {
+                "status_code": "not found",
+                "status_description": f"Given Language {language} not supported",
+                "detail": f"Given Language {language} not supported!",
+            }
+
+            response.status_code = status.HTTP_404_NOT_FOUND
+            return results
+
+        try:
+            validated_filters = config.filter_model(**filters_dict)
+        except ValidationError as e:
+            results["error"] = {"status_code": 422, "detail": f"{e.errors()}"}
+
+            response.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+            return results
+
+        AzAccoutKey = TenantStorageSettings.objects.get(tenant=tenant).account_key
+
+        today = datetime.today()
+        if from_date is None:
+            from_date = datetime(today.year, today.month, today.day)
+
+        if to_date is None:
+            to_date = from_date
+
+        local_tz = pytz.timezone(tenant.timezone)
+        from_date = local_tz.localize(datetime.combine(from_date, dtime.min))
+        to_date = local_tz.localize(datetime.combine(to_date, dtime.max))
+
+        lookup_filters, archive_lookups = alarm_filters(
+            tenant, config.get_entity_type(entity_type), validated_filters, config, from_date, to_date
+        )
+        alarms, read_archive = exclude_archived(
+            alarms_with_images(lookup_filters), "alarm", tenant.domain, from_date
+        )
+        if read_archive:
+            try:
+                compile_lookups("alarm", archive_lookups)
+            except UnsupportedLookup as err:
+                results["error"] = {
+                    "status_code": 400,
+                    "status_description": f"Bad Request, filter not supported on archived alarms",
+                    "detail": f"{err}",
+                }
+
+                response.status_code = status.HTTP_400_BAD_REQUEST
+                return results
+
+        archived = iter_rows("alarm", tenant.domain, from_date, to_date, archive_lookups) if read_archive else ()
+
+        return export_response(
+            export_chunks(alarms, archived, LocalizationResolver(language_obj), tenant.timezone, AzAccoutKey),
+            export_format,
+            EXPORT_COLUMNS,
+            f"alarms_{tenant.domain}_{from_date:%Y%m%d}_{to_date:%Y%m%d}",
+        )
+
+    except ObjectDoesNotExist as e:
+        results["error"] = {
+            "status_code": "non-matching-query",
+            "status_description": f"Matching query was not found",
+            "detail": f"matching query does not exist. {e}",
+        }
+
+        response.status_code = status.HTTP_404_NOT_FOUND
+
+    except HTTPException as e:
+        results["error"] = {
+            "status_code": f"{e.status_code}",
+            "status_description": f"{e.detail}",
+            "detail": f"{e.detail}",
+        }
+
+        response.status_code = e.status_code
+
+    except Exception as e:
+        results["error"] = {
+            "status_code": "server-error",
+            "status_description": "Internal Server Error",
+            "detail": str(e),
+        }
+
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    return results
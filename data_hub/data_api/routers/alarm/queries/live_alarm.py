@@ -20,11 +20,9 @@ from django.db.models import Prefetch
 from typing import Dict, List, Optional
 from pydantic import BaseModel, Field, create_model, ValidationError
 from common_utils.timezone_utils.timeloc import (
-    get_location_and_timezone,
     convert_to_local_time,
 )
-
-timezone_str = get_location_and_timezone()
+from common_utils.live_feed.channel import publish
 
 django.setup()
 from django.core.exceptions import ObjectDoesNotExist
@@ -40,9 +38,9 @@ from acceptance_control.models import (
     Alarm,
     AlarmTag,
     AlarmMedia,
+    Media,
     Severity,
     FlagType,
-    FlagTypeLocalization,
     )
 
 from metadata.models import (
@@ -50,8 +48,9 @@ from metadata.models import (
     TenantTable,
     Language,
     TenantTableFilter,
-    PlantEntityLocalization,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.db.executor import db_handler
 
 def filter_mapping(key, value, tenant):
     try:
@@ -67,25 +66,8 @@ def filter_mapping(key, value, tenant):
     except Exception as err:
         raise ValueError(f"Failed to map filter value {value} filter {key}: {err}")
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
 
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 description = """
     URL Path: /alarm
@@ -97,6 +79,7 @@ description = """
 @router.api_route(
     "/alarm/live", methods=["GET"], tags=["Alarm"], description=description,
 )
+@db_handler
 def get_alarm_notification(
     response: Response, 
     tenant_domain:str,
@@ -108,7 +91,8 @@ def get_alarm_notification(
     ):
     results = {}
     try:
-        if not Tenant.objects.filter(domain=tenant_domain).exists():
+        tenant = Tenant.objects.filter(domain=tenant_domain).first()
+        if tenant is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -123,7 +107,6 @@ def get_alarm_notification(
         now = datetime.now(tz=timezone.utc)
         before = (now - timedelta(minutes=expire)).replace(tzinfo=timezone.utc)
         
-        tenant = Tenant.objects.get(domain=tenant_domain)
         entity_type = EntityType.objects.filter(entity_type=entity_type, tenant=tenant).first()
         if not language:
             lang_code = tenant.default_language
@@ -132,7 +115,8 @@ def get_alarm_notification(
             else:
                 language = 'de'
         
-        if not Language.objects.filter(code=language).exists():
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -144,7 +128,7 @@ def get_alarm_notification(
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
         
-        language = Language.objects.get(code=language)
+        language = language_obj
         AzAccoutKey = TenantStorageSettings.objects.get(tenant=tenant).account_key
         
         lookup_filters = Q()
@@ -157,19 +141,29 @@ def get_alarm_notification(
             lookup_filters &= Q(entity__entity_type=entity_type)
         
         rows = []
-        alarms = Alarm.objects.filter(lookup_filters).order_by('-created_at').prefetch_related(
+        alarms = Alarm.objects.filter(lookup_filters).order_by('-created_at').select_related(
+            'entity', 'flag_type', 'severity',
+        ).prefetch_related(
             Prefetch(
                 'alarm_tags',
                 queryset=AlarmTag.objects.select_related('tag')
-            )
+            ),
+            # the links share the created_at of their alarm, the range reads
+            # the partitions of the alarms only
+            Prefetch(
+                'alarmmedia_set',
+                queryset=AlarmMedia.objects.select_related('media').filter(
+                    created_at__range=(before, now), media__media_type=Media.IMAGE,
+                ).order_by('id')[:1],
+                to_attr='first_image_media',
+            ),
         )
+        localizer = LocalizationResolver(language)
         for alarm in alarms:
             flag_type = alarm.flag_type
-            plant_entity = PlantEntity.objects.get(entity_uid=alarm.entity.entity_uid, entity_type__tenant=tenant)
-            if not PlantEntityLocalization.objects.filter(
-                plant_entity=plant_entity,
-                language=language,
-            ).exists():
+            plant_entity = alarm.entity
+            location = localizer.title(PlantEntity, plant_entity.id)
+            if location is None:
                 results['error'] = {
                     'status_code': "non-matching-query",
                     'status_description': f'localization {language.name} not found for {plant_entity.entity_uid}',
@@ -179,10 +173,8 @@ def get_alarm_notification(
                 response.status_code = status.HTTP_404_NOT_FOUND
                 return results
                   
-            if not FlagTypeLocalization.objects.filter(
-                flag_type=flag_type,
-                language=language
-            ).exists():
+            event_name = localizer.title(FlagType, flag_type.id)
+            if event_name is None:
                 results['error'] = {
                     'status_code': "non-matching-query",
                     'status_description': f'localization {language.name} not found for {flag_type.name}',
@@ -191,22 +183,8 @@ def get_alarm_notification(
 
                 response.status_code = status.HTTP_404_NOT_FOUND
                 return results
-
-            plant_entity_localization = PlantEntityLocalization.objects.get(
-                plant_entity=PlantEntity.objects.get(entity_uid=alarm.entity.entity_uid, entity_type__tenant=tenant),
-                language=language,
-            )
-            
-            flag_type_localization = FlagTypeLocalization.objects.get(
-                flag_type=flag_type,
-                language=language,
-            )
-            
-            media = AlarmMedia.objects.filter(
-                alarm=alarm,
-                media__media_type='image'
-            ).first()
             
+            media = alarm.first_image_media[0] if alarm.first_image_media else None
             if not media:
                 continue
             
@@ -215,8 +193,8 @@ def get_alarm_notification(
                 "event_uid": alarm.event_uid,
                 "event_date": alarm.created_at.strftime('%Y-%m-%d'),
                 "timestamp": alarm.timestamp.strftime("%H:%M:%S"),
-                "location": plant_entity_localization.title,
-                "event_name": flag_type_localization.title,
+                "location": location,
+                "event_name": event_name,
                 "severity_level": alarm.severity.unicode_char,
                 "ack_status": alarm.ack_status,
                 "url": f"{media.media.media_url}?{AzAccoutKey}",
@@ -294,6 +272,7 @@ description = """
 @router.api_route(
     "/alarm/live", methods=["POST"], tags=["Alarm"], description=description,
 )
+@db_handler
 def update_alarm_status(
     response: Response,
     data: APIRequest,
@@ -322,6 +301,7 @@ def update_alarm_status(
         alarm = Alarm.objects.get(event_uid=event_uid)
         alarm.ack_status = True
         alarm.save()
+        publish({"event": "ack", "tenant_id": alarm.tenant_id, "alarm_id": alarm.id, "event_uid": alarm.event_uid})
         
         results['status_code'] = "ok"
         results["detail"] = "acknowledge status updated successfully"
@@ -0,0 +1,260 @@
+import time
+import json
+import asyncio
+import logging
+import threading
+import django
+from typing import Callable
+from fastapi import Request
+from fastapi import Response
+from fastapi import APIRouter
+from fastapi import status
+from fastapi.routing import APIRoute
+from fastapi.responses import StreamingResponse
+from django.db.models import Prefetch
+
+django.setup()
+from django.core.exceptions import ObjectDoesNotExist
+from tenants.models import (
+    Tenant,
+    EntityType,
+    PlantEntity,
+    TenantStorageSettings,
+)
+
+from acceptance_control.models import (
+    Alarm,
+    AlarmTag,
+    AlarmMedia,
+    FlagType,
+)
+
+from metadata.models import (
+    Language,
+)
+
+from common_utils.live_feed.channel import listen
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.db.executor import run_db
+from common_utils.db.connections import managed_connection
+
+# seconds between two keepalive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+# events kept for a slow client before new ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+router = APIRouter()
+
+def format_event(event:str, data:dict):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class Subscriber:
+    """
+    One open live feed stream and what it listens to.
+    """
+    def __init__(self, tenant, language, severity_level, entity_type, account_key, loop):
+        self.tenant_id = tenant.id
+        self.language = language
+        self.severity_level = severity_level
+        self.entity_type_id = entity_type.id if entity_type else None
+        self.account_key = account_key
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, message:str):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message:str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logging.warning(f"Live feed subscriber of tenant {self.tenant_id} is too slow, dropping an event")
+
+def build_live_row(alarm, media, language, account_key):
+    """
+    Row of the live feed, same as the items of GET /alarm/live. None if the
+    entity or the flag type has no localization in the language.
+    """
+    localizer = LocalizationResolver(language)
+    location = localizer.title(PlantEntity, alarm.entity_id)
+    event_name = localizer.title(FlagType, alarm.flag_type_id)
+
+    if location is None or event_name is None:
+        logging.warning(f"Localization {language.name} missing for alarm {alarm.event_uid}, not sent to the live feed")
+        return None
+
+    return {
+        "id": alarm.id,
+        "event_uid": alarm.event_uid,
+        "event_date": alarm.created_at.strftime('%Y-%m-%d'),
+        "timestamp": alarm.timestamp.strftime("%H:%M:%S"),
+        "location": location,
+        "event_name": event_name,
+        "severity_level": alarm.severity.unicode_char,
+        "ack_status": alarm.ack_status,
+        "url": f"{media.media.media_url}?{account_key}",
+        "name": media.media.media_name,
+        "type": media.media.media_type,
+        "tags": [alarm_tag.tag.name for alarm_tag in alarm.alarm_tags.all()],
+    }
+
+class LiveAlarmHub:
+    """
+    Fans the live feed events of this process out to the open streams. Each
+    event is read from the database once and localized once per language,
+    whatever the number of streams listening to the tenant.
+    """
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.started = False
+
+    def subscribe(self, subscriber:Subscriber):
+        with self.lock:
+            if not self.started:
+                listen(self.dispatch)
+                self.started = True
+            self.subscribers.add(subscriber)
+
+    def unsubscribe(self, subscriber:Subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def dispatch(self, event:dict):
+        with self.lock:
+            subscribers = [
+                subscriber for subscriber in self.subscribers if subscriber.tenant_id == event["tenant_id"]
+            ]
+
+        if not subscribers:
+            return
+
+        if event["event"] == "ack":
+            message = format_event("ack", {"id": event["alarm_id"], "event_uid": event["event_uid"]})
+            for subscriber in subscribers:
+                subscriber.push(message)
+            return
+
+        # the listener thread runs the queries, as a unit of work of its own
+        with managed_connection():
+            self.dispatch_alarm(event, subscribers)
+
+    def dispatch_alarm(self, event:dict, subscribers):
+        alarm = Alarm.objects.select_related('entity', 'flag_type', 'severity').prefetch_related(
+            Prefetch(
+                'alarm_tags',
+                queryset=AlarmTag.objects.select_related('tag')
+            )
+        ).filter(id=event["alarm_id"], ack_status=False, exclude_from_dashboard=False).first()
+        if alarm is None:
+            return
+
+        media = AlarmMedia.objects.select_related('media').filter(
+            alarm=alarm, created_at=alarm.created_at, media__media_type='image',
+        ).first()
+        if media is None:
+            return
+
+        messages = {}
+        for subscriber in subscribers:
+            if alarm.severity.level < subscriber.severity_level:
+                continue
+            if subscriber.entity_type_id and alarm.entity.entity_type_id != subscriber.entity_type_id:
+                continue
+
+            if subscriber.language.id not in messages:
+                row = build_live_row(alarm, media, subscriber.language, subscriber.account_key)
+                messages[subscriber.language.id] = format_event("alarm", row) if row else None
+
+            if messages[subscriber.language.id]:
+                subscriber.push(messages[subscriber.language.id])
+
+hub = LiveAlarmHub()
+
+def create_subscriber(tenant_domain, severity_level, language, entity_type, loop):
+    tenant = Tenant.objects.filter(domain=tenant_domain).first()
+    if tenant is None:
+        raise ObjectDoesNotExist(f"Tenant {tenant_domain} not found")
+
+    language = language or tenant.default_language or 'de'
+    language_obj = Language.objects.filter(code=language).first()
+    if language_obj is None:
+        raise ObjectDoesNotExist(f"Given Language {language} not supported")
+
+    return Subscriber(
+        tenant=tenant,
+        language=language_obj,
+        severity_level=severity_level,
+        entity_type=EntityType.objects.filter(entity_type=entity_type, tenant=tenant).first(),
+        account_key=TenantStorageSettings.objects.get(tenant=tenant).account_key,
+        loop=loop,
+    )
+
+async def stream(request:Request, subscriber:Subscriber):
+    try:
+        yield ": connected\n\n"
+        while not await request.is_disconnected():
+            try:
+                yield await asyncio.wait_for(subscriber.queue.get(), timeout=KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        hub.unsubscribe(subscriber)
+
+description = """
+    URL Path: /alarm/live/stream
+
+    Server-Sent Events feed of the live alarms, pushed instead of polling GET /alarm/live.
+
+    Events:
+        - alarm: a new unacknowledged alarm with its first image, same fields as the items of GET /alarm/live
+        - ack: {"id", "event_uid"} of an alarm acknowledged through POST /alarm/live
+
+    Only alarms with a severity level >= severity_level and on entities of entity_type are sent.
+    Load GET /alarm/live once when opening the stream, then apply the events to it.
+"""
+
+@router.api_route(
+    "/alarm/live/stream", methods=["GET"], tags=["Alarm"], description=description,
+)
+async def stream_alarm_notification(
+    request: Request,
+    response: Response,
+    tenant_domain:str,
+    severity_level:int=3,
+    language:str=None,
+    entity_type:str="gate",
+    ):
+    results = {}
+    try:
+        subscriber = await run_db(
+            create_subscriber, tenant_domain, severity_level, language, entity_type, asyncio.get_running_loop(),
+        )
+
+    except ObjectDoesNotExist as e:
+        results['error'] = {
+            'status_code': "non-matching-query",
+            'status_description': f'Matching query was not found',
+            'detail': f"matching query does not exist. {e}"
+        }
+
+        response.status_code = status.HTTP_404_NOT_FOUND
+        return results
+
+    except Exception as e:
+        results['error'] = {
+            'status_code': 'server-error',
+            "status_description": "Internal Server Error",
+            "detail": str(e),
+        }
+
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return results
+
+    hub.subscribe(subscriber)
+    return StreamingResponse(
+        stream(request, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -31,11 +31,14 @@ from metadata.models import (
     TenantTable,
     TenantTableAsset,
     TableAssetItem,
-    TableAssetLocalization,
-    TableAssetItemLocalization,
+    TableAsset,
     TenantTableFilter,
     TenantTableAssetItem,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.table_config.config import get_table_config
+from common_utils.assets.compose import delivery_item_media, compose_assets
+from common_utils.db.executor import db_handler
 
 from tenants.models import (
     TenantStorageSettings,
@@ -46,47 +49,11 @@ assets_order = {
     "bunker": 1,
 }
 
-def map_item_assets(delivery_id, item):
-    try:
-        if "delivery" in item.key:
-            return DeliveryMedia.objects.filter(
-                delivery__delivery_id=delivery_id, 
-                media__media_type=item.media_type
-                ).order_by('media__sensor_box__order')
-        if "impurity" in item.key:
-            return AlarmMedia.objects.filter(
-                alarm__delivery_id=delivery_id, 
-                alarm__flag_type__name="impurity", 
-                media__media_type=item.media_type,
-                alarm__exclude_from_dashboard=False,
-                )
-        else:
-            return []
-    except Exception as err:
-        raise ValueError(f"Error mapping items to assets: {err}")
-    
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 AzAccoutKey = os.getenv('AzAccoutKey')
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
 
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 
 description = """
@@ -146,6 +113,7 @@ This API is used to fetch comprehensive information and analytics related to a s
 @router.api_route(
     "/delivery/assets/{delivery_id}", methods=["GET"], tags=["Delivery"], description=description,
 )
+@db_handler
 def get_delivery_assets(response: Response, delivery_id:str, language:str=None):
     results = {}
     try:
@@ -159,7 +127,8 @@ def get_delivery_assets(response: Response, delivery_id:str, language:str=None):
             response.status_code = status.HTTP_400_BAD_REQUEST
             return results
     
-        if not Delivery.objects.filter(delivery_id=delivery_id).exists():
+        delivery = Delivery.objects.select_related('tenant').filter(delivery_id=delivery_id).first()
+        if delivery is None:
             results['error'] = {
                 'status_code': "Not-Found",
                 'status_description': f"delivery_id {delivery_id} is not found",
@@ -168,7 +137,6 @@ def get_delivery_assets(response: Response, delivery_id:str, language:str=None):
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
             
-        delivery = Delivery.objects.get(delivery_id=delivery_id)
         tenant = delivery.tenant
         if not language:
             lang_code = tenant.default_language
@@ -179,7 +147,8 @@ def get_delivery_assets(response: Response, delivery_id:str, language:str=None):
                 language = 'de'
                 msg = f"using german language"
         
-        if not Language.objects.filter(code=language).exists():
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -190,14 +159,10 @@ def get_delivery_assets(response: Response, delivery_id:str, language:str=None):
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
         
-        language = Language.objects.get(code=language)
-        table_assets = TenantTableAsset.objects.filter(
-            tenant_table=TenantTable.objects.get(
-                tenant=delivery.tenant,
-                table_type=TableType.objects.get(name='delivery'),
-            ),
-            is_active=True,
-        ).order_by('field_order__field_position')
+        language = language_obj
+        config = get_table_config(delivery.tenant, 'delivery')
+        if config is None:
+            raise TenantTable.DoesNotExist("TenantTable matching query does not exist.")
         
         AzAccoutKey = TenantStorageSettings.objects.get(tenant=delivery.tenant).account_key
         placeholder = {
@@ -206,65 +171,13 @@ def get_delivery_assets(response: Response, delivery_id:str, language:str=None):
             'time': (datetime.now() + timedelta(hours=2)).strftime(DATETIME_FORMAT),
             }
         
-        categories = []
-        data = []
-        
-        for table_asset in table_assets:
-            categories.append(
-                {
-                    'key': table_asset.table_asset.key,
-                    'name': TableAssetLocalization.objects.get(asset=table_asset.table_asset, language=language).title if TableAssetLocalization.objects.filter(asset=table_asset.table_asset, language=language) else table_asset.table_asset.key,
-                }
-            )
-            
-            items = []
-            table_asset_items = TenantTableAssetItem.objects.filter(tenant_table_asset=table_asset, is_active=True)
-            for item in table_asset_items:
-                item = item.asset_item
-                medias = map_item_assets(delivery_id=delivery_id, item=item)
-                
-                # if len(medias) >= 2 and "delivery" in item.key and item.media_type == "video":
-                #     for i, media_model in enumerate(medias):
-                #         items.append(
-                #             {
-                #                 'key': f'{item.key}_{str(i + 1)}',
-                #                 'title': f'{str(i + 1)} - {TableAssetItemLocalization.objects.get(asset_item=item, language=language).title}' if TableAssetItemLocalization.objects.filter(asset_item=item, language=language) else item.name,
-                #                 'type': item.media_type,
-                #                 'data': [
-                #                     {
-                #                         'url': f"{media_model.media.media_url}?{AzAccoutKey}",
-                #                         'name': media_model.media.media_name,
-                #                         'time': media_model.media.created_at.strftime(DATETIME_FORMAT),
-                #                     }
-                #                 ]
-                #             }
-                #         )
-                    
-                #     continue
-                
-                items.append(
-                    {
-                        'key': item.key,
-                        'title': TableAssetItemLocalization.objects.get(asset_item=item, language=language).title if TableAssetItemLocalization.objects.filter(asset_item=item, language=language) else item.name,
-                        'type': item.media_type,
-                        'data': [
-                            {
-                                'url': f"{media.media.media_url}?{AzAccoutKey}",
-                                'name': media.media.media_name if len(medias) else 'image',
-                                'time': media.media.created_at.strftime(DATETIME_FORMAT),
-                            } for media in medias if media.media.media_type == item.media_type
-                        ] if len(medias) else [placeholder]
-                    },
-                )
-            
-            data.append(
-                {
-                    "key": table_asset.table_asset.key,
-                    "title":  TableAssetLocalization.objects.get(asset=table_asset.table_asset, language=language).title if TableAssetLocalization.objects.filter(asset=table_asset.table_asset, language=language) else table_asset.table_asset.key,
-                    "items": items,
-                }
-            )
-        
+        categories, data = compose_assets(
+            config.assets,
+            localizer=LocalizationResolver(language),
+            item_media=delivery_item_media(delivery_id),
+            account_key=AzAccoutKey,
+            placeholder=placeholder,
+        )
         
         results = {
             "categories": categories,
@@ -2,10 +2,12 @@ import os
 import json
 import time
 import math
+import functools
 import pytz
 import django
 from django.db import connection
 from django.db.models import Max, F
+from django.db.models import DurationField, ExpressionWrapper
 from django.db.models import Q
 from fastapi import status
 from datetime import datetime
@@ -25,6 +27,12 @@ from common_utils.timezone_utils.timeloc import (
     get_location_and_timezone,
     convert_to_local_time,
 )
+from common_utils.pagination.keyset import (
+    COUNT_MODES,
+    count_records,
+)
+from common_utils.archive.store import read_page, count_rows, compile_lookups, UnsupportedLookup
+from common_utils.archive.reader import exclude_archived, paginate
 
 # timezone_str = get_location_and_timezone()
 
@@ -38,6 +46,7 @@ from tenants.models import (
 from acceptance_control.models import (
     Delivery, 
     DeliveryFlag, 
+    DeliveryFlagSummary,
     TenantFlagDeployment,
     Severity,
     FlagType,
@@ -49,13 +58,16 @@ from metadata.models import (
     TableType,
     TenantTable,
     Language,
-    TenantTableFilter,
-    PlantEntityLocalization,
     TenantAttachmentRequirement,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.table_config.config import get_table_config
+from common_utils.db.executor import db_handler
 
+# finished deliveries shorter than this are considered noise and not listed
+MIN_DELIVERY_DURATION = timedelta(seconds=30)
 
-def filter_mapping(key, value, tenant):
+def filter_mapping(key, value, config):
     try:
         if value is None:
             return None
@@ -72,49 +84,181 @@ def filter_mapping(key, value, tenant):
                 ("flags__exclude_from_dashboard", False),
             ]
         if key == "location":
-            return ("entity", PlantEntity.objects.get(entity_uid=value, entity_type__tenant=tenant))
+            return ("entity", config.get_plant_entity(value))
         if key == "flag_type":
-            return ("flags__flag_type", FlagType.objects.get(name=value))
+            return ("flags__flag_type", config.get_flag_type(value))
     except Exception as err:
         raise ValueError(f"Failed to map filter value {value} filter {key}: {err}")
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
 
-router = APIRouter(
-    route_class=TimedRoute,
-)
+# columns of the archived deliveries read by is_listed
+LISTED_COLUMNS = ('delivery_status', 'delivery_start', 'delivery_end')
+
+def is_listed(delivery):
+    """
+    Whether an archived delivery is listed, on-going or not shorter than
+    MIN_DELIVERY_DURATION, like the deliveries of the database.
+    """
+    if delivery['delivery_status'] == "on-going":
+        return True
+    if delivery['delivery_end'] is None:
+        return False
+    return delivery['delivery_end'] - delivery['delivery_start'] >= MIN_DELIVERY_DURATION
+
+def delivery_values(delivery):
+    """
+    Values of a stored delivery the table rows are built from, shaped like
+    the archived deliveries of common_utils.archive.
+    """
+    return {
+        "id": delivery.id,
+        "delivery_id": delivery.delivery_id,
+        "created_at": delivery.created_at,
+        "delivery_start": delivery.delivery_start,
+        "delivery_end": delivery.delivery_end,
+        "delivery_status": delivery.delivery_status,
+        "delivery_location": delivery.delivery_location,
+        "entity_id": delivery.entity_id,
+    }
+
+def delivery_filters(tenant, validated_filters, config, from_date, to_date):
+    """
+    Q of the deliveries of the table matching the validated filters, with the
+    same filters as (lookup, value) pairs for the archived deliveries.
+    """
+    lookup_filters = Q()
+    lookup_filters &= Q(tenant=tenant)
+    lookup_filters &= Q(created_at__range=(from_date, to_date ))
+    lookup_filters &= Q(is_deleted=False)
+    # the same filters, applied to the archived deliveries
+    archive_lookups = [("is_deleted", False)]
+    for key, value in validated_filters:
+        filter_map = filter_mapping(key, value, config=config)
+        if filter_map:
+            if isinstance(filter_map, list):
+                for field, val in filter_map:
+                    lookup_filters &= Q(**{field: val})
+                    archive_lookups.append((field, val))
+            else:
+                field, val = filter_map
+                lookup_filters &= Q(**{field: val}) 
+                archive_lookups.append((field, val))
+
+    return lookup_filters, archive_lookups
+
+def listed_deliveries(lookup_filters):
+    """
+    Deliveries matching the filters that are on-going or not shorter than
+    MIN_DELIVERY_DURATION, newest first.
+    """
+    return Delivery.objects.filter(lookup_filters).alias(
+        duration=ExpressionWrapper(F('delivery_end') - F('delivery_start'), output_field=DurationField())
+    ).filter(
+        Q(delivery_status="on-going") | Q(duration__gte=MIN_DELIVERY_DURATION)
+    ).order_by('-created_at').distinct()
+
+router = APIRouter()
 
-def create_filter_model(fields: Dict[str, Optional[str]]):
+def build_delivery_rows(deliveries, tenant, language, timezone_str, archived=()):
     """
-    This function creates a dynamic Pydantic model based on the fields provided,
-    without setting default values.
+    Build the table rows for a page of deliveries, followed by the archived
+    deliveries of the page, if any.
+
+    The tenant's flag deployments and ERP attachment requirements are loaded
+    once, the worst severity per (delivery, flag type), kept in
+    DeliveryFlagSummary, and the ERP values are fetched for the whole page
+    with one query each, so the number of queries
+    does not depend on the page size or on the number of deployed flags.
+    Archived deliveries carry their worst severities and ERP values.
     """
-    return create_model("DynamicFilterModel", **{k: (Optional[str], None) for k in fields})
+    if not deliveries and not archived:
+        return []
+
+    delivery_ids = [delivery.id for delivery in deliveries]
+    flags_deployment = list(
+        TenantFlagDeployment.objects.filter(tenant=tenant).select_related('flag_type')
+    )
+    erp_attachments = list(
+        TenantAttachmentRequirement.objects.filter(tenant=tenant, is_active=True).select_related('attachment_type')
+    )
+
+    worst_severity = {
+        (delivery_id, flag_type_id): unicode_char
+        for delivery_id, flag_type_id, unicode_char in DeliveryFlagSummary.objects.filter(
+            delivery__in=delivery_ids,
+            flag_type__in=[flag.flag_type_id for flag in flags_deployment],
+        ).values_list('delivery_id', 'flag_type_id', 'severity__unicode_char')
+    }
+
+    erp_values = {
+        (delivery_id, attachment_type_id): value
+        for delivery_id, attachment_type_id, value in DeliveryERPAttachment.objects.filter(
+            delivery__in=delivery_ids,
+            attachment_type__in=[erp_attachment.attachment_type_id for erp_attachment in erp_attachments],
+        ).values_list('delivery_id', 'attachment_type_id', 'value')
+    }
+
+    for delivery in archived:
+        for summary in delivery['flag_summaries']:
+            worst_severity[(delivery['id'], summary['flag_type_id'])] = summary['severity_unicode_char']
+        for attachment in delivery['erp']:
+            erp_values[(delivery['id'], attachment['attachment_type_id'])] = attachment['value']
+
+    localizer = LocalizationResolver(language)
+    rows = []
+    for delivery in [delivery_values(delivery) for delivery in deliveries] + list(archived):
+        row = {
+            "id": delivery['id'],
+            "delivery_id": delivery['delivery_id'],
+            "delivery_date": convert_to_local_time(utc_time=delivery['created_at'], timezone_str=timezone_str).strftime('%Y-%m-%d'),
+            "start_time": convert_to_local_time(utc_time=delivery['delivery_start'], timezone_str=timezone_str).strftime("%H:%M:%S"),
+            "end_time": convert_to_local_time(utc_time=delivery['delivery_end'], timezone_str=timezone_str).strftime("%H:%M:%S") if delivery['delivery_status'] == "done" else "-",
+            "location": localizer.title(PlantEntity, delivery['entity_id'], default=delivery['delivery_location']),
+            }
+
+        for flag in flags_deployment:
+            key = (delivery['id'], flag.flag_type_id)
+            row.update(
+                {
+                    flag.flag_type.name: worst_severity[key] if key in worst_severity else '🟩',
+                }
+            )
+
+        for erp_attachment in erp_attachments:
+            key = (delivery['id'], erp_attachment.attachment_type_id)
+            row.update(
+                {
+                    erp_attachment.attachment_type.name: erp_values[key] if key in erp_values else "⬛",
+                }
+            )
+
+        rows.append(
+            row
+        )
+
+    return rows
 
 description = """
     URL Path: /delivery
 
-    TO DO
+    Pagination:
+        By default pages are addressed with page/items_per_page.
+        Passing cursor switches to keyset pagination on (created_at, id):
+        an empty cursor returns the first page and every response carries
+        the next_cursor to request the following one (null on the last page).
+        count_mode selects how total_record is computed:
+        exact (default), estimated, cached or none.
+
+    Archive:
+        Deliveries of the months archived for the tenant are read from the
+        archive files and follow the deliveries of the database.
 
 """
 
 @router.api_route(
     "/delivery", methods=["GET"], tags=["Delivery"], description=description,
 )
+@db_handler
 def get_delivery_data(
     response: Response, 
     tenant_domain:str,
@@ -124,10 +268,13 @@ def get_delivery_data(
     items_per_page:int=15,
     page:int=1,
     language:str='de',
+    cursor:Optional[str]=None,
+    count_mode:str="exact",
     ):
     results = {}
     try:
-        if not Language.objects.filter(code=language).exists():
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -146,7 +293,8 @@ def get_delivery_data(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid JSON format for user_filters")
 
-        if not Tenant.objects.filter(domain=tenant_domain).exists():
+        tenant = Tenant.objects.filter(domain=tenant_domain).first()
+        if tenant is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -158,19 +306,8 @@ def get_delivery_data(
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
         
-        if not Tenant.objects.filter(domain=tenant_domain).exists():
-            results = {
-                "error": {
-                    "status_code": "not found",
-                    "status_description": f"Tenant {tenant_domain} not found",
-                    "detail": f"Tenant {Tenant} not found ! Existing options: {[tenant.domain for tenant in Tenant.objects.all()]}",
-                }
-            }
-            
-            response.status_code = status.HTTP_404_NOT_FOUND
-            return results
-        
-        if not TableType.objects.filter(name='delivery').exists():
+        config = get_table_config(tenant, 'delivery')
+        if config is None and not TableType.objects.filter(name='delivery').exists():
             results = {
                 "error": {
                     "status_code": "not found",
@@ -182,9 +319,7 @@ def get_delivery_data(
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
         
-        language = Language.objects.get(code=language)
-        table_type = TableType.objects.get(name='delivery')
-        tenant = Tenant.objects.get(domain=tenant_domain)
+        language = language_obj
         timezone_str = tenant.timezone
         
         today = datetime.today()
@@ -211,24 +346,21 @@ def get_delivery_data(
             response.status_code = status.HTTP_400_BAD_REQUEST    
             return results
         
-        tenant_table = TenantTable.objects.get(
-            tenant=tenant,
-            table_type=table_type
-        )
-        
-        tenant_table_filter = TenantTableFilter.objects.filter(
-            tenant_table=tenant_table,
-            is_active=True
-        )
-        
-        filter_fields = {
-            fil.table_filter.filter_name: '' for fil in tenant_table_filter
-        }
+        if count_mode not in COUNT_MODES:
+            results['error'] = {
+                'status_code': 400,
+                'status_description': f'Bad Request, unknown count_mode {count_mode}',
+                'detail': f"Supported count modes: {COUNT_MODES}"
+            }
+
+            response.status_code = status.HTTP_400_BAD_REQUEST    
+            return results
         
+        if config is None:
+            raise TenantTable.DoesNotExist("TenantTable matching query does not exist.")
         
-        DynamicFilterModel = create_filter_model(filter_fields)
         try:
-            validated_filters = DynamicFilterModel(**filters_dict)
+            validated_filters = config.filter_model_without_defaults(**filters_dict)
         except ValidationError as e:
             results['error'] = {
                 "status_code": 422,
@@ -238,115 +370,65 @@ def get_delivery_data(
             response.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
             return results
         
-        lookup_filters = Q()
-        lookup_filters &= Q(tenant=tenant)
-        lookup_filters &= Q(created_at__range=(from_date, to_date ))
-        lookup_filters &= Q(is_deleted=False)
-        for key, value in validated_filters:
-            filter_map = filter_mapping(key, value, tenant=tenant)
-            if filter_map:
-                if isinstance(filter_map, list):
-                    for field, val in filter_map:
-                        lookup_filters &= Q(**{field: val})
-                else:
-                    field, val = filter_map
-                    lookup_filters &= Q(**{field: val}) 
-        
+        lookup_filters, archive_lookups = delivery_filters(tenant, validated_filters, config, from_date, to_date)
+
         # language = Language.objects.get(code=language)
-        deliveries = Delivery.objects.filter(lookup_filters).order_by('-created_at').distinct()
-        
-        filtered_deliveries =  []
-        ongoing = []
-        for delivery in deliveries:
-            delivery_status = "done"
-            duration = (delivery.delivery_end - delivery.delivery_start).seconds
-            if delivery.delivery_status == "on-going":
-                delivery_status = "ongoing"
-            elif duration <30:
-                continue
-            
-            filtered_deliveries.append(delivery)
-            ongoing.append(delivery_status)
-
-        deliveries = filtered_deliveries
-
-        rows = []
-        total_record = len(deliveries)
-        for i, delivery in enumerate(deliveries[(page - 1) * items_per_page:page * items_per_page]):
-            row = {
-                "id": delivery.id,
-                "delivery_id": delivery.delivery_id,
-                "delivery_date": convert_to_local_time(utc_time=delivery.created_at, timezone_str=timezone_str).strftime('%Y-%m-%d'),
-                "start_time": convert_to_local_time(utc_time=delivery.delivery_start, timezone_str=timezone_str).strftime("%H:%M:%S"),
-                "end_time": convert_to_local_time(utc_time=delivery.delivery_end, timezone_str=timezone_str).strftime("%H:%M:%S") if delivery.delivery_status == "done" else "-",
-                "location": PlantEntityLocalization.objects.get(plant_entity=delivery.entity, language=language).title if PlantEntityLocalization.objects.filter(plant_entity=delivery.entity, language=language).exists() else delivery.delivery_location,
+        deliveries = listed_deliveries(lookup_filters)
+        deliveries, read_archive = exclude_archived(deliveries, 'delivery', tenant.domain, from_date)
+        archived_deliveries = None
+        if read_archive:
+            try:
+                compile_lookups('delivery', archive_lookups)
+            except UnsupportedLookup as err:
+                results['error'] = {
+                    'status_code': 400,
+                    'status_description': f'Bad Request, filter not supported on archived deliveries',
+                    'detail': f"{err}"
                 }
 
+                response.status_code = status.HTTP_400_BAD_REQUEST
+                return results
 
-            flags_deployment = TenantFlagDeployment.objects.filter(tenant=tenant)
-            for flag in flags_deployment:
-                flags = DeliveryFlag.objects.filter(
-                    delivery=delivery,
-                    flag_type=flag.flag_type,
-                    exclude_from_dashboard=False,
-                ).annotate(
-                    max_severity=Max('severity__level')
-                ).filter(
-                    severity__level=F('max_severity')
-                )
-                
-                if not flags.exists():
-                    row.update(
-                        {
-                            flag.flag_type.name: '🟩',
-                        }
-                    )
-                    
-                    continue
-                
-                flag = flags.last()
-                for flag_ in flags:
-                    if flag_.severity.level > flag.severity.level:
-                            flag = flag_
-
-                row.update(
-                    {
-                        flag.flag_type.name: flag.severity.unicode_char
-                    }
-                )
-            
-            erp_attachments = TenantAttachmentRequirement.objects.filter(tenant=tenant, is_active=True)
-            for erp_attachment in erp_attachments:
-                if not DeliveryERPAttachment.objects.filter(
-                    delivery=delivery,
-                    attachment_type=erp_attachment.attachment_type
-                ).exists():
-                    row.update(
-                        {
-                            erp_attachment.attachment_type.name: "⬛",
-                        }
-                    )
-                    continue
-                
-                row.update(
-                    {
-                        erp_attachment.attachment_type.name: DeliveryERPAttachment.objects.get(
-                            delivery=delivery,
-                            attachment_type=erp_attachment.attachment_type
-                        ).value,
-                    }
-                )
-            rows.append(
-                row
+            # only the archived deliveries of the page are read
+            archived_deliveries = functools.partial(
+                read_page, 'delivery', tenant.domain, from_date, to_date, archive_lookups, predicate=is_listed,
             )
+
+        total_record = count_records(deliveries, count_mode)
+        if total_record is not None and read_archive:
+            total_record += count_rows(
+                'delivery', tenant.domain, from_date, to_date, archive_lookups, predicate=is_listed, columns=LISTED_COLUMNS,
+            )
+
+        try:
+            deliveries, archived_page, next_cursor = paginate(deliveries, archived_deliveries, cursor, page, items_per_page)
+        except ValueError as err:
+            results['error'] = {
+                'status_code': 400,
+                'status_description': f'Bad Request, invalid cursor',
+                'detail': f"{err}"
+            }
+
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return results
+
+        rows = build_delivery_rows(
+            deliveries=deliveries,
+            tenant=tenant,
+            language=language,
+            timezone_str=timezone_str,
+            archived=archived_page,
+        )
         
         results['data'] = {
             "type": "collection",
             "total_record": total_record,
             "filters": lookup_filters,
-            "pages": math.ceil(total_record / items_per_page),
+            "pages": math.ceil(total_record / items_per_page) if total_record is not None else None,
             "items": rows,
         }
+        if cursor is not None:
+            results['data']['next_cursor'] = next_cursor
         results['status_code'] = "ok"
         results["detail"] = "data retrieved successfully"
         results["status_description"] = "OK"
@@ -32,26 +32,10 @@ from metadata.models import (
     ERPDataType,
     TenantAttachmentRequirement,
 )
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
 
-        return custom_route_handler
-    
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 
 description = """
@@ -64,6 +48,7 @@ description = """
 @router.api_route(
     "/delivery/erp", methods=["POST"], tags=["Delivery"], description=description,
 )
+@db_handler
 def update_erp_data(
     response: Response,
     erp_data_type: Dict,
@@ -0,0 +1,212 @@
+import json
+import pytz
+import django
+from datetime import datetime
+from datetime import time as dtime
+from typing import Optional
+from fastapi import status
+from fastapi import Response
+from fastapi import APIRouter
+from fastapi import HTTPException, Query
+from pydantic import ValidationError
+
+django.setup()
+from django.core.exceptions import ObjectDoesNotExist
+from tenants.models import Tenant
+from acceptance_control.models import TenantFlagDeployment
+from metadata.models import (
+    Language,
+    TenantTable,
+    TenantAttachmentRequirement,
+)
+from common_utils.table_config.config import get_table_config
+from common_utils.archive.store import iter_rows, compile_lookups, UnsupportedLookup
+from common_utils.archive.reader import exclude_archived
+from common_utils.export.stream import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    chunked,
+    export_response,
+)
+from common_utils.db.executor import db_handler
+from data_api.routers.delivery.queries.data import (
+    delivery_filters,
+    listed_deliveries,
+    build_delivery_rows,
+    is_listed,
+)
+
+router = APIRouter()
+
+def export_columns(tenant):
+    """
+    Columns of the delivery rows of the tenant, one per deployed flag type
+    and per ERP attachment after the delivery fields, see build_delivery_rows.
+    """
+    return [
+        "id", "delivery_id", "delivery_date", "start_time", "end_time", "location",
+        *TenantFlagDeployment.objects.filter(tenant=tenant).values_list('flag_type__name', flat=True),
+        *TenantAttachmentRequirement.objects.filter(tenant=tenant, is_active=True).values_list('attachment_type__name', flat=True),
+    ]
+
+def export_chunks(deliveries, archived, tenant, language, timezone_str):
+    """
+    Rows of the deliveries, EXPORT_CHUNK_SIZE at a time, then of the archived
+    deliveries. The deliveries are read through a server-side cursor, their
+    worst severities and ERP values are fetched per chunk.
+    """
+    for chunk in chunked(deliveries.iterator(chunk_size=EXPORT_CHUNK_SIZE), EXPORT_CHUNK_SIZE):
+        yield build_delivery_rows(chunk, tenant, language, timezone_str)
+
+    for chunk in chunked(archived, EXPORT_CHUNK_SIZE):
+        yield build_delivery_rows([], tenant, language, timezone_str, archived=chunk)
+
+description = """
+    URL Path: /delivery/export
+
+    All the deliveries of GET /delivery for the same user_filters, date range
+    and language, streamed as a file instead of paged.
+
+    Query:
+        - format: csv (default), a header line then one line per delivery, or
+          ndjson, one JSON object per line with the fields of the items of GET /delivery
+
+    Deliveries are read in chunks through a server-side cursor, the memory
+    used does not depend on the number of deliveries exported. Errors found
+    once the file has started end it early.
+"""
+
+@router.api_route(
+    "/delivery/export", methods=["GET"], tags=["Delivery"], description=description,
+)
+@db_handler
+def export_delivery_data(
+    response: Response,
+    tenant_domain:str,
+    user_filters: Optional[str] = Query(None),
+    from_date:datetime=None,
+    to_date:datetime=None,
+    language:str='de',
+    export_format:str=Query("csv", alias="format"),
+    ):
+    results = {}
+    try:
+        if export_format not in EXPORT_FORMATS:
+            results['error'] = {
+                'status_code': 400,
+                'status_description': f'Bad Request, unknown format {export_format}',
+                'detail': f"Supported formats: {list(EXPORT_FORMATS)}"
+            }
+
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return results
+
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
+            results['error'] = {
+                "status_code": "not found",
+                "status_description": f"Given Language {language} not supported",
+                "detail": f"Given Language {language} not supported!",
+            }
+
+            response.status_code = status.HTTP_404_NOT_FOUND
+            return results
+
+        filters_dict = {}
+        if user_filters:
+            try:
+                filters_dict = json.loads(user_filters)
+            except json.JSONDecodeError:
+                raise HTTPException(status_code=400, detail="Invalid JSON format for user_filters")
+
+        tenant = Tenant.objects.filter(domain=tenant_domain).first()
+        if tenant is None:
+            results['error'] = {
+                "status_code": "not found",
+                "status_description": f"Tenant {tenant_domain} not found",
+                "detail": f"Tenant {tenant_domain} not found !",
+            }
+
+            response.status_code = status.HTTP_404_NOT_FOUND
+            return results
+
+        config = get_table_config(tenant, 'delivery')
+        if config is None:
+            raise TenantTable.DoesNotExist("TenantTable matching query does not exist.")
+
+        try:
+            validated_filters = config.filter_model_without_defaults(**filters_dict)
+        except ValidationError as e:
+            results['error'] = {
+                "status_code": 422,
+                "detail": f"{e.errors()}"
+            }
+
+            response.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+            return results
+
+        today = datetime.today()
+        if from_date is None:
+            from_date = datetime(today.year, today.month, today.day)
+
+        if to_date is None:
+            to_date = from_date
+
+        local_tz = pytz.timezone(tenant.timezone)
+        from_date = local_tz.localize(datetime.combine(from_date, dtime.min))
+        to_date = local_tz.localize(datetime.combine(to_date, dtime.max))
+
+        lookup_filters, archive_lookups = delivery_filters(tenant, validated_filters, config, from_date, to_date)
+        deliveries, read_archive = exclude_archived(listed_deliveries(lookup_filters), 'delivery', tenant.domain, from_date)
+        if read_archive:
+            try:
+                compile_lookups('delivery', archive_lookups)
+            except UnsupportedLookup as err:
+                results['error'] = {
+                    'status_code': 400,
+                    'status_description': f'Bad Request, filter not supported on archived deliveries',
+                    'detail': f"{err}",
+                }
+
+                response.status_code = status.HTTP_400_BAD_REQUEST
+                return results
+
+        archived = iter_rows(
+            'delivery', tenant.domain, from_date, to_date, archive_lookups, predicate=is_listed,
+        ) if read_archive else ()
+
+        return export_response(
+            export_chunks(deliveries, archived, tenant, language_obj, tenant.timezone),
+            export_format,
+            export_columns(tenant),
+            f"deliveries_{tenant.domain}_{from_date:%Y%m%d}_{to_date:%Y%m%d}",
+        )
+
+    except ObjectDoesNotExist as e:
+        results['error'] = {
+            'status_code': "non-matching-query",
+            'status_description': f'Matching query was not found',
+            'detail': f"matching query does not exist. {e}"
+        }
+
+        response.status_code = status.HTTP_404_NOT_FOUND
+
+    except HTTPException as e:
+        results['error'] = {
+            "status_code": "not found",
+            "status_description": "Request not Found",
+            "detail": f"{e}",
+        }
+
+        response.status_code = status.HTTP_404_NOT_FOUND
+
+    except Exception as e:
+        results['error'] = {
+            'status_code': 'server-error',
+            "status_description": "Internal Server Error",
+            "detail": str(e),
+        }
+
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    return results
@@ -33,27 +33,10 @@ from tenants.models import (
 from acceptance_control.models import (
     Delivery,
 )
-
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
+from common_utils.db.executor import db_handler
 
 
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 
 
@@ -240,6 +223,7 @@ Example Use Cases
 @router.api_route(
     "/delivery/soft-delete", methods=["PUT"], tags=["Delivery"], description=description,
 )
+@db_handler
 def soft_delete_deliveries(request: SoftDeleteRequest):
     """
     Soft delete deliveries by marking is_deleted = True.
@@ -3,6 +3,7 @@ import os
 import time
 import math
 import django
+from django.db import transaction
 from django.db.models import Q
 from fastapi import status
 from datetime import datetime
@@ -29,25 +30,11 @@ from acceptance_control.models import (
 )
 
 from metadata.models import Tag
+from common_utils.stats.rollup import StatsDelta
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
 
 router = APIRouter(
-    route_class=TimedRoute,
     responses={404: {"description": "Not found"}},
 )
 
@@ -132,6 +119,7 @@ class Request(BaseModel):
 @router.api_route(
     "/feedback/alarm", methods=["POST"], tags=["Feedback"], description=description,
 )
+@db_handler
 def insert_feedback(response: Response, request:Request = Body()):
     results = {}
     try:
@@ -155,67 +143,80 @@ def insert_feedback(response: Response, request:Request = Body()):
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
         
-        alarm = Alarm.objects.get(event_uid=event_uid)
-        if request.is_actual_alarm in is_actual_alarm_map.keys():
-            request.is_actual_alarm = is_actual_alarm_map[request.is_actual_alarm]
+        # the alarm and its delivery flag are locked until the daily stats are
+        # updated: concurrent feedbacks on the same alarm move the stats from
+        # the rows as the other left them. The flag summary of the delivery is
+        # refreshed on save, in the same transaction as the rows
+        with transaction.atomic():
+            alarm = Alarm.objects.select_related('tenant').select_for_update(of=('self',)).get(event_uid=event_uid)
+            # the daily stats move from the alarm as it is to the alarm after the feedback
+            stats = StatsDelta()
+            stats.add_alarm(alarm, -1)
+            if request.is_actual_alarm in is_actual_alarm_map.keys():
+                request.is_actual_alarm = is_actual_alarm_map[request.is_actual_alarm]
         
-        user_id = request.user_id
-        if not AlarmFeedback.objects.filter(alarm=alarm, user_id=user_id).exists():
-            if request.is_actual_alarm is None:
-                results['error'] = {
-                    'status_code': "Bad Request",
-                    'status_description': f"Missing required field: is_actual_alarm",
-                    'detail': f"Missing required field: is_actual_alarm",
-                }
-                response.status_code = status.HTTP_400_BAD_REQUEST
-                return results
+            user_id = request.user_id
+            if not AlarmFeedback.objects.filter(alarm=alarm, user_id=user_id).exists():
+                if request.is_actual_alarm is None:
+                    results['error'] = {
+                        'status_code': "Bad Request",
+                        'status_description': f"Missing required field: is_actual_alarm",
+                        'detail': f"Missing required field: is_actual_alarm",
+                    }
+                    response.status_code = status.HTTP_400_BAD_REQUEST
+                    return results
             
-            alarm_feedback = AlarmFeedback()
-            alarm_feedback.is_actual_alarm = request.is_actual_alarm
-            alarm_feedback.alarm = alarm
-            alarm.is_actual_alarm = request.is_actual_alarm
-        
-        else:
-            alarm_feedback = AlarmFeedback.objects.get(alarm=alarm, user_id=user_id)
-            if request.is_actual_alarm is not None:
+                alarm_feedback = AlarmFeedback()
                 alarm_feedback.is_actual_alarm = request.is_actual_alarm
+                alarm_feedback.alarm = alarm
                 alarm.is_actual_alarm = request.is_actual_alarm
+        
+            else:
+                alarm_feedback = AlarmFeedback.objects.get(alarm=alarm, user_id=user_id)
+                if request.is_actual_alarm is not None:
+                    alarm_feedback.is_actual_alarm = request.is_actual_alarm
+                    alarm.is_actual_alarm = request.is_actual_alarm
 
-        alarm_feedback.user_id = user_id
-        alarm_feedback.comment = request.comment
+            alarm_feedback.user_id = user_id
+            alarm_feedback.comment = request.comment
         
-        severity = Severity.objects.filter(
-            flag_type=alarm.flag_type,
-            level=request.rating
-        ).first()
+            severity = Severity.objects.filter(
+                flag_type=alarm.flag_type,
+                level=request.rating
+            ).first()
 
-        if request.rating is not None and not severity:
-            results['error'] = {
-                'status_code': "Not Found",
-                'status_description': f"Severity level {request.rating} not found for the flag type",
-                'detail': "Invalid rating level provided.",
-            }
-            response.status_code = status.HTTP_404_NOT_FOUND
-            return results
+            if request.rating is not None and not severity:
+                results['error'] = {
+                    'status_code': "Not Found",
+                    'status_description': f"Severity level {request.rating} not found for the flag type",
+                    'detail': "Invalid rating level provided.",
+                }
+                response.status_code = status.HTTP_404_NOT_FOUND
+                return results
         
-        alarm_feedback.rating = severity
-        alarm_feedback.meta_info = request.meta_info
-        alarm_feedback.updated_at = datetime.now(tz=timezone.utc)
-        alarm_feedback.save()
+            alarm_feedback.rating = severity
+            alarm_feedback.meta_info = request.meta_info
+            alarm_feedback.updated_at = datetime.now(tz=timezone.utc)
+            alarm_feedback.save()
         
-        alarm.severity = severity if request.rating else alarm.severity
-        alarm.feedback_provided = True
-        alarm.exclude_from_dashboard = not alarm.is_actual_alarm
-        alarm.save()
+            alarm.severity = severity if request.rating else alarm.severity
+            alarm.feedback_provided = True
+            alarm.exclude_from_dashboard = not alarm.is_actual_alarm
+
+            delivery_flag = DeliveryFlag.objects.select_related('delivery__tenant').select_for_update(of=('self',)).filter(event_uid=alarm.event_uid).first()
+            if delivery_flag:
+                stats.add_delivery_flag(delivery_flag, -1)
+                delivery_flag.is_actual_alarm = request.is_actual_alarm
+                delivery_flag.severity = severity if request.rating else alarm.severity
+                delivery_flag.feedback_provided = True
+                delivery_flag.exclude_from_dashboard = not delivery_flag.is_actual_alarm
 
-        delivery_flag = DeliveryFlag.objects.filter(event_uid=alarm.event_uid)
-        if delivery_flag:
-            delivery_flag = delivery_flag.first()
-            delivery_flag.is_actual_alarm = request.is_actual_alarm
-            delivery_flag.severity = severity if request.rating else alarm.severity
-            delivery_flag.feedback_provided = True
-            delivery_flag.exclude_from_dashboard = not delivery_flag.is_actual_alarm
-            delivery_flag.save()
+            alarm.save()
+            stats.add_alarm(alarm)
+            if delivery_flag:
+                delivery_flag.save()
+                stats.add_delivery_flag(delivery_flag)
+            stats.apply()
             
         if request.tags is not None and len(request.tags):
             for tag_name in request.tags:
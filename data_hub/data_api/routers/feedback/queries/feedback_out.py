@@ -21,25 +21,10 @@ from acceptance_control.models import (
     Alarm,
     AlarmFeedback,
 )
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
 
 router = APIRouter(
-    route_class=TimedRoute,
     responses={404: {"description": "Not found"}},
 )
 
@@ -125,6 +110,7 @@ description = """
 @router.api_route(
     "/feedback/alarm/out/{event_uid}", methods=["GET"], tags=["Feedback"], description=description,
 )
+@db_handler
 def get_feedback(response: Response, event_uid:str):
     results = {}
     try:
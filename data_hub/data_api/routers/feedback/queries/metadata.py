@@ -27,30 +27,14 @@ from metadata.models import (
     FeedbackFormField,
     FeedbackFormFieldItem,
     TenantFeedbackForm,
-    FormFieldLocalization,
-    FeedbackFormFieldItemLocalization,
-    TagGroup, Tag, TagGroupLocalization, TagLocalization
+    FormField,
+    TagGroup, Tag,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
 
-        return custom_route_handler
-    
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 description = """
 
@@ -85,6 +69,7 @@ Responses:
 @router.api_route(
     "/feedback/{feedback_type}/metadata", methods=["GET"], tags=["Feedback"], description=description,
 )
+@db_handler
 def get_metadata(
     response: Response, 
     tenant_domain:str,
@@ -158,49 +143,31 @@ def get_metadata(
         feedback_form_fields = FeedbackFormField.objects.filter(
             form=tenant_feedback_form.feedback_form,
             is_active=True
-        ).order_by('field_order__field_position')
+        ).select_related('form_field', 'form_field__type').order_by('field_order__field_position')
         
+        localizer = LocalizationResolver(lang)
         results['metadata'] = {
             "fields": [
                 {
                     "field_key": feedback_form_field.form_field.name,
-                    "title": FormFieldLocalization.objects.get(
-                        field=feedback_form_field.form_field, 
-                        language=lang
-                        ).title if FormFieldLocalization.objects.filter(
-                            field=feedback_form_field.form_field,
-                            language=lang,
-                            ).exists() else feedback_form_field.form_field.name,
+                    "title": (localizer.get(FormField, feedback_form_field.form_field_id) or {}).get(
+                        "title", feedback_form_field.form_field.name
+                        ),
                     
                     "type": feedback_form_field.form_field.type.type,
                     
-                    "description": FormFieldLocalization.objects.get(
-                        field=feedback_form_field.form_field, 
-                        language=lang
-                        ).description if FormFieldLocalization.objects.filter(
-                            field=feedback_form_field.form_field,
-                            language=lang,
-                            ).exists() else feedback_form_field.form_field.description,
+                    "description": (localizer.get(FormField, feedback_form_field.form_field_id) or {}).get(
+                        "description", feedback_form_field.form_field.description
+                        ),
                     
-                    "placeholder": FormFieldLocalization.objects.get(
-                        field=feedback_form_field.form_field, 
-                        language=lang
-                        ).placeholder if FormFieldLocalization.objects.filter(
-                            field=feedback_form_field.form_field,
-                            language=lang,
-                            ).exists() else '',
+                    "placeholder": (localizer.get(FormField, feedback_form_field.form_field_id) or {}).get(
+                        "placeholder", ''
+                        ),
                     
                     "items": [
                         {
                             "key": field_item.item_key,
-                            "value": FeedbackFormFieldItemLocalization.objects.get(
-                                field_item=field_item, 
-                                language=lang
-                                ).title if FeedbackFormFieldItemLocalization.objects.filter(
-                                    field_item=field_item, 
-                                    language=lang
-                                    ).exists() else field_item.item_key,
-                                
+                            "value": localizer.title(FeedbackFormFieldItem, field_item.id, default=field_item.item_key),
                             "color": field_item.color, 
                         } for field_item in FeedbackFormFieldItem.objects.filter(
                             field=feedback_form_field.form_field,
@@ -212,16 +179,16 @@ def get_metadata(
 
         # Add tags grouped by TagGroup
         tag_groups = []
-        for group in TagGroup.objects.all():
-            group_localization = group.tag_group_localization.filter(language=lang).first()
-            group_name = group_localization.name if group_localization else group.name
-            group_description = group_localization.description if group_localization else group.description
+        for group in TagGroup.objects.prefetch_related('tags'):
+            group_localization = localizer.get(TagGroup, group.id)
+            group_name = group_localization["name"] if group_localization else group.name
+            group_description = group_localization["description"] if group_localization else group.description
 
             tags = []
             for tag in group.tags.all():
-                tag_localization = tag.tag_localization.filter(language=lang).first()
-                tag_name = tag_localization.name if tag_localization else tag.name
-                tag_description = tag_localization.description if tag_localization else tag.description
+                tag_localization = localizer.get(Tag, tag.id)
+                tag_name = tag_localization["name"] if tag_localization else tag.name
+                tag_description = tag_localization["description"] if tag_localization else tag.description
 
                 tags.append({
                     "id": tag.id,
@@ -0,0 +1 @@
+from . import endpoint
\ No newline at end of file
@@ -0,0 +1,60 @@
+import time
+import django
+django.setup()
+from fastapi import Response
+from fastapi import APIRouter
+from fastapi import status
+from django.conf import settings
+from django.db import connection
+
+from common_utils.db.connections import connection_stats
+from common_utils.db.executor import run_db, db_limiter
+
+router = APIRouter()
+
+def ping():
+    before = time.time()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return time.time() - before
+
+description = """
+    URL Path: /health/db
+
+    Database connections of the answering data_api worker process:
+        - ping: seconds taken by a SELECT 1 on a connection of the database threadpool
+        - connections: opened, closed, units of work run, units run on an already
+          open connection (reused) and running (in_use), since the process started
+        - threadpool: size and busy threads of the database threadpool, one
+          connection per thread at most
+        - conn_max_age, conn_health_checks: connection settings
+"""
+
+@router.api_route(
+    "/health/db", methods=["GET"], tags=["Health"], description=description,
+)
+async def get_database_health(response: Response):
+    results = {}
+    try:
+        results['ping'] = await run_db(ping)
+    except Exception as e:
+        results['error'] = {
+            'status_code': 'database-unavailable',
+            "status_description": "Database not reachable",
+            "detail": str(e),
+        }
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    limiter = db_limiter()
+    results.update(
+        {
+            "connections": connection_stats.snapshot(),
+            "threadpool": {
+                "size": limiter.total_tokens,
+                "in_use": limiter.borrowed_tokens,
+            },
+            "conn_max_age": settings.DATABASES['default'].get('CONN_MAX_AGE'),
+            "conn_health_checks": settings.DATABASES['default'].get('CONN_HEALTH_CHECKS'),
+        }
+    )
+    return results
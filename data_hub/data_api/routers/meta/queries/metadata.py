@@ -24,37 +24,20 @@ from metadata.models import (
     TableType,
     TenantTable,
     TenantTableField,
-    TableFieldLocalization,
+    TableField,
 )
 
 from metadata.models import (
     TableFilter,
-    FilterLocalization,
     FilterItem,
-    FilterItemLocalization,
     TenantTableFilter,
     TenantTableFilterItem,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
 
-        return custom_route_handler
-    
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 description = """
 
@@ -89,6 +72,7 @@ Responses:
 @router.api_route(
     "/{table_type}/metadata", methods=["GET"], tags=["Metadata"], description=description,
 )
+@db_handler
 def get_metadata(
     response: Response, 
     tenant_domain:str, 
@@ -158,10 +142,12 @@ def get_metadata(
         table_fields = TenantTableField.objects.filter(
             tenant_table=tenant_table,
             is_active=True,
-        ).order_by('field_order__field_position')
+        ).select_related('field', 'field__type').order_by('field_order__field_position')
         
+        localizer = LocalizationResolver(lang)
         for table_field in table_fields:
-            if not TableFieldLocalization.objects.filter(language=lang, field=table_field.field).exists():
+            localization = localizer.get(TableField, table_field.field_id)
+            if localization is None:
                 results = {
                     "error": {
                         "status_code": "not found",
@@ -173,17 +159,12 @@ def get_metadata(
                 response.status_code = status.HTTP_404_NOT_FOUND
                 return results 
             
-            localization = TableFieldLocalization.objects.get(
-                language=lang, 
-                field=table_field.field
-                )
-            
             col[table_field.field.name] = {
-                "title": localization.title,
+                "title": localization["title"],
                 "type": table_field.field.type.type,
                 "field_key": table_field.field.name,
                 "hidden": table_field.is_hidden,
-                "description": localization.description,
+                "description": localization["description"],
             }
         
         
@@ -191,14 +172,12 @@ def get_metadata(
         tenant_table_filters = TenantTableFilter.objects.filter(
             tenant_table=tenant_table,
             is_active=True,
-        )
+        ).select_related('table_filter')
         
         filters = []
         for tenant_table_filter in tenant_table_filters:
-            if not FilterLocalization.objects.filter(
-                language=lang,
-                table_filter=tenant_table_filter.table_filter,
-            ).exists():
+            localization = localizer.get(TableFilter, tenant_table_filter.table_filter_id)
+            if localization is None:
                 results = {
                     "error": {
                         "status_code": "not found",
@@ -210,27 +189,20 @@ def get_metadata(
                 response.status_code = status.HTTP_404_NOT_FOUND
                 return results 
             
-            localization = FilterLocalization.objects.get(
-                language=lang,
-                table_filter=tenant_table_filter.table_filter
-            )
-            
             filters.append(
                 {   
                     "filter_key": tenant_table_filter.table_filter.filter_name,
-                    "title": localization.title,
+                    "title": localization["title"],
                     "type": tenant_table_filter.table_filter.type,
-                    "description": localization.description,
+                    "description": localization["description"],
                     "default": tenant_table_filter.default,
-                    "placeholder": localization.placeholder,
+                    "placeholder": localization["placeholder"],
                     "items": [
                         {
                             "key": tenant_table_filter_item.filter_item.item_key,
-                            "value": FilterItemLocalization.objects.get(
-                                language=lang, filter_item=tenant_table_filter_item.filter_item
-                                ).item_value,
-                        } for tenant_table_filter_item in TenantTableFilterItem.objects.filter(tenant_table_filter=tenant_table_filter, is_active=True).order_by('filter_item__field_order__field_position') 
-                        if FilterItemLocalization.objects.filter(language=lang, filter_item=tenant_table_filter_item.filter_item).exists()
+                            "value": localizer.title(FilterItem, tenant_table_filter_item.filter_item_id),
+                        } for tenant_table_filter_item in TenantTableFilterItem.objects.filter(tenant_table_filter=tenant_table_filter, is_active=True).select_related('filter_item').order_by('filter_item__field_order__field_position') 
+                        if localizer.get(FilterItem, tenant_table_filter_item.filter_item_id) is not None
                     ]
                 }
             )
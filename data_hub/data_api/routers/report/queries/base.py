@@ -23,13 +23,14 @@ from common_utils.timezone_utils.timeloc import (
     convert_to_local_time,
 )
 
+from tenants.models import (
+    PlantEntity,
+)
 from metadata.models import (
     Language,
-    PlantEntityLocalization,
     TableField,
     TableFieldLocalization,
     TenantAttachmentRequirement,
-    FormFieldLocalization,
     FormField
 )
 
@@ -37,30 +38,16 @@ from acceptance_control.models import (
     Delivery,
     DeliveryERPAttachment
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
 
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 @router.api_route(
     "/report/delivery/{delivery_id}", methods=["GET"]
 )
+@db_handler
 def get_delivery(
     response:Response,
     delivery_id:str,
@@ -111,23 +98,21 @@ def get_delivery(
             return results
         
         language = Language.objects.get(code=language)
-        table_fields = TableField.objects.all()
+        table_fields = TableField.objects.select_related('type')
         
+        localizer = LocalizationResolver(language)
         col = {}
         for table_field in table_fields:            
-            localization = TableFieldLocalization.objects.filter(
-                language=language, 
-                field=table_field
-            ).first()
+            localization = localizer.get(TableField, table_field.id)
             
             if not localization:
                 continue
 
             col[table_field.name] = {
-                "title": localization.title,
+                "title": localization["title"],
                 "type": table_field.type.type,
                 "field_key": table_field.name,
-                "description": localization.description,
+                "description": localization["description"],
             }
             
         erp_data = {}
@@ -166,13 +151,7 @@ def get_delivery(
         
         comment = {}
         if feedback_form_field:
-            feedback_field_localization = FormFieldLocalization.objects.get(
-                            field=feedback_form_field, 
-                            language=language
-                            ).title if FormFieldLocalization.objects.filter(
-                                field=feedback_form_field,
-                                language=language,
-                                ).exists() else feedback_form_field.name
+            feedback_field_localization = localizer.title(FormField, feedback_form_field.id, default=feedback_form_field.name)
             
             comment.update(
                 {
@@ -186,10 +165,8 @@ def get_delivery(
             col.get("delivery_date", {}).get('title') or "delivery_date": convert_to_local_time(utc_time=delivery.created_at, timezone_str=timezone_str).strftime('%Y-%m-%d'),
             col.get("start_time", {}).get('title') or "start_time": convert_to_local_time(utc_time=delivery.delivery_start, timezone_str=timezone_str).strftime("%H:%M:%S"),
             col.get("end_time", {}).get('title') or "end_time": convert_to_local_time(utc_time=delivery.delivery_end, timezone_str=timezone_str).strftime("%H:%M:%S"),
-            col.get("location", {}).get('title') or "location": (
-                PlantEntityLocalization.objects.get(plant_entity=delivery.entity, language=language).title 
-                if PlantEntityLocalization.objects.filter(plant_entity=delivery.entity, language=language).exists() 
-                else delivery.delivery_location
+            col.get("location", {}).get('title') or "location": localizer.title(
+                PlantEntity, delivery.entity_id, default=delivery.delivery_location
             ),
             **erp_data,
             **comment,
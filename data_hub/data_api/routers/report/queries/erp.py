@@ -23,30 +23,15 @@ from acceptance_control.models import (
     Delivery,
     DeliveryERPAttachment
 )
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
 
-        return custom_route_handler
-    
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 @router.api_route(
     "/report/delivery/erp/{delivery_id}", methods=["GET"]
 )
+@db_handler
 def get_delivery(
     response:Response,
     delivery_id:str,
@@ -21,12 +21,9 @@ from fastapi import HTTPException
 from fastapi.routing import APIRoute
 from pydantic import BaseModel, create_model, ValidationError
 from common_utils.timezone_utils.timeloc import (
-    get_location_and_timezone,
     convert_to_local_time,
 )
 
-timezone_str = get_location_and_timezone()
-
 from metadata.models import (
     Language,
     PlantEntityLocalization
@@ -36,31 +33,17 @@ from acceptance_control.models import (
     Delivery,
     TenantFlagDeployment,
     DeliveryFlag,
+    DeliveryFlagSummary,
 )
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
 
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 @router.api_route(
     "/report/delivery/flags/{delivery_id}", methods=["GET"]
 )
+@db_handler
 def get_delivery_flags(
     response:Response,
     delivery_id:str,
@@ -109,21 +92,16 @@ def get_delivery_flags(
             return results
         
         language = Language.objects.get(code=language)
-        flags_deployment = TenantFlagDeployment.objects.filter(tenant=tenant)
+        flags_deployment = TenantFlagDeployment.objects.filter(tenant=tenant).select_related('flag_type')
+        worst_severity = {
+            summary.flag_type_id: summary.severity
+            for summary in DeliveryFlagSummary.objects.filter(delivery=delivery).select_related('severity')
+        }
         
         data = []
         for flag in flags_deployment:
-            flags = DeliveryFlag.objects.filter(
-                delivery=delivery,
-                flag_type=flag.flag_type,
-                exclude_from_dashboard=False,
-            ).annotate(
-                max_severity=Max('severity__level')
-            ).filter(
-                severity__level=F('max_severity')
-            )
-            
-            if not flags.exists():
+            severity = worst_severity.get(flag.flag_type_id)
+            if severity is None:
                 data.append(
                     {
                         "flag": flag.flag_type.name, 
@@ -133,17 +111,12 @@ def get_delivery_flags(
                 )
                 
                 continue
-            
-            flag = flags.last()
-            for flag_ in flags:
-                if flag_.severity.level > flag.severity.level:
-                        flag = flag_
 
             data.append(
                 {
                     "flag": flag.flag_type.name,
-                    "value": flag.severity.unicode_char,
-                    "color": flag.severity.color_code
+                    "value": severity.unicode_char,
+                    "color": severity.color_code
                 }
             )
 
@@ -0,0 +1,30 @@
+import os
+import time
+import importlib
+from glob import glob
+from typing import Callable
+from fastapi import Request
+from fastapi import Response
+from fastapi import APIRouter
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+
+QUERIES_DIR = os.path.dirname(__file__) + "/queries"
+QUERIES = [
+    f"data_api.routers.stats.queries.{f.replace('/', '.')[:-3]}" 
+    for f in os.listdir(QUERIES_DIR) 
+    if f.endswith('.py') 
+    if not f.endswith('__.py')
+    ]
+
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["Stats"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+for Q in QUERIES:
+    module = importlib.import_module(Q)
+    router.include_router(module.router)
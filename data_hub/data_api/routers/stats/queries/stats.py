@@ -0,0 +1,187 @@
+import os
+import django
+from datetime import date, datetime, timedelta
+from fastapi import Response
+from fastapi import APIRouter
+from fastapi import status
+from django.db.models import Q, Sum
+
+django.setup()
+from django.core.exceptions import ObjectDoesNotExist
+from tenants.models import (
+    Tenant,
+    PlantEntity,
+)
+from acceptance_control.models import (
+    FlagType,
+    DailyFlagStats,
+)
+from metadata.models import Language
+from common_utils.stats.rollup import STAT_FIELDS
+from common_utils.timezone_utils.timeloc import convert_to_local_time
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.db.executor import db_handler
+
+router = APIRouter()
+
+# most days served at once, the series holds one entry per day of the range
+STATS_MAX_DAYS = int(os.environ.get("STATS_MAX_DAYS", 366))
+
+def stats_entry(counts:dict):
+    entry = {field: counts.get(field) or 0 for field in STAT_FIELDS}
+    entry['actual_ratio'] = round(entry['actual_alarms'] / entry['reviewed_alarms'], 4) if entry['reviewed_alarms'] else None
+    return entry
+
+description = """
+    URL Path: /stats
+
+    Alarms and delivery flags of a tenant counted per day in the timezone of
+    the tenant, read from the daily rollups instead of the alarms and flags.
+
+    Query:
+        - from_date, to_date: days included, the last 7 days by default, at most STATS_MAX_DAYS
+        - flag_type, location, severity_level: only the flags of this type, of
+          this entity, of a severity level >= severity_level
+
+    Counts:
+        - alarms, delivery_flags
+        - reviewed_alarms: alarms with a feedback, actual_alarms: confirmed as actual alarms
+        - actual_ratio: actual_alarms / reviewed_alarms, null without reviewed alarms
+
+    Data:
+        - totals: counts over the range
+        - series: counts of each day of the range
+        - flag_types, locations: counts over the range per flag type, per entity
+"""
+
+@router.api_route(
+    "/stats", methods=["GET"], tags=["Stats"], description=description,
+)
+@db_handler
+def get_stats(
+    response: Response,
+    tenant_domain:str,
+    from_date:date=None,
+    to_date:date=None,
+    flag_type:str=None,
+    location:str=None,
+    severity_level:int=None,
+    language:str=None,
+    ):
+    results = {}
+    try:
+        tenant = Tenant.objects.filter(domain=tenant_domain).first()
+        if tenant is None:
+            results['error'] = {
+                "status_code": "not found",
+                "status_description": f"Tenant {tenant_domain} not found",
+                "detail": f"Tenant {tenant_domain} not found !",
+            }
+
+            response.status_code = status.HTTP_404_NOT_FOUND
+            return results
+
+        language = language or tenant.default_language or 'de'
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
+            results['error'] = {
+                "status_code": "not found",
+                "status_description": f"Given Language {language} not supported",
+                "detail": f"Given Language {language} not supported!",
+            }
+
+            response.status_code = status.HTTP_404_NOT_FOUND
+            return results
+
+        to_date = to_date or convert_to_local_time(datetime.utcnow(), tenant.timezone).date()
+        from_date = from_date or to_date - timedelta(days=6)
+        if from_date > to_date:
+            results['error'] = {
+                "status_code": "bad-request",
+                "status_description": "from_date is after to_date",
+                "detail": f"from_date {from_date} is after to_date {to_date}",
+            }
+
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return results
+
+        if (to_date - from_date).days >= STATS_MAX_DAYS:
+            results['error'] = {
+                "status_code": "bad-request",
+                "status_description": "Date range too long",
+                "detail": f"from_date {from_date} to to_date {to_date} spans more than {STATS_MAX_DAYS} days",
+            }
+
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return results
+
+        lookup_filters = Q(tenant=tenant, day__gte=from_date, day__lte=to_date)
+        if flag_type:
+            lookup_filters &= Q(flag_type=FlagType.objects.get(name=flag_type))
+        if location:
+            lookup_filters &= Q(entity=PlantEntity.objects.get(entity_type__tenant=tenant, entity_uid=location))
+        if severity_level is not None:
+            lookup_filters &= Q(severity__level__gte=severity_level)
+
+        rows = DailyFlagStats.objects.filter(lookup_filters)
+        sums = {field: Sum(field) for field in STAT_FIELDS}
+
+        days = {row['day']: row for row in rows.values('day').annotate(**sums).order_by()}
+        series = []
+        day = from_date
+        while day <= to_date:
+            series.append({"day": day.isoformat(), **stats_entry(days.get(day, {}))})
+            day += timedelta(days=1)
+
+        localizer = LocalizationResolver(language_obj)
+        flag_types = [
+            {
+                "flag_type": row['flag_type__name'],
+                "title": localizer.title(FlagType, row['flag_type_id'], default=row['flag_type__name']),
+                **stats_entry(row),
+            }
+            for row in rows.values('flag_type_id', 'flag_type__name').annotate(**sums).order_by('flag_type__name')
+        ]
+        locations = [
+            {
+                "location": row['entity__entity_uid'],
+                "title": localizer.title(PlantEntity, row['entity_id'], default=row['entity__entity_uid']),
+                **stats_entry(row),
+            }
+            for row in rows.values('entity_id', 'entity__entity_uid').annotate(**sums).order_by('entity__entity_uid')
+        ]
+
+        results['data'] = {
+            "tenant": tenant.tenant_name,
+            "language": language_obj.name,
+            "from_date": from_date.isoformat(),
+            "to_date": to_date.isoformat(),
+            "totals": stats_entry(rows.aggregate(**sums)),
+            "series": series,
+            "flag_types": flag_types,
+            "locations": locations,
+        }
+
+        results['status_code'] = "ok"
+        results["detail"] = "data retrieved successfully"
+        results["status_description"] = "OK"
+
+    except ObjectDoesNotExist as e:
+        results['error'] = {
+            'status_code': "non-matching-query",
+            'status_description': f'Matching query was not found',
+            'detail': f"matching query does not exist. {e}"
+        }
+
+        response.status_code = status.HTTP_404_NOT_FOUND
+
+    except Exception as e:
+        results['error'] = {
+            'status_code': 'server-error',
+            "status_description": "Internal Server Error",
+            "detail": str(e),
+        }
+
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    return results
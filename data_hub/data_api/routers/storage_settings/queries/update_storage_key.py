@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
 from django.core.exceptions import ObjectDoesNotExist
 from tenants.models import Tenant, TenantStorageSettings  # adjust path
+from common_utils.db.executor import db_handler
 
 router = APIRouter()
 
@@ -21,6 +22,7 @@ class StorageKeyUpdateOut(BaseModel):
 
 
 @router.patch("/tenant/storage-key", response_model=StorageKeyUpdateOut)
+@db_handler
 def update_storage_key(payload: StorageKeyUpdateIn):
     try:
         tenant = Tenant.objects.get(domain=payload.tenant_domain)
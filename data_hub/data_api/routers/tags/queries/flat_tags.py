@@ -23,32 +23,19 @@ from tenants.models import Tenant
 
 from metadata.models import (
     Language,
-    Tag
+    Tag,
+    TagGroup,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
 
-        return custom_route_handler
-    
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
+router = APIRouter()
 
 @router.api_route(
     "/tags/flat", methods=["GET"], tags=["Tags"], description="Returns a flat list of tags with localization."
 )
+@db_handler
 def get_flat_tags_metadata(
     response: Response,
     language: str = "de",
@@ -86,20 +73,21 @@ def get_flat_tags_metadata(
 
         # Collect all tags in flat format
         flat_tags = []
-        for tag in Tag.objects.all():
-            tag_localization = tag.tag_localization.filter(language=lang).first()
+        localizer = LocalizationResolver(lang)
+        for tag in Tag.objects.select_related('group'):
+            tag_localization = localizer.get(Tag, tag.id)
             group = tag.group
-            group_localization = group.tag_group_localization.filter(language=lang).first() if group else None
+            group_localization = localizer.get(TagGroup, group.id) if group else None
 
             flat_tags.append({
                 "id": tag.id,
                 "key": tag.name,
-                "title": tag_localization.name if tag_localization else tag.name,
+                "title": tag_localization['name'] if tag_localization else tag.name,
                 "type": tag.tag_type,
                 "color": tag.color,
-                "description": tag_localization.description if tag_localization else tag.description,
+                "description": tag_localization['description'] if tag_localization else tag.description,
                 "group_id": group.id if group else None,
-                "group_name": group_localization.name if group_localization else (group.name if group else None),
+                "group_name": group_localization['name'] if group_localization else (group.name if group else None),
             })
 
         results["tags"] = flat_tags
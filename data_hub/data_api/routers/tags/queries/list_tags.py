@@ -23,32 +23,19 @@ from tenants.models import Tenant
 
 from metadata.models import (
     Language,
-    TagGroup
+    TagGroup,
+    Tag,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.db.executor import db_handler
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
+
+router = APIRouter()
 
 @router.api_route(
     "/tags", methods=["GET"], description="Returns tag groups and tags with localization."
 )
+@db_handler
 def get_tags_metadata(
     response: Response,
     language: str = "de",
@@ -86,16 +73,17 @@ def get_tags_metadata(
 
         # Build tag group + tags structure
         tag_groups = []
-        for group in TagGroup.objects.all():
-            group_localization = group.tag_group_localization.filter(language=lang).first()
-            group_name = group_localization.name if group_localization else group.name
-            group_description = group_localization.description if group_localization else group.description
+        localizer = LocalizationResolver(lang)
+        for group in TagGroup.objects.prefetch_related('tags'):
+            group_localization = localizer.get(TagGroup, group.id)
+            group_name = group_localization['name'] if group_localization else group.name
+            group_description = group_localization['description'] if group_localization else group.description
 
             tags = []
             for tag in group.tags.all():
-                tag_localization = tag.tag_localization.filter(language=lang).first()
-                tag_name = tag_localization.name if tag_localization else tag.name
-                tag_description = tag_localization.description if tag_localization else tag.description
+                tag_localization = localizer.get(Tag, tag.id)
+                tag_name = tag_localization['name'] if tag_localization else tag.name
+                tag_description = tag_localization['description'] if tag_localization else tag.description
 
                 tags.append({
                     "id": tag.id,
@@ -22,6 +22,11 @@ from common_utils.timezone_utils.timeloc import (
     get_location_and_timezone,
     convert_to_local_time,
 )
+from common_utils.pagination.keyset import (
+    COUNT_MODES,
+    paginate_by_cursor,
+    count_records,
+)
 
 # timezone_str = get_location_and_timezone()
 
@@ -41,11 +46,12 @@ from metadata.models import (
     TableType,
     TenantTable,
     Language,
-    TenantTableFilter,
-    PlantEntityLocalization,
 )
+from common_utils.localization.resolver import LocalizationResolver
+from common_utils.table_config.config import get_table_config
+from common_utils.db.executor import db_handler
 
-def filter_mapping(key, value, tenant):
+def filter_mapping(key, value, config):
     try:
         if value is None:
             return None
@@ -57,48 +63,31 @@ def filter_mapping(key, value, tenant):
             return None
 
         if key == "location":
-            return ("entity", PlantEntity.objects.get(entity_uid=value, entity_type__tenant=tenant))
+            return ("entity", config.get_plant_entity(value))
 
     except Exception as err:
         raise ValueError(f"Failed to map filter value {value} filter {key}: {err}")
 
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
-    
-
-router = APIRouter(
-    route_class=TimedRoute,
-)
 
-def create_filter_model(fields: Dict[str, Optional[str]]):
-    """
-    This function creates a dynamic Pydantic model based on the fields provided,
-    without setting default values.
-    """
-    return create_model("DynamicFilterModel", **{k: (Optional[str], v) for k, v in fields.items()})
+router = APIRouter()
 
 description = """
-    URL Path: /alarm
+    URL Path: /video_archive
 
-    TO DO
+    Pagination:
+        By default pages are addressed with page/items_per_page.
+        Passing cursor switches to keyset pagination on (created_at, id):
+        an empty cursor returns the first page and every response carries
+        the next_cursor to request the following one (null on the last page).
+        count_mode selects how total_record is computed:
+        exact (default), estimated, cached or none.
 
 """
 
 @router.api_route(
     "/video_archive", methods=["GET"], tags=["Video Archive"], description=description,
 )
+@db_handler
 def get_video_archive_data(
     response: Response, 
     tenant_domain:str,
@@ -108,11 +97,14 @@ def get_video_archive_data(
     items_per_page:int=15,
     page:int=1,
     language:str='de',
+    cursor:Optional[str]=None,
+    count_mode:str="exact",
     ):
     results = {}
     try:
         
-        if not Language.objects.filter(code=language).exists():
+        language_obj = Language.objects.filter(code=language).first()
+        if language_obj is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -131,7 +123,8 @@ def get_video_archive_data(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid JSON format for user_filters")
 
-        if not Tenant.objects.filter(domain=tenant_domain).exists():
+        tenant = Tenant.objects.filter(domain=tenant_domain).first()
+        if tenant is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -143,7 +136,8 @@ def get_video_archive_data(
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
         
-        if not TableType.objects.filter(name='video_archive').exists():
+        config = get_table_config(tenant, 'video_archive')
+        if config is None and not TableType.objects.filter(name='video_archive').exists():
             results = {
                 "error": {
                     "status_code": "not found",
@@ -155,13 +149,11 @@ def get_video_archive_data(
             response.status_code = status.HTTP_404_NOT_FOUND
             return results
         
-        language = Language.objects.get(code=language)
-        table_type = TableType.objects.get(name='video_archive')
-        tenant = Tenant.objects.get(domain=tenant_domain)
+        language = language_obj
         timezone_str = tenant.timezone
         AzAccoutKey = TenantStorageSettings.objects.get(tenant=tenant).account_key
         
-        if not TenantTable.objects.filter(tenant=tenant, table_type=table_type):
+        if config is None:
             results = {
                 "error": {
                     "status_code": "not found",
@@ -196,24 +188,18 @@ def get_video_archive_data(
             response.status_code = status.HTTP_400_BAD_REQUEST    
             return results
         
-        tenant_table = TenantTable.objects.get(
-            tenant=tenant,
-            table_type=table_type
-        )
-        
-        tenant_table_filter = TenantTableFilter.objects.filter(
-            tenant_table=tenant_table,
-            is_active=True
-        )
-        
-        filter_fields = {
-            fil.table_filter.filter_name: fil.default for fil in tenant_table_filter
-        }
-        
+        if count_mode not in COUNT_MODES:
+            results['error'] = {
+                'status_code': 400,
+                'status_description': f'Bad Request, unknown count_mode {count_mode}',
+                'detail': f"Supported count modes: {COUNT_MODES}"
+            }
+
+            response.status_code = status.HTTP_400_BAD_REQUEST    
+            return results
         
-        DynamicFilterModel = create_filter_model(filter_fields)
         try:
-            validated_filters = DynamicFilterModel(**filters_dict)
+            validated_filters = config.filter_model(**filters_dict)
         except ValidationError as e:
             results['error'] = {
                 "status_code": 422,
@@ -227,19 +213,33 @@ def get_video_archive_data(
         lookup_filters &= Q(tenant=tenant)
         lookup_filters &= Q(created_at__range=(from_date, to_date ))
         for key, value in validated_filters:
-            filter_map = filter_mapping(key, value, tenant)
+            filter_map = filter_mapping(key, value, config)
             if filter_map:
                 lookup_filters &= Q(filter_map) 
         
         rows = []
-        video_archives = VideoArchive.objects.filter(lookup_filters).order_by('-created_at')
-        for video_archive in video_archives[(page - 1) * items_per_page:page * items_per_page]:
-            plant_entity = PlantEntity.objects.get(entity_uid=video_archive.entity.entity_uid, entity_type__tenant=tenant)
-            
-            if not PlantEntityLocalization.objects.filter(
-                plant_entity=plant_entity,
-                language=language,
-            ).exists():
+        video_archives = VideoArchive.objects.filter(lookup_filters).select_related('entity').order_by('-created_at')
+        total_record = count_records(video_archives, count_mode)
+        if cursor is not None:
+            try:
+                paginated_video_archives, next_cursor = paginate_by_cursor(video_archives, cursor, items_per_page)
+            except ValueError as err:
+                results['error'] = {
+                    'status_code': 400,
+                    'status_description': f'Bad Request, invalid cursor',
+                    'detail': f"{err}"
+                }
+
+                response.status_code = status.HTTP_400_BAD_REQUEST
+                return results
+        else:
+            paginated_video_archives = video_archives[(page - 1) * items_per_page:page * items_per_page]
+
+        localizer = LocalizationResolver(language)
+        for video_archive in paginated_video_archives:
+            plant_entity = video_archive.entity
+            location = localizer.title(PlantEntity, plant_entity.id)
+            if location is None:
                 results['error'] = {
                     'status_code': "non-matching-query",
                     'status_description': f'localization {language.name} not found for {plant_entity.entity_uid}',
@@ -249,11 +249,6 @@ def get_video_archive_data(
                 response.status_code = status.HTTP_404_NOT_FOUND
                 return results
 
-            plant_entity_localization = PlantEntityLocalization.objects.get(
-                plant_entity=PlantEntity.objects.get(entity_uid=video_archive.entity.entity_uid, entity_type__tenant=tenant),
-                language=language,
-            )
-            
             row = {
                 "id": video_archive.id,
                 "event_uid": video_archive.video_id,
@@ -261,14 +256,13 @@ def get_video_archive_data(
                 "start_time": convert_to_local_time(video_archive.start_time, timezone_str=timezone_str).strftime("%H:%M:%S"),
                 "end_time": convert_to_local_time(video_archive.end_time, timezone_str=timezone_str).strftime("%H:%M:%S"),
                 "timestamp": convert_to_local_time(video_archive.created_at, timezone_str=timezone_str).strftime("%H:%M:%S"),
-                "location": plant_entity_localization.title,
+                "location": location,
                 }
                 
             rows.append(
                 row
             )
         
-        total_record = len(video_archives)
         results['data'] = {
             "language": language.name,
             "tenant": tenant.tenant_name,
@@ -276,9 +270,11 @@ def get_video_archive_data(
             "total_record": total_record,
             "user_filters": lookup_filters.children,
             "validated_filters": validated_filters,
-            "pages": math.ceil(total_record / items_per_page),
+            "pages": math.ceil(total_record / items_per_page) if total_record is not None else None,
             "items": rows,
         }
+        if cursor is not None:
+            results['data']['next_cursor'] = next_cursor
         results['status_code'] = "ok"
         results["detail"] = "data retrieved successfully"
         results["status_description"] = "OK"
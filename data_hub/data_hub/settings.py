@@ -92,11 +92,22 @@ DATABASES = {
         'USER': os.environ.get('DATABASE_USER'),
         'PASSWORD': os.environ.get('DATABASE_PASSWD'),
         'HOST': os.environ.get('DATABASE_HOST'),
-        'PORT': os.environ.get('DATABASE_PORT')
-
+        'PORT': os.environ.get('DATABASE_PORT'),
+        # seconds a connection is kept open and reused across requests and
+        # tasks. It does not bound how many are open: every thread that ran
+        # a request or task keeps one, see DATABASE_MAX_CONNECTIONS
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        # check a kept connection before reusing it, e.g. after a database restart
+        'CONN_HEALTH_CHECKS': os.environ.get('DATABASE_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
     }
 }
 
+# connections the database server accepts from the deployment, its
+# max_connections (100 by default on PostgreSQL) less the
+# superuser_reserved_connections (3). The check of common_utils.db.budget
+# warns when the threads and processes of supervisord.conf may open more
+DATABASE_MAX_CONNECTIONS = int(os.environ.get('DATABASE_MAX_CONNECTIONS', 97))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
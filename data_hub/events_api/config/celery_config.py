@@ -2,6 +2,7 @@ import os
 import celery
 from functools import lru_cache
 from kombu import Queue
+from celery.schedules import crontab
 
 RABBITMQ_PORT = os.environ.get('RABBITMQ_PORT', "5672")
 RABBITMQ_HOST = os.environ.get('RABBITMQ_HOST', "localhost")
@@ -24,9 +25,24 @@ class BaseConfig:
     )
 
     CELERY_TASK_ROUTES = (route_task,)
-    ACCEPT_CONTENT = ['json', 'pickle']
-    TASK_SERIALIZE = 'pickle'
-    RESULT_SERIALIZE = 'pickle'
+    # prefork children of the workers started without --concurrency, each
+    # holds a database connection, see common_utils.db.budget
+    CELERY_WORKER_CONCURRENCY: int = int(os.environ.get("CELERY_WORKER_CONCURRENCY", 2))
+    # partitions:create keeps the monthly partitions created ahead, see
+    # common_utils.partitions.monthly, run by the beat program of supervisord
+    CELERY_BEAT_SCHEDULE = {
+        "create-partitions": {
+            "task": "partitions:create",
+            "schedule": crontab(minute=0, hour=1, day_of_month=1),
+        },
+    }
+    # pickle is still accepted for messages queued before the switch to orjson
+    # (2026-10-18). Remove it, with the BaseModel case of decode_payload, once
+    # every events_api and worker runs the orjson release and the queues hold
+    # no message published before it, on 2026-12-01 at the latest
+    ACCEPT_CONTENT = ['orjson', 'json', 'pickle']
+    TASK_SERIALIZE = 'orjson'
+    RESULT_SERIALIZE = 'orjson'
     TIMEZONE = 'UTC'
     ENABLE_UTC = True 
 
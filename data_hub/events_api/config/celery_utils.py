@@ -1,9 +1,13 @@
+from functools import lru_cache
 from celery import current_app as c_app
 from .celery_config import settings, BaseConfig
+from .wire_format import register_serializer
 from celery.result import AsyncResult
+from common_utils.db.connections import setup_celery_connections
 
 
 def create_celery():
+    register_serializer()
     celery_app = c_app
     celery_app.config_from_object(settings, namespace='CELERY')
     celery_app.conf.update(task_track_started=True)
@@ -14,10 +18,20 @@ def create_celery():
     celery_app.conf.update(result_persistent=False)
     celery_app.conf.update(worker_send_task_events=False)
     celery_app.conf.update(worker_prefetch_multiplier=1)
+    setup_celery_connections(celery_app)
 
     return celery_app
 
 
+@lru_cache()
+def get_celery():
+    """
+    The celery app of the process, configured by create_celery on first use
+    only, e.g. for the Django processes that publish without events_api.main.
+    """
+    return create_celery()
+
+
 def get_task_info(task_id):
     """
     Retrieve information about a Celery task given its task ID.
@@ -0,0 +1,67 @@
+import os
+import uuid
+import orjson
+from pydantic import BaseModel
+from kombu.serialization import register
+
+# version of the task payload envelope, bump it when a request schema changes
+# in a way older workers cannot read and handle both versions in decode_payload
+WIRE_VERSION = 1
+SERIALIZER = "orjson"
+CONTENT_TYPE = "application/x-orjson"
+
+# batch endpoints: largest accepted batch and number of items per broker message
+MAX_BATCH_SIZE = int(os.environ.get("INGEST_MAX_BATCH_SIZE", 5000))
+BATCH_CHUNK_SIZE = int(os.environ.get("INGEST_BATCH_CHUNK_SIZE", 100))
+
+def register_serializer():
+    """
+    Register the orjson serializer with kombu, used for the task messages.
+    """
+    register(
+        SERIALIZER,
+        orjson.dumps,
+        orjson.loads,
+        content_type=CONTENT_TYPE,
+        content_encoding="binary",
+    )
+
+def encode_payload(payload:BaseModel):
+    """
+    Task argument for a request model: its fields in a versioned envelope,
+    made of plain types only so that workers do not need the class to read it.
+    Fields left to their default are not sent, the model fills them back in.
+    """
+    return {"v": WIRE_VERSION, "data": payload.model_dump(exclude_unset=True)}
+
+def decode_payload(payload, model:type):
+    """
+    Request model back from a task argument built with encode_payload. Model
+    instances are returned as they are, for messages published with pickle.
+    """
+    if isinstance(payload, BaseModel):
+        return payload
+
+    version = payload.get("v") if isinstance(payload, dict) else None
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported payload version {version}, expected {WIRE_VERSION}")
+
+    return model.model_validate(payload["data"])
+
+def encode_batch(payloads, chunk_size:int=BATCH_CHUNK_SIZE):
+    """
+    Split the encoded request models of a batch into chunks of at most
+    chunk_size items, one broker message and task id each. Returns, in the
+    order of the payloads, the task id of the chunk of every item and its
+    index in the chunk, and the chunks as (task id, items). The result of a
+    chunk task lists the results of its items in the same order.
+    """
+    chunks = [
+        (str(uuid.uuid4()), [{"payload": encode_payload(payload)} for payload in payloads[i:i + chunk_size]])
+        for i in range(0, len(payloads), chunk_size)
+    ]
+
+    return (
+        [{"task_id": task_id, "index": index} for task_id, items in chunks for index in range(len(items))],
+        chunks,
+    )
@@ -17,12 +17,14 @@ from pathlib import Path
 base_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(base_dir))
 
+from common_utils.metrics.instrumentation import MetricsMiddleware, metrics_response
 
 from events_api.routers import (
     delivery,
     alarm,
     video_archive,
 )
+from events_api.tasks import partitions
 from events_api.config import celery_utils
 
 def create_app() -> FastAPI:
@@ -58,9 +60,9 @@ def create_app() -> FastAPI:
         allow_headers=["X-Requested-With", "X-Request-ID"],
         expose_headers=["X-Request-ID"],
     )
+    app.add_middleware(MetricsMiddleware, app_name="events_api")
 
-
-    app.celery_app = celery_utils.create_celery()
+    app.celery_app = celery_utils.get_celery()
     app.include_router(delivery.endpoint.router)
     app.include_router(alarm.endpoint.router)
     app.include_router(video_archive.endpoint.router)
@@ -70,6 +72,10 @@ def create_app() -> FastAPI:
 app = create_app()
 celery = app.celery_app
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return metrics_response()
+
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     description = exc.args[0]
@@ -19,22 +19,8 @@ from events_api.tasks import (
     alarm,
     alarm_media,
 )
-
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
+from events_api.schemas.alarm import AlarmRequest, AlarmMediaRequest
+from events_api.config.wire_format import encode_payload, encode_batch, MAX_BATCH_SIZE
 
 
 class ApiResponse(BaseModel):
@@ -42,29 +28,20 @@ class ApiResponse(BaseModel):
     task_id: str
     data: Optional[Dict[AnyStr, Any]] = None
 
+class BatchItem(BaseModel):
+    # task of the chunk holding the item, and its index in the chunk and in
+    # the result of the task
+    task_id: str
+    index: int
 
-class AlarmRequest(BaseModel):
-    tenant_domain: str
-    location: str
-    event_uid:str
-    flag_type:str
-    severity_level:int
-    timestamp:datetime
-    delivery_id:str=None
-    meta_info:Dict=None
-
-class AlarmMediaRequest(BaseModel):
-    event_uid:str
-    media_id:str
-    media_name:str
-    media_type:str
-    media_url:str
+class BatchApiResponse(BaseModel):
+    status: str
+    items: List[BatchItem]
 
 
 router = APIRouter(
     prefix="/api/v1",
     tags=["Alarm"],
-    route_class=TimedRoute,
     responses={404: {"description": "Not found"}},
 )
 
@@ -79,7 +56,8 @@ async def handle_event(
     if not payload:
         raise HTTPException(status_code=400, detail="Invalid request payload")
     
-    task = alarm.core.execute.apply_async(args=(payload,), task_id=x_request_id)
+    execute = alarm.core.execute_batch if alarm.core.ALARM_INGEST_MODE == "batch" else alarm.core.execute
+    task = execute.apply_async(args=(encode_payload(payload),), task_id=x_request_id)
     response_data = {
         "status": "success",
         "task_id": task.id,
@@ -99,7 +77,7 @@ async def handle_event(
     if not payload:
         raise HTTPException(status_code=400, detail="Invalid request payload")
     
-    task = alarm_media.core.execute.apply_async(args=(payload,), task_id=x_request_id)
+    task = alarm_media.core.execute.apply_async(args=(encode_payload(payload),), task_id=x_request_id)
     response_data = {
         "status": "success",
         "task_id": task.id,
@@ -109,6 +87,23 @@ async def handle_event(
     return ApiResponse(**response_data)
 
 
+@router.api_route(
+    "/alarm/batch", methods=["POST"], tags=["Alarm"]
+)
+async def handle_event(
+    payloads: List[AlarmRequest] = Body(...),
+) -> BatchApiResponse:
+    
+    if not payloads or len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Invalid request payload, a batch holds 1 to {MAX_BATCH_SIZE} items")
+    
+    items, chunks = encode_batch(payloads)
+    for task_id, chunk in chunks:
+        alarm.core.execute_many.apply_async(args=(chunk,), task_id=task_id)
+    
+    return BatchApiResponse(status="success", items=items)
+
+
 @router.api_route(
     "/alarm/{task_id}", methods=["GET"], tags=["Alarm"], response_model=ApiResponse
 )
@@ -18,22 +18,8 @@ from typing import Callable, Union, Any, Dict, AnyStr, Optional, List
 from events_api.tasks import delivery
 from events_api.tasks import delivery_flag
 from events_api.tasks import delivery_media
-
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
+from events_api.schemas.delivery import DeliveryRequest, DeliveryMediaRequest, DeliveryFlagRequest
+from events_api.config.wire_format import encode_payload, encode_batch, MAX_BATCH_SIZE
 
 
 class ApiResponse(BaseModel):
@@ -41,33 +27,20 @@ class ApiResponse(BaseModel):
     task_id: str
     data: Optional[Dict[AnyStr, Any]] = None
 
+class BatchItem(BaseModel):
+    # task of the chunk holding the item, and its index in the chunk and in
+    # the result of the task
+    task_id: str
+    index: int
+
+class BatchApiResponse(BaseModel):
+    status: str
+    items: List[BatchItem]
 
-class DeliveryRequest(BaseModel):
-    tenant_domain: str
-    delivery_id:str
-    location: str
-    delivery_start: datetime
-    delivery_end: datetime
-    delivery_status: Optional[str] = None
-
-class DeliveryMediaRequest(BaseModel):
-    delivery_id:str
-    media_id:str
-    media_name:str
-    media_type:str
-    media_url:str
-    sensor_box_location:Optional[str] = None
-    
-class DeliveryFlagRequest(BaseModel):
-    delivery_id:str
-    flag_type:str
-    severity_level:str
-    event_uid:Optional[str] = None
 
 router = APIRouter(
     prefix="/api/v1",
     tags=["Delivery"],
-    route_class=TimedRoute,
     responses={404: {"description": "Not found"}},
 )
 
@@ -82,7 +55,7 @@ async def handle_event(
     if not payload:
         raise HTTPException(status_code=400, detail="Invalid request payload")
     
-    task = delivery.core.execute.apply_async(args=(payload,), task_id=x_request_id)
+    task = delivery.core.execute.apply_async(args=(encode_payload(payload),), task_id=x_request_id)
     response_data = {
         "status": "success",
         "task_id": task.id,
@@ -102,7 +75,7 @@ async def handle_event(
     if not payload:
         raise HTTPException(status_code=400, detail="Invalid request payload")
     
-    task = delivery_media.core.execute.apply_async(args=(payload,), task_id=x_request_id)
+    task = delivery_media.core.execute.apply_async(args=(encode_payload(payload),), task_id=x_request_id)
     response_data = {
         "status": "success",
         "task_id": task.id,
@@ -122,7 +95,7 @@ async def handle_event(
     if not payload:
         raise HTTPException(status_code=400, detail="Invalid request payload")
     
-    task = delivery_flag.core.execute.apply_async(args=(payload,), task_id=x_request_id)
+    task = delivery_flag.core.execute.apply_async(args=(encode_payload(payload),), task_id=x_request_id)
     response_data = {
         "status": "success",
         "task_id": task.id,
@@ -132,6 +105,39 @@ async def handle_event(
     return ApiResponse(**response_data)
 
 
+@router.api_route(
+    "/delivery/batch", methods=["POST"], tags=["Delivery"]
+)
+async def handle_event(
+    payloads: List[DeliveryRequest] = Body(...),
+) -> BatchApiResponse:
+    
+    if not payloads or len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Invalid request payload, a batch holds 1 to {MAX_BATCH_SIZE} items")
+    
+    items, chunks = encode_batch(payloads)
+    for task_id, chunk in chunks:
+        delivery.core.execute_many.apply_async(args=(chunk,), task_id=task_id)
+    
+    return BatchApiResponse(status="success", items=items)
+
+@router.api_route(
+    "/delivery/media/batch", methods=["POST"], tags=["Delivery"]
+)
+async def handle_event(
+    payloads: List[DeliveryMediaRequest] = Body(...),
+) -> BatchApiResponse:
+    
+    if not payloads or len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Invalid request payload, a batch holds 1 to {MAX_BATCH_SIZE} items")
+    
+    items, chunks = encode_batch(payloads)
+    for task_id, chunk in chunks:
+        delivery_media.core.execute_many.apply_async(args=(chunk,), task_id=task_id)
+    
+    return BatchApiResponse(status="success", items=items)
+
+
 @router.api_route(
     "/delivery/{task_id}", methods=["GET"], tags=["Delivery"], response_model=ApiResponse
 )
@@ -16,22 +16,8 @@ from fastapi import FastAPI, Depends, APIRouter, Request, Header, Response
 from typing import Callable, Union, Any, Dict, AnyStr, Optional, List
 
 from events_api.tasks import video_archive
-
-class TimedRoute(APIRoute):
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-
-        async def custom_route_handler(request: Request) -> Response:
-            before = time.time()
-            response: Response = await original_route_handler(request)
-            duration = time.time() - before
-            response.headers["X-Response-Time"] = str(duration)
-            print(f"route duration: {duration}")
-            print(f"route response: {response}")
-            print(f"route response headers: {response.headers}")
-            return response
-
-        return custom_route_handler
+from events_api.schemas.video_archive import VideoArchiveRequest
+from events_api.config.wire_format import encode_payload
 
 
 class ApiResponse(BaseModel):
@@ -40,25 +26,9 @@ class ApiResponse(BaseModel):
     data: Optional[Dict[AnyStr, Any]] = None
 
 
-class VideoArchiveRequest(BaseModel):
-    tenant_domain: str
-    location: str
-    sensor_box_location: str
-    camera_id: str
-    video_id: str
-    media_id: str
-    media_name: str
-    media_url: str
-    media_type: str  # e.g., "video"
-    start_time: Optional[datetime] = None
-    end_time: Optional[datetime] = None
-    # meta_info: Optional[Dict] = {}
-
-
 router = APIRouter(
     prefix="/api/v1",
     tags=["Video Archive"],
-    route_class=TimedRoute,
     responses={404: {"description": "Not found"}},
 )
 
@@ -73,7 +43,7 @@ async def handle_event(
     if not payload:
         raise HTTPException(status_code=400, detail="Invalid request payload")
     
-    task = video_archive.core.execute.apply_async(args=(payload,), task_id=x_request_id)
+    task = video_archive.core.execute.apply_async(args=(encode_payload(payload),), task_id=x_request_id)
     response_data = {
         "status": "success",
         "task_id": task.id,
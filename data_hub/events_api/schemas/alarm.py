@@ -0,0 +1,20 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Dict
+
+class AlarmRequest(BaseModel):
+    tenant_domain: str
+    location: str
+    event_uid:str
+    flag_type:str
+    severity_level:int
+    timestamp:datetime
+    delivery_id:str=None
+    meta_info:Dict=None
+
+class AlarmMediaRequest(BaseModel):
+    event_uid:str
+    media_id:str
+    media_name:str
+    media_type:str
+    media_url:str
@@ -0,0 +1,25 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+class DeliveryRequest(BaseModel):
+    tenant_domain: str
+    delivery_id:str
+    location: str
+    delivery_start: datetime
+    delivery_end: datetime
+    delivery_status: Optional[str] = None
+
+class DeliveryMediaRequest(BaseModel):
+    delivery_id:str
+    media_id:str
+    media_name:str
+    media_type:str
+    media_url:str
+    sensor_box_location:Optional[str] = None
+    
+class DeliveryFlagRequest(BaseModel):
+    delivery_id:str
+    flag_type:str
+    severity_level:str
+    event_uid:Optional[str] = None
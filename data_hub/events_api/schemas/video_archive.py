@@ -0,0 +1,17 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+class VideoArchiveRequest(BaseModel):
+    tenant_domain: str
+    location: str
+    sensor_box_location: str
+    camera_id: str
+    video_id: str
+    media_id: str
+    media_name: str
+    media_url: str
+    media_type: str  # e.g., "video"
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    # meta_info: Optional[Dict] = {}
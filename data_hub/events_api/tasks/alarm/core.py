@@ -1,78 +1,236 @@
+import os
 import django
 django.setup()
-from django.db import IntegrityError
+import logging
+from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
-from celery import shared_task
+from celery import shared_task, signals
+from celery_batches import Batches
 from datetime import datetime, timezone
-from acceptance_control.models import Alarm, FlagType, Severity, Delivery
+from acceptance_control.models import Alarm, AlarmKey, FlagType, Severity, Delivery
 from tenants.models import Tenant, PlantEntity
+from common_utils.filters.utils import parse_numeric_value
+from common_utils.reference_data.cache import get_tenant, get_plant_entity, get_flag_type, get_severity
+from events_api.schemas.alarm import AlarmRequest
+from events_api.config.wire_format import decode_payload
+from events_api.tasks.alarm_media.core import attach_pending_media
+from common_utils.stats.rollup import record_alarms
+from common_utils.partitions.keys import claim_keys
+
+# "single": one alarm:execute task per alarm, "batch": alarms are consumed in
+# micro batches by alarm:execute_batch. Read by the events API and the workers
+ALARM_INGEST_MODE = os.environ.get("ALARM_INGEST_MODE", "single")
+# micro-batching of the alarm queue: a batch is flushed once it holds
+# ALARM_BATCH_SIZE alarms or ALARM_BATCH_INTERVAL_MS after its first alarm
+ALARM_BATCH_SIZE = int(os.environ.get("ALARM_BATCH_SIZE", 100))
+ALARM_BATCH_INTERVAL_MS = int(os.environ.get("ALARM_BATCH_INTERVAL_MS", 200))
+
+def lookup(get, *args):
+    try:
+        return get(*args)
+    except ObjectDoesNotExist:
+        return None
+
+def resolve_references(payloads):
+    """
+    Look up the tenants, entities, flag types and severities referenced by the
+    payloads in the reference cache, and load the event uids already stored
+    with a single IN query. References that do not exist map to None.
+    """
+    tenants, entities, flag_types, severities = {}, {}, {}, {}
+    for payload in payloads:
+        if payload.tenant_domain not in tenants:
+            tenants[payload.tenant_domain] = lookup(get_tenant, payload.tenant_domain)
+
+        tenant = tenants[payload.tenant_domain]
+        if tenant and (tenant.id, payload.location) not in entities:
+            entities[(tenant.id, payload.location)] = lookup(get_plant_entity, tenant, payload.location)
+
+        if payload.flag_type not in flag_types:
+            flag_types[payload.flag_type] = lookup(get_flag_type, payload.flag_type)
+
+        flag_type = flag_types[payload.flag_type]
+        if flag_type and (flag_type.id, payload.severity_level) not in severities:
+            severities[(flag_type.id, payload.severity_level)] = lookup(get_severity, flag_type, payload.severity_level)
+
+    existing_event_uids = set(
+        Alarm.objects.filter(
+            event_uid__in={payload.event_uid for payload in payloads}
+        ).values_list('event_uid', flat=True)
+    )
+
+    return tenants, entities, flag_types, severities, existing_event_uids
+
+def build_alarm(payload, tenants, entities, flag_types, severities):
+    tenant = tenants.get(payload.tenant_domain)
+    if tenant is None:
+        raise ObjectDoesNotExist(
+            f"tenant {payload.tenant_domain} does not exist"
+        )
+
+    entity = entities.get((tenant.id, payload.location))
+    if entity is None:
+        raise ObjectDoesNotExist(
+            f"Entity {payload.location} does not exist"
+        )
+
+    flag_type = flag_types.get(payload.flag_type)
+    if flag_type is None:
+        raise ObjectDoesNotExist(
+            f"flag type {payload.flag_type} does not exist"
+        )
+
+    severity = severities.get((flag_type.id, payload.severity_level))
+    if severity is None:
+        raise ObjectDoesNotExist(
+            f"severity level {payload.severity_level} for {payload.flag_type} does not exist"
+        )
+
+    value = payload.meta_info.get("value") if payload.meta_info else None
+    return Alarm(
+        tenant=tenant,
+        entity=entity,
+        flag_type=flag_type,
+        severity=severity,
+        timestamp=payload.timestamp.replace(tzinfo=timezone.utc),
+        event_uid=payload.event_uid,
+        delivery_id=payload.delivery_id,
+        value=value,
+        numeric_value=parse_numeric_value(value),
+        meta_info=payload.meta_info if payload.meta_info else None,
+    )
+
+def save_alarms(payloads):
+    """
+    Store a list of alarm payloads with a fixed number of queries (four once
+    the referenced rows are in the reference cache) and return
+    one result per payload, in the same order, with action 'done', 'ignored'
+    (event uid already stored) or 'failed' (unknown reference).
+
+    The event uids are claimed in AlarmKey, then the alarms whose event uid
+    was claimed are inserted with a single bulk_create, in the same
+    transaction: an alarm stored concurrently by another worker, in any
+    month, is ignored. The alarms are added to the daily stats and the media
+    parked while waiting for them are attached right after.
+    """
+    tenants, entities, flag_types, severities, seen_event_uids = resolve_references(payloads)
+
+    alarms = []
+    results = []
+    pending = {}
+    for payload in payloads:
+        result = {
+            'event_uid': payload.event_uid,
+            'time': datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
+        }
+
+        try:
+            alarm = build_alarm(payload, tenants, entities, flag_types, severities)
+            if payload.event_uid in seen_event_uids:
+                result.update({'action': 'ignored', 'result': f"{payload.event_uid} exists"})
+            else:
+                seen_event_uids.add(payload.event_uid)
+                alarms.append(alarm)
+                pending[payload.event_uid] = result
+                result.update({'action': 'done', 'result': 'success'})
+        except ObjectDoesNotExist as err:
+            result.update({'action': 'failed', 'result': str(err)})
+
+        results.append(result)
+
+    if alarms:
+        with transaction.atomic():
+            claimed = claim_keys(AlarmKey, pending)
+            alarms = [alarm for alarm in alarms if alarm.event_uid in claimed]
+            Alarm.objects.bulk_create(alarms)
+            record_alarms(alarms)
+
+        for event_uid in pending.keys() - claimed:
+            pending[event_uid].update({'action': 'ignored', 'result': f"{event_uid} exists"})
+        attach_pending_media([alarm.event_uid for alarm in alarms])
+
+    return results
 
 @shared_task(bind=True,autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}, ignore_result=True,
              name='alarm:execute')
 def execute(self, payload, **kwargs):
+    payload = decode_payload(payload, AlarmRequest)
     data: dict = {}
     try:
-        
-        if not Tenant.objects.filter(domain=payload.tenant_domain).exists():
-            raise ObjectDoesNotExist(
-                f"tenant {payload.tenant_domain} does not exist"
-            )
-            
-        tenant = Tenant.objects.get(domain=payload.tenant_domain)
-        if not PlantEntity.objects.filter(entity_uid=payload.location, entity_type__tenant=tenant).exists():
-            raise ObjectDoesNotExist(
-                f"Entity {payload.location} does not exist"
-            )
-            
-        if not FlagType.objects.filter(name=payload.flag_type).exists():
-            raise ObjectDoesNotExist(
-                f"flag type {payload.flag_type} does not exist"
-            )
-            
-        flag_type = FlagType.objects.get(name=payload.flag_type)
-        if not Severity.objects.filter(flag_type=flag_type, level=payload.severity_level).exists():
-            raise ObjectDoesNotExist(
-                f"severity level {payload.severity_level} for {payload.flag_type} does not exist"
-            )
-
-        # if payload.delivery_id:
-        #     if not Delivery.objects.filter(delivery_id=payload.delivery_id).exists():
-        #         raise ObjectDoesNotExist(
-        #             f"delivery_id {payload.delivery_id} does not exist"
-        #         )
-
-        if Alarm.objects.filter(event_uid=payload.event_uid).exists():
-            return {
-                'action': "ignored",
-                "time": datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
-                "result": f"{payload.event_uid} exists"
-            }
-                
-        entity = PlantEntity.objects.get(entity_uid=payload.location, entity_type__tenant=tenant)
-        severity = Severity.objects.get(flag_type=flag_type, level=payload.severity_level)
-
-        alarm = Alarm(
-            tenant=tenant,
-            entity=entity,
-            flag_type=flag_type,
-            severity=severity,
-            timestamp=payload.timestamp.replace(tzinfo=timezone.utc),
-            event_uid=payload.event_uid,
-            delivery_id=payload.delivery_id,
-            value=payload.meta_info.get("value") if payload.meta_info else None,
-            meta_info=payload.meta_info if payload.meta_info else None,
-        )
-        
-        alarm.save()
+        result = save_alarms([payload])[0]
+        if result['action'] == 'failed':
+            raise ObjectDoesNotExist(result['result'])
+
         data.update(
             {
-                'action': 'done',
-                'time':  datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
-                'result': 'success'
+                'action': result['action'],
+                'time': result['time'],
+                'result': result['result'],
             }
         )
-    
+
     except Exception as err:
         raise ValueError(f"Error saving delivery data into db: {err}")
-    
-    return data
\ No newline at end of file
+
+    return data
+
+def save_alarm_batch(task_ids, payloads):
+    """
+    Store encoded alarm payloads with save_alarms. The alarms that cannot be
+    stored are handed over to alarm:execute, under their task id when they
+    have one, so that each of them is retried and reported individually.
+    Returns the result of every payload, in order, with the task id of the
+    retry for those handed over.
+    """
+    try:
+        results = save_alarms([decode_payload(payload, AlarmRequest) for payload in payloads])
+    except Exception as err:
+        logging.error(f"Error saving batch of {len(payloads)} alarms, retrying them one by one: {err}")
+        results = [{'action': 'failed', 'result': str(err)} for _ in payloads]
+
+    summary = {'done': 0, 'ignored': 0, 'failed': 0}
+    for task_id, payload, result in zip(task_ids, payloads, results):
+        summary[result['action']] += 1
+        if result['action'] == 'failed':
+            task = execute.apply_async(args=(payload,), task_id=task_id)
+            result.update({'action': 'retried', 'task_id': task.id})
+
+    logging.info(f"alarm batch of {len(payloads)}: {summary}")
+    return results
+
+@shared_task(base=Batches, flush_every=ALARM_BATCH_SIZE, flush_interval=ALARM_BATCH_INTERVAL_MS / 1000, ignore_result=True,
+             name='alarm:execute_batch')
+def execute_batch(requests):
+    """
+    Batched consumer of the alarm queue, used when the events api runs with
+    ALARM_INGEST_MODE=batch. The worker of the queue prefetches without
+    bound then, see unbounded_prefetch.
+    """
+    return save_alarm_batch(
+        [request.id for request in requests],
+        [request.args[0] for request in requests],
+    )
+
+@shared_task(bind=True,
+             name='alarm:execute_many')
+def execute_many(self, items, **kwargs):
+    """
+    Chunk of alarms published by POST /alarm/batch, see encode_batch. The
+    items of the chunks published before the chunk task ids carry their own.
+    """
+    return save_alarm_batch(
+        [item.get("task_id") for item in items],
+        [item["payload"] for item in items],
+    )
+
+@signals.worker_init.connect
+def unbounded_prefetch(sender=None, **kwargs):
+    """
+    Let the workers of the alarm queue prefetch without bound in batch mode,
+    otherwise a batch of execute_batch never holds more alarms than the
+    worker concurrency times worker_prefetch_multiplier (1). Set here since
+    celery reads --prefetch-multiplier=0 as unset and falls back to the 1 of
+    create_celery.
+    """
+    if ALARM_INGEST_MODE == "batch" and "alarm" in sender.app.amqp.queues.consume_from:
+        sender.prefetch_multiplier = 0
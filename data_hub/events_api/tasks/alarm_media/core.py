@@ -1,39 +1,118 @@
-import time
 import django
 django.setup()
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.core.exceptions import ObjectDoesNotExist
 from celery import shared_task
 from datetime import datetime, timezone
-from acceptance_control.models import Alarm, Media, AlarmMedia
+from acceptance_control.models import Alarm, Media, MediaKey, AlarmMedia, PendingChild
+from events_api.schemas.alarm import AlarmMediaRequest
+from events_api.config.wire_format import encode_payload, decode_payload
+from common_utils.staging.pending import park, attach_pending
+from common_utils.partitions.keys import claim_unique
+from common_utils.live_feed.channel import publish
+
+def publish_live_alarm(alarm):
+    """
+    Push the alarm to the live feed, once it has its first image.
+    """
+    publish({"event": "alarm", "tenant_id": alarm.tenant_id, "alarm_id": alarm.id})
+
+def lock_alarms(alarms):
+    """
+    Lock the alarms and return the ids of those that already have an image.
+    Call it in the transaction that adds their media: concurrent media of an
+    alarm then wait for each other, and exactly one of them finds no image
+    and publishes the alarm to the live feed.
+    """
+    alarm_ids = {alarm.id for alarm in alarms}
+    created_at = {alarm.created_at for alarm in alarms}
+    list(Alarm.objects.select_for_update().filter(id__in=alarm_ids, created_at__in=created_at).values_list('id', flat=True))
+    return set(
+        AlarmMedia.objects.filter(
+            alarm_id__in=alarm_ids, created_at__in=created_at, media__media_type=Media.IMAGE
+        ).values_list('alarm_id', flat=True)
+    )
+
+def attach_alarm_media(pending):
+    payloads = [decode_payload(child.payload, AlarmMediaRequest) for child in pending]
+    alarms = {
+        alarm.event_uid: alarm for alarm in Alarm.objects.filter(
+            event_uid__in={payload.event_uid for payload in payloads}
+        )
+    }
+    # runs in the transaction of attach_pending
+    with_image = lock_alarms(alarms.values())
+
+    media_list = Media.objects.bulk_create([
+        Media(
+            media_id=payload.media_id,
+            media_name=payload.media_name,
+            media_url=payload.media_url,
+            media_type=payload.media_type,
+        ) for payload in payloads
+    ])
+    claim_unique(MediaKey, [media.media_id for media in media_list], {media.media_id: media.created_at for media in media_list})
+
+    AlarmMedia.objects.bulk_create([
+        AlarmMedia(media=media, alarm=alarms[payload.event_uid], created_at=alarms[payload.event_uid].created_at)
+        for payload, media in zip(payloads, media_list)
+    ])
+
+    for event_uid in {payload.event_uid for payload in payloads if payload.media_type == Media.IMAGE}:
+        if alarms[event_uid].id not in with_image:
+            publish_live_alarm(alarms[event_uid])
+
+def attach_pending_media(event_uids):
+    """
+    Attach the media parked while waiting for the alarms, called once the
+    alarms are stored.
+    """
+    return attach_pending(
+        PendingChild.ALARM_MEDIA,
+        event_uids,
+        attach_alarm_media,
+        lambda payload: execute.apply_async(args=(payload,)),
+    )
 
 @shared_task(bind=True,autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}, ignore_result=True,
              name='alarm_media:execute')
 def execute(self, payload, **kwargs):
+    payload = decode_payload(payload, AlarmMediaRequest)
     data: dict = {}
     try:
         
-        if not Alarm.objects.filter(event_uid=payload.event_uid).exists():
-            time.sleep(15)
-            raise ObjectDoesNotExist(
-                f"event_uid {payload.event_uid} does not exist"
-            )
+        alarm = Alarm.objects.filter(event_uid=payload.event_uid).first()
+        if alarm is None:
+            park(PendingChild.ALARM_MEDIA, payload.event_uid, encode_payload(payload))
 
-        alarm = Alarm.objects.get(event_uid=payload.event_uid)
-        media = Media(
-            media_id=payload.media_id,
-            media_name=payload.media_name,
-            media_url=payload.media_url,
-            media_type=payload.media_type,
-        )
-        media.save()
-        
-        alarm_media = AlarmMedia(
-            media=media,
-            alarm=alarm
-        )
-        
-        alarm_media.save()
+            # the alarm may have been stored while the media was being parked
+            if Alarm.objects.filter(event_uid=payload.event_uid).exists():
+                attach_pending_media([payload.event_uid])
+
+            return {
+                'action': 'parked',
+                'time': datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
+                'result': f"waiting for event_uid {payload.event_uid}",
+            }
+
+        with transaction.atomic():
+            with_image = lock_alarms([alarm])
+            media = Media(
+                media_id=payload.media_id,
+                media_name=payload.media_name,
+                media_url=payload.media_url,
+                media_type=payload.media_type,
+            )
+            media.save()
+            
+            alarm_media = AlarmMedia(
+                media=media,
+                alarm=alarm
+            )
+            
+            alarm_media.save()
+            if media.media_type == Media.IMAGE and alarm.id not in with_image:
+                publish_live_alarm(alarm)
         
         data.update(
             {
@@ -1,58 +1,99 @@
 import django
 django.setup()
+import logging
 from django.db import IntegrityError
 from django.core.exceptions import ObjectDoesNotExist
 from celery import shared_task
 from datetime import datetime, timezone
 from acceptance_control.models import Delivery
 from tenants.models import Tenant, PlantEntity
+from common_utils.reference_data.cache import get_tenant, get_plant_entity
+from events_api.schemas.delivery import DeliveryRequest
+from events_api.config.wire_format import decode_payload
+from events_api.tasks.delivery_media.core import attach_pending_media
+from events_api.tasks.delivery_flag.core import attach_pending_flags
+
+def save_delivery(payload):
+    try:
+        tenant = get_tenant(payload.tenant_domain)
+    except Tenant.DoesNotExist:
+        raise ObjectDoesNotExist(
+            f"tenant {payload.tenant_domain} does not exist"
+        )
+
+    try:
+        entity = get_plant_entity(tenant, payload.location)
+    except PlantEntity.DoesNotExist:
+        raise ObjectDoesNotExist(
+            f"Entity {payload.location} for {tenant.domain} does not exist"
+        )
+
+    if Delivery.objects.filter(delivery_id=payload.delivery_id).exists():
+        delivery = Delivery.objects.get(
+            delivery_id=payload.delivery_id
+        )
+        delivery.delivery_end = payload.delivery_end.replace(tzinfo=timezone.utc)
+        delivery.delivery_status = payload.delivery_status if payload.delivery_status else 'done'
+
+    else:
+        delivery = Delivery(
+            tenant=tenant,
+            entity=entity,
+            delivery_id=payload.delivery_id,
+            delivery_location=payload.location,
+            delivery_start=payload.delivery_start.replace(tzinfo=timezone.utc),
+            delivery_end=payload.delivery_end.replace(tzinfo=timezone.utc),
+            delivery_status=payload.delivery_status if payload.delivery_status else "on-going"
+        )
+
+    created = delivery.pk is None
+    delivery.save()
+    if created:
+        attach_pending_media([delivery.delivery_id])
+        attach_pending_flags([delivery.delivery_id])
+
+    return {
+        'action': 'done',
+        'time':  datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
+        'result': 'success'
+    }
 
 @shared_task(bind=True,autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}, ignore_result=True,
              name='delivery:execute')
 def execute(self, payload, **kwargs):
-    data: dict = {}
+    payload = decode_payload(payload, DeliveryRequest)
     try:
-        if not Tenant.objects.filter(domain=payload.tenant_domain).exists():
-            raise ObjectDoesNotExist(
-                f"tenant {payload.tenant_domain} does not exist"
-            )
-            
-        tenant = Tenant.objects.get(domain=payload.tenant_domain)
-        if not PlantEntity.objects.filter(entity_uid=payload.location, entity_type__tenant=tenant).exists():
-            raise ObjectDoesNotExist(
-                f"Entity {payload.location} for {tenant.domain} does not exist"
-            )
-            
-            
-        if Delivery.objects.filter(delivery_id=payload.delivery_id).exists():
-            delivery = Delivery.objects.get(
-                delivery_id=payload.delivery_id
-            )
-            delivery.delivery_end = payload.delivery_end.replace(tzinfo=timezone.utc)
-            delivery.delivery_status = payload.delivery_status if payload.delivery_status else 'done'
-            
-        else:
-            entity = PlantEntity.objects.get(entity_uid=payload.location, entity_type__tenant=tenant)
-            delivery = Delivery(
-                tenant=tenant,
-                entity=entity,
-                delivery_id=payload.delivery_id,
-                delivery_location=payload.location,
-                delivery_start=payload.delivery_start.replace(tzinfo=timezone.utc),
-                delivery_end=payload.delivery_end.replace(tzinfo=timezone.utc),
-                delivery_status=payload.delivery_status if payload.delivery_status else "on-going"
-            )
-        
-        delivery.save()
-        data.update(
-            {
-                'action': 'done',
-                'time':  datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
-                'result': 'success'
-            }
-        )
-    
+        data = save_delivery(payload)
     except Exception as err:
         raise ValueError(f"Error saving delivery data into db: {err}")
     
-    return data
\ No newline at end of file
+    return data
+
+@shared_task(bind=True,
+             name='delivery:execute_many')
+def execute_many(self, items, **kwargs):
+    """
+    Chunk of deliveries published by a batch endpoint, see encode_batch. Items
+    that cannot be stored are handed over to delivery:execute, so that each
+    of them is retried and reported individually. Returns the result of every
+    item, in order, with the task id of the retry for those handed over.
+    """
+    summary = {'done': 0, 'failed': 0}
+    results = []
+    for item in items:
+        try:
+            results.append(save_delivery(decode_payload(item["payload"], DeliveryRequest)))
+            summary['done'] += 1
+        except Exception as err:
+            summary['failed'] += 1
+            task = execute.apply_async(args=(item["payload"],), task_id=item.get("task_id"))
+            logging.warning(f"Error saving item {len(results)} of the batch, retrying it as {task.id}: {err}")
+            results.append({
+                'action': 'retried',
+                'time': datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
+                'result': str(err),
+                'task_id': task.id,
+            })
+
+    logging.info(f"delivery batch of {len(items)}: {summary}")
+    return results
@@ -1,35 +1,86 @@
 import django
 django.setup()
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.core.exceptions import ObjectDoesNotExist
 from celery import shared_task
 from datetime import datetime, timezone
-from acceptance_control.models import Delivery, DeliveryFlag, FlagType, Severity, Alarm
+from acceptance_control.models import Delivery, DeliveryFlag, FlagType, Severity, Alarm, PendingChild
+from common_utils.reference_data.cache import get_flag_type, get_severity
+from events_api.schemas.delivery import DeliveryFlagRequest
+from events_api.config.wire_format import encode_payload, decode_payload
+from common_utils.staging.pending import park, attach_pending
+from common_utils.delivery_flags.summary import refresh_flag_summaries
+from common_utils.stats.rollup import record_delivery_flags
+
+def attach_delivery_flags(pending):
+    payloads = [decode_payload(child.payload, DeliveryFlagRequest) for child in pending]
+    deliveries = {
+        delivery.delivery_id: delivery for delivery in Delivery.objects.select_related('tenant').filter(
+            delivery_id__in={payload.delivery_id for payload in payloads}
+        )
+    }
+
+    flags = []
+    for payload in payloads:
+        flag_type = get_flag_type(payload.flag_type)
+        flags.append(
+            DeliveryFlag(
+                delivery=deliveries[payload.delivery_id],
+                flag_type=flag_type,
+                severity=get_severity(flag_type, payload.severity_level),
+                event_uid=payload.event_uid,
+            )
+        )
+
+    DeliveryFlag.objects.bulk_create(flags)
+    refresh_flag_summaries({flag.delivery_id for flag in flags})
+    record_delivery_flags(flags)
+
+def attach_pending_flags(delivery_ids):
+    """
+    Attach the flags parked while waiting for the deliveries, called once the
+    deliveries are stored.
+    """
+    return attach_pending(
+        PendingChild.DELIVERY_FLAG,
+        delivery_ids,
+        attach_delivery_flags,
+        lambda payload: execute.apply_async(args=(payload,)),
+    )
 
 @shared_task(bind=True,autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}, ignore_result=True,
              name='delivery_flag:execute')
 def execute(self, payload, **kwargs):
+    payload = decode_payload(payload, DeliveryFlagRequest)
     data: dict = {}
-    try:        
-        if not Delivery.objects.filter(delivery_id=payload.delivery_id).exists():
-            raise ObjectDoesNotExist(
-                f"delivery_id {payload.delivery_id} does not exist"
-            )
-            
-        if not FlagType.objects.filter(name=payload.flag_type).exists():
+    try:
+        try:
+            flag_type = get_flag_type(payload.flag_type)
+        except FlagType.DoesNotExist:
             raise ObjectDoesNotExist(
                 f"flag type {payload.flag_type} does not exist"
             )
-            
-        delivery = Delivery.objects.get(delivery_id=payload.delivery_id)
-        flag_type = FlagType.objects.get(name=payload.flag_type)
         
-        if not Severity.objects.filter(flag_type=flag_type, level=payload.severity_level).exists():
+        try:
+            severity = get_severity(flag_type, payload.severity_level)
+        except Severity.DoesNotExist:
             raise ObjectDoesNotExist(
                 f"severity level {payload.severity_level} for {payload.flag_type} does not exist"
             )
         
-        severity = Severity.objects.get(flag_type=flag_type, level=payload.severity_level)
+        delivery = Delivery.objects.select_related('tenant').filter(delivery_id=payload.delivery_id).first()
+        if delivery is None:
+            park(PendingChild.DELIVERY_FLAG, payload.delivery_id, encode_payload(payload))
+
+            # the delivery may have been stored while the flag was being parked
+            if Delivery.objects.filter(delivery_id=payload.delivery_id).exists():
+                attach_pending_flags([payload.delivery_id])
+
+            return {
+                'action': 'parked',
+                'time': datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
+                'result': f"waiting for delivery_id {payload.delivery_id}",
+            }
         
         flag = DeliveryFlag(
             delivery=delivery,
@@ -37,8 +88,12 @@ def execute(self, payload, **kwargs):
             severity=severity,
             event_uid=payload.event_uid,
         )
-        
-        flag.save()
+
+        # the summary of the delivery is refreshed on save, the summary and the
+        # daily stats are updated in the same transaction as the flag
+        with transaction.atomic():
+            flag.save()
+            record_delivery_flags([flag])
         data.update(
             {
                 'action': 'done',
@@ -1,52 +1,128 @@
 import django
 django.setup()
+import logging
 from django.db import IntegrityError
 from django.core.exceptions import ObjectDoesNotExist
 from celery import shared_task
 from datetime import datetime, timezone
-from acceptance_control.models import Delivery, Media, DeliveryMedia
+from acceptance_control.models import Delivery, Media, MediaKey, DeliveryMedia, PendingChild
 from tenants.models import SensorBox
+from common_utils.reference_data.cache import get_sensor_box
+from events_api.schemas.delivery import DeliveryMediaRequest
+from events_api.config.wire_format import encode_payload, decode_payload
+from common_utils.staging.pending import park, attach_pending
+from common_utils.partitions.keys import claim_unique
 
-@shared_task(bind=True,autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}, ignore_result=True,
-             name='delivery_media:execute')
-def execute(self, payload, **kwargs):
-    data: dict = {}
-    try:        
-        if not Delivery.objects.filter(delivery_id=payload.delivery_id).exists():
-            raise ObjectDoesNotExist(
-                f"delivery_id {payload.delivery_id} does not exist"
-            )
-
-            
-        delivery = Delivery.objects.get(delivery_id=payload.delivery_id)
-        sensor_box = SensorBox.objects.filter(
-                plant_entity=delivery.entity,
-                sensor_box_location=payload.sensor_box_location
-            )   
-        media = Media(
+def attach_delivery_media(pending):
+    payloads = [decode_payload(child.payload, DeliveryMediaRequest) for child in pending]
+    deliveries = {
+        delivery.delivery_id: delivery for delivery in Delivery.objects.filter(
+            delivery_id__in={payload.delivery_id for payload in payloads}
+        )
+    }
+
+    media_list = Media.objects.bulk_create([
+        Media(
             media_id=payload.media_id,
             media_name=payload.media_name,
             media_url=payload.media_url,
             media_type=payload.media_type,
-            sensor_box=sensor_box.first() if sensor_box else None,
-        )
-        media.save()
-        
-        delivery_media = DeliveryMedia(
-            media=media,
-            delivery=delivery
-        )
-        
-        delivery_media.save()
-        data.update(
-            {
-                'action': 'done',
-                'time':  datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
-                'result': 'success'
-            }
-        )
-    
+            sensor_box=get_sensor_box(deliveries[payload.delivery_id].entity_id, payload.sensor_box_location),
+        ) for payload in payloads
+    ])
+    claim_unique(MediaKey, [media.media_id for media in media_list], {media.media_id: media.created_at for media in media_list})
+
+    DeliveryMedia.objects.bulk_create([
+        DeliveryMedia(media=media, delivery=deliveries[payload.delivery_id], created_at=deliveries[payload.delivery_id].created_at)
+        for payload, media in zip(payloads, media_list)
+    ])
+
+def attach_pending_media(delivery_ids):
+    """
+    Attach the media parked while waiting for the deliveries, called once the
+    deliveries are stored.
+    """
+    return attach_pending(
+        PendingChild.DELIVERY_MEDIA,
+        delivery_ids,
+        attach_delivery_media,
+        lambda payload: execute.apply_async(args=(payload,)),
+    )
+
+def save_delivery_media(payload):
+    delivery = Delivery.objects.filter(delivery_id=payload.delivery_id).first()
+    if delivery is None:
+        park(PendingChild.DELIVERY_MEDIA, payload.delivery_id, encode_payload(payload))
+
+        # the delivery may have been stored while the media was being parked
+        if Delivery.objects.filter(delivery_id=payload.delivery_id).exists():
+            attach_pending_media([payload.delivery_id])
+
+        return {
+            'action': 'parked',
+            'time': datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
+            'result': f"waiting for delivery_id {payload.delivery_id}",
+        }
+
+    sensor_box = get_sensor_box(delivery.entity_id, payload.sensor_box_location)
+    media = Media(
+        media_id=payload.media_id,
+        media_name=payload.media_name,
+        media_url=payload.media_url,
+        media_type=payload.media_type,
+        sensor_box=sensor_box,
+    )
+    media.save()
+
+    delivery_media = DeliveryMedia(
+        media=media,
+        delivery=delivery
+    )
+
+    delivery_media.save()
+    return {
+        'action': 'done',
+        'time':  datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
+        'result': 'success'
+    }
+
+@shared_task(bind=True,autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}, ignore_result=True,
+             name='delivery_media:execute')
+def execute(self, payload, **kwargs):
+    payload = decode_payload(payload, DeliveryMediaRequest)
+    try:
+        data = save_delivery_media(payload)
     except Exception as err:
         raise ValueError(f"Error saving delivery data into db: {err}")
     
-    return data
\ No newline at end of file
+    return data
+
+@shared_task(bind=True,
+             name='delivery_media:execute_many')
+def execute_many(self, items, **kwargs):
+    """
+    Chunk of delivery media published by a batch endpoint, see encode_batch. Items
+    that cannot be stored are handed over to delivery_media:execute, so that
+    each of them is retried and reported individually. Returns the result of
+    every item, in order, with the task id of the retry for those handed over.
+    """
+    summary = {'done': 0, 'parked': 0, 'failed': 0}
+    results = []
+    for item in items:
+        try:
+            result = save_delivery_media(decode_payload(item["payload"], DeliveryMediaRequest))
+            summary[result['action']] += 1
+            results.append(result)
+        except Exception as err:
+            summary['failed'] += 1
+            task = execute.apply_async(args=(item["payload"],), task_id=item.get("task_id"))
+            logging.warning(f"Error saving item {len(results)} of the batch, retrying it as {task.id}: {err}")
+            results.append({
+                'action': 'retried',
+                'time': datetime.now().strftime("%Y-%m-%d %H-%M-%S"),
+                'result': str(err),
+                'task_id': task.id,
+            })
+
+    logging.info(f"delivery_media batch of {len(items)}: {summary}")
+    return results
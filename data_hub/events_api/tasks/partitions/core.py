@@ -0,0 +1,19 @@
+import django
+django.setup()
+import logging
+from celery import shared_task
+from common_utils.partitions.monthly import create_partitions
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}, ignore_result=True,
+             name='partitions:create')
+def create(self, **kwargs):
+    """
+    Create the monthly partitions ahead of time, scheduled by celery beat, see
+    CELERY_BEAT_SCHEDULE, so that inserts never pile up in the default
+    partitions between two deployments. Nothing to do outside PostgreSQL.
+    """
+    created = create_partitions()
+    if created:
+        logging.info(f"Partitions created: {', '.join(created)}")
+
+    return created
@@ -7,6 +7,9 @@ from datetime import datetime, timezone
 from acceptance_control.models import VideoArchive, VideoArchiveMedia
 from tenants.models import SensorBox, Camera, Tenant, PlantEntity
 from acceptance_control.models import Media
+from common_utils.reference_data.cache import get_tenant, get_plant_entity, get_sensor_box, get_camera
+from events_api.schemas.video_archive import VideoArchiveRequest
+from events_api.config.wire_format import decode_payload
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 5}, ignore_result=True,
              name='video_archive:execute')
@@ -14,6 +17,7 @@ def execute(self, payload, **kwargs):
     """
     Celery task to process video archive entries, ensuring data integrity and optimized queries.
     """
+    payload = decode_payload(payload, VideoArchiveRequest)
 
     try:
         payload_dict = dict(payload)
@@ -33,26 +37,22 @@ def execute(self, payload, **kwargs):
             raise ValueError("Missing required payload fields.")
 
         try:
-            tenant = Tenant.objects.get(domain=tenant_domain)
+            tenant = get_tenant(tenant_domain)
         except Tenant.DoesNotExist:
             raise ObjectDoesNotExist(f"❌ Tenant {tenant_domain} does not exist.")
 
         try:
-            entity = PlantEntity.objects.select_related("entity_type").get(
-                entity_uid=location, entity_type__tenant=tenant
-            )
+            entity = get_plant_entity(tenant, location)
         except PlantEntity.DoesNotExist:
             raise ObjectDoesNotExist(f"❌ Entity {location} for {tenant.domain} does not exist.")
 
-        sensor_box = SensorBox.objects.filter(
-            plant_entity=entity, sensor_box_location=sensor_box_location
-        ).first()
+        sensor_box = get_sensor_box(entity.id, sensor_box_location)
 
         if not sensor_box:
             raise ObjectDoesNotExist(f"❌ SensorBox {sensor_box_location} for {entity} does not exist.")
 
         try:
-            camera = Camera.objects.get(camera_id=camera_id, sensor_box=sensor_box)
+            camera = get_camera(sensor_box, camera_id)
         except Camera.DoesNotExist:
             raise ObjectDoesNotExist(f"❌ Camera {camera_id} for {entity} does not exist.")
 
@@ -0,0 +1,34 @@
+import unittest
+from kombu.serialization import dumps, loads
+from events_api.config.wire_format import (
+    register_serializer,
+    encode_payload,
+    decode_payload,
+)
+from common_utils.benchmark.wire_format import sample_requests, task_body
+
+class WireFormatTest(unittest.TestCase):
+    """
+    The orjson envelope of encode_payload against the pickled request models
+    it replaced, see ACCEPT_CONTENT in events_api.config.celery_config. Their
+    throughput is compared by manage.py benchmark --wire-format.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        register_serializer()
+        cls.requests = sample_requests()
+
+    def test_round_trip(self):
+        for name, request in self.requests.items():
+            with self.subTest(name):
+                content_type, content_encoding, data = dumps(task_body(encode_payload(request)), serializer="orjson")
+                args, _, _ = loads(data, content_type, content_encoding, accept=[content_type])
+                self.assertEqual(decode_payload(args[0], type(request)), request)
+
+    def test_smaller_than_pickle(self):
+        for name, request in self.requests.items():
+            with self.subTest(name):
+                pickled = dumps(task_body(request), serializer="pickle")[2]
+                encoded = dumps(task_body(encode_payload(request)), serializer="orjson")[2]
+                self.assertLess(len(encoded), len(pickled), f"{name}: {len(pickled)} -> {len(encoded)} bytes")
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MetadataConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'metadata'
+
+    def ready(self):
+        # drop the localizations and table configurations cached by the data api on saves
+        import common_utils.localization.signals
+        import common_utils.table_config.signals
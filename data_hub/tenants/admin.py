@@ -38,7 +38,7 @@ class CameraInline(TabularInline):
 # Register your models here.
 @admin.register(Tenant)
 class TenantAdmin(ModelAdmin):
-    list_display = ('tenant_id', 'tenant_name', 'location', 'domain', 'is_active', 'created_at')
+    list_display = ('tenant_id', 'tenant_name', 'location', 'domain', 'is_active', 'archive_after_days', 'created_at')
     search_fields = ('tenant_name', 'location', 'domain')
     list_filter = ('is_active',)
     
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0009_tenant_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='archive_after_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Alarms and deliveries older than this many days are moved to the archive, never when empty', null=True),
+        ),
+    ]
@@ -17,6 +17,11 @@ class Tenant(models.Model):
         default="Europe/Berlin",
         help_text="Timezone for the tenant"
     )
+    archive_after_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Alarms and deliveries older than this many days are moved to the archive, never when empty"
+    )
     
     class Meta:
         db_table = "wa_tenant"
@@ -3,6 +3,7 @@ set -e
 
 /bin/bash -c "python3 /home/$user/src/data_hub/manage.py makemigrations"
 /bin/bash -c "python3 /home/$user/src/data_hub/manage.py migrate"
+/bin/bash -c "python3 /home/$user/src/data_hub/manage.py create_partitions"
 /bin/bash -c "python3 /home/$user/src/data_hub/manage.py create_superuser"
 /bin/bash -c "python3 /home/$user/src/data_hub/manage.py collectstatic --noinput"
 